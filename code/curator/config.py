@@ -25,6 +25,7 @@ class Config:
     # Models
     CURATOR_MODEL = "gpt-5.1"  # As requested
     CURATION_STRATEGY = "collection_date"  # Options: 'collection_date', 'virality', 'composite'
+    CACHE_LLM_RESPONSES = True  # Replay identical requests from code/.cache (LLM_CACHE_DISABLED=1 to bypass)
     
     # Paths
     ROOT_DIR = Path(__file__).resolve().parent.parent
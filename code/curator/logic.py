@@ -2,12 +2,15 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any
 from openai import OpenAI
+from llm_cache import cached_chat_completion, get_default_cache
 from .config import config
 from .models import CurationResult
 
 class CuratorLogic:
     def __init__(self):
         self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        # Same candidates + same brand guide = same curation, so re-runs can replay it
+        self.response_cache = get_default_cache() if config.CACHE_LLM_RESPONSES else None
         self.brand_guide = self._load_brand_guide()
 
     def _load_brand_guide(self) -> str:
@@ -132,7 +135,9 @@ CRITICAL: Select exactly 21 stories. If fewer than 21 are worthy, explain why an
             f"{formatted_candidates}"
         )
 
-        response = self.client.chat.completions.create(
+        content = cached_chat_completion(
+            self.client,
+            self.response_cache,
             model=config.CURATOR_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -141,7 +146,6 @@ CRITICAL: Select exactly 21 stories. If fewer than 21 are worthy, explain why an
             response_format={"type": "json_object"}
         )
 
-        content = response.choices[0].message.content
         if not content:
             raise ValueError("Received empty response from LLM")
             
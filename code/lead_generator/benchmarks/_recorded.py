@@ -0,0 +1,38 @@
+"""
+Recorded leads and LLM usage totals shared by the scoring benchmarks
+(batch_scoring_calibration.py, fused_scoring_report.py). Import after the
+benchmark has put lead_generator/ on sys.path.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Optional
+
+from services.llm import llm
+
+
+def load_leads(input_path: Optional[Path], sample: int) -> list[dict]:
+    """
+    `sample` {title, summary} leads from a JSONL file (seeded sample) or,
+    without one, at random from the leads table.
+    """
+    if input_path:
+        rows = [json.loads(line) for line in input_path.read_text().splitlines() if line.strip()]
+        rows = random.Random(0).sample(rows, min(sample, len(rows)))
+    else:
+        from database import db
+        rows = db.fetch_all(
+            "SELECT title, summary FROM leads WHERE summary IS NOT NULL ORDER BY random() LIMIT %s", (sample,)
+        )
+    return [{"title": r["title"], "summary": r["summary"]} for r in rows if r.get("title")]
+
+
+def usage_totals() -> dict:
+    """
+    Calls and tokens across every model so far; diff two snapshots for a step's cost.
+    """
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for model_totals in llm.usage.values():
+        for key in totals:
+            totals[key] += model_totals[key]
+    return totals
@@ -0,0 +1,140 @@
+"""
+Calibration: batched (K leads per request) vs single-lead virality and
+brand scores on recorded leads.
+
+Every sampled lead is scored twice with the same rubric and model:
+  single   one request per lead (SCORING_BATCH_SIZE=1)
+  batched  K leads per request (SCORING_BATCH_SIZE=K)
+Per stage the report shows mean absolute difference, mean bias
+(batched - single), Pearson r, pass/fail agreement at the configured
+threshold, how many leads had to be re-scored individually, and the
+requests / prompt tokens / wall time each mode spent. A lead whose call
+failed in either mode has no score to compare; it is left out and
+counted. The response cache is off for the run, so every request is
+really made.
+
+Recorded data is the leads table (title + summary), or a JSONL file with
+one {"title", "summary"} object per line. leads only holds stories that
+passed both stages, so a file that also covers rejected candidates gives
+a fairer picture around the thresholds. --save writes every score pair to
+JSONL; --replay re-reports a saved file without calling the API.
+
+Usage (from lead_generator/, with the usual .env):
+    python benchmarks/batch_scoring_calibration.py --sample 60 --k 5
+    python benchmarks/batch_scoring_calibration.py --input recorded.jsonl --k 8 --save pairs.jsonl
+    python benchmarks/batch_scoring_calibration.py --replay pairs.jsonl
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # code/, for llm_cache
+
+# Cached answers would cost nothing and skew the request / token / time columns
+os.environ["LLM_CACHE_DISABLED"] = "1"
+
+import numpy as np
+import typer
+from config import config
+from logic.filters import filters
+from _recorded import load_leads, usage_totals
+
+STAGES = {
+    "virality": ("virality_score", "VIRALITY_THRESHOLD"),
+    "brand": ("brand_score", "BRAND_THRESHOLD"),
+}
+
+
+def score(leads: list[dict], stage: str, k: int) -> tuple[list[Optional[float]], dict]:
+    config.SCORING_BATCH_SIZE = k
+    copies = [dict(lead) for lead in leads]
+    before, fallbacks = usage_totals(), filters.batch_fallbacks
+
+    started = time.perf_counter()
+    if stage == "virality":
+        filters.virality_check_many(copies)
+    else:
+        filters.brand_lens_check_many(copies)
+    elapsed = time.perf_counter() - started
+
+    after = usage_totals()
+    cost = {key: after[key] - before[key] for key in after}
+    cost["seconds"] = elapsed
+    cost["fallbacks"] = filters.batch_fallbacks - fallbacks
+    # None: the call failed (or returned no score), not a score of 0
+    return [c.get(STAGES[stage][0]) for c in copies], cost
+
+
+def report(stage: str, single: list[float], batched: list[float], costs: Optional[dict] = None, failed: int = 0):
+    threshold = getattr(config, STAGES[stage][1])
+    if failed:
+        print(f"[{stage}] {failed} leads left out: their call failed in at least one mode")
+    if len(single) < 2:
+        print(f"[{stage}] {len(single)} scored pairs, too few to compare")
+        print()
+        return
+    s, b = np.array(single), np.array(batched)
+    diff = b - s
+    r = np.corrcoef(s, b)[0, 1] if s.std() and b.std() else float("nan")
+    agreement = np.mean((s >= threshold) == (b >= threshold))
+
+    print(f"[{stage}] {len(s)} leads, threshold {threshold}")
+    print(f"  mean |batched - single|  {np.abs(diff).mean():.2f}")
+    print(f"  mean bias                {diff.mean():+.2f}")
+    print(f"  pearson r                {r:.3f}")
+    print(f"  pass/fail agreement      {agreement:.1%} "
+          f"(single passes {np.mean(s >= threshold):.0%}, batched {np.mean(b >= threshold):.0%})")
+    if costs:
+        print(f"  {'':<10}{'requests':>10}{'prompt tok':>12}{'compl tok':>11}{'seconds':>9}")
+        for mode in ("single", "batched"):
+            c = costs[mode]
+            print(f"  {mode:<10}{c['calls']:>10}{c['prompt_tokens']:>12}{c['completion_tokens']:>11}{c['seconds']:>9.1f}")
+        print(f"  batched leads re-scored individually: {costs['batched']['fallbacks']}")
+    print()
+
+
+def main(sample: int = typer.Option(60, help="Number of recorded leads to score"),
+         k: int = typer.Option(5, help="Leads per batched request"),
+         stage: str = typer.Option("both", help="'virality', 'brand' or 'both'"),
+         input_file: Optional[Path] = typer.Option(None, "--input", help="JSONL of {title, summary} instead of the leads table"),
+         save: Optional[Path] = typer.Option(None, help="Write every score pair to this JSONL file"),
+         replay: Optional[Path] = typer.Option(None, help="Report on a file written by --save, without API calls")):
+    stages = list(STAGES) if stage == "both" else [stage]
+
+    if replay:
+        pairs = [json.loads(line) for line in replay.read_text().splitlines() if line.strip()]
+        for name in stages:
+            rows = [p for p in pairs if p["stage"] == name]
+            if rows:
+                report(name, [p["single"] for p in rows], [p["batched"] for p in rows])
+        return
+
+    leads = load_leads(input_file, sample)
+    if len(leads) < 2:
+        typer.echo(f"Need at least 2 recorded leads, found {len(leads)}.")
+        raise typer.Exit(1)
+
+    pairs = []
+    for name in stages:
+        single, single_cost = score(leads, name, 1)
+        batched, batched_cost = score(leads, name, k)
+        scored = [(lead, float(s), float(b)) for lead, s, b in zip(leads, single, batched)
+                  if s is not None and b is not None]
+        report(name, [s for _, s, _ in scored], [b for _, _, b in scored],
+               {"single": single_cost, "batched": batched_cost}, failed=len(leads) - len(scored))
+        pairs.extend(
+            {"stage": name, "title": lead["title"], "single": s, "batched": b, "k": k}
+            for lead, s, b in scored
+        )
+
+    if save:
+        save.write_text("".join(json.dumps(p) + "\n" for p in pairs))
+        print(f"Saved {len(pairs)} score pairs to {save}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
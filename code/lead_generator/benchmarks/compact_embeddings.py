@@ -0,0 +1,113 @@
+"""
+Benchmark: recall and latency of compact (512-dim halfvec) vs full
+(1536-dim vector) embeddings on our lead corpus.
+
+Ground truth is exact top-k cosine neighbours over the full 1536-dim
+vectors, computed in NumPy. Each sampled lead is used as a query with
+itself excluded.
+  offline  exact search on truncated + re-normalized 512-dim vectors (float16),
+           i.e. the best recall the compact index could reach
+  index    HNSW queries against leads.embedding vs leads.embedding_compact,
+           with per-query latency and on-disk index sizes
+           (requires migration_v5.sql)
+
+Usage (from lead_generator/, with the usual .env):
+    python benchmarks/compact_embeddings.py --queries 200 --k 10
+    python benchmarks/compact_embeddings.py --skip-index
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import typer
+from config import config
+from database import db, Vector, parse_vector
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, query_ids: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    scores[np.arange(len(query_ids)), query_ids] = -np.inf  # exclude self
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(truth: np.ndarray, found: list[list[int]]) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth.tolist(), found))
+    return hits / truth.size
+
+
+def index_search(ids: list[str], full: np.ndarray, query_ids: np.ndarray, k: int, compact: bool):
+    column, pg_type = ("embedding_compact", "halfvec") if compact else ("embedding", "vector")
+    dims = config.EMBEDDING_COMPACT_DIMENSIONS if compact else full.shape[1]
+    position = {lead_id: i for i, lead_id in enumerate(ids)}
+    query = f"SELECT id FROM leads WHERE id <> %s ORDER BY {column} <=> %s::{pg_type} LIMIT %s"
+
+    found, latencies = [], []
+    with db.get_cursor() as cur:
+        for q in query_ids:
+            vector = normalize(full[q:q + 1, :dims])[0]
+            started = time.perf_counter()
+            cur.execute(query, (ids[q], Vector(vector, pg_type).to_text(), k))
+            rows = cur.fetchall()
+            latencies.append(time.perf_counter() - started)
+            found.append([position[str(r['id'])] for r in rows if str(r['id']) in position])
+    return found, np.array(latencies)
+
+
+def index_sizes() -> list[dict]:
+    return db.fetch_all("""
+        SELECT indexrelid::regclass::text AS name, pg_size_pretty(pg_relation_size(indexrelid)) AS size
+        FROM pg_index WHERE indrelid = 'leads'::regclass
+        ORDER BY pg_relation_size(indexrelid) DESC
+    """)
+
+
+def main(queries: int = typer.Option(200, help="Number of leads sampled as queries"),
+         k: int = typer.Option(10, help="Neighbours per query"),
+         skip_index: bool = typer.Option(False, help="Only run the offline (exact search) comparison")):
+    rows = db.fetch_all("SELECT id, embedding::text AS embedding FROM leads WHERE embedding IS NOT NULL")
+    if len(rows) <= k:
+        typer.echo(f"Need more than {k} leads with embeddings, found {len(rows)}.")
+        raise typer.Exit(1)
+
+    ids = [str(r['id']) for r in rows]
+    full = normalize(np.stack([parse_vector(r['embedding']) for r in rows]))
+    dims = config.EMBEDDING_COMPACT_DIMENSIONS
+    compact = normalize(full[:, :dims]).astype(np.float16).astype(np.float32)
+
+    rng = np.random.default_rng(0)
+    query_ids = rng.choice(len(ids), size=min(queries, len(ids)), replace=False)
+    truth = top_k(full, full[query_ids], query_ids, k)
+
+    print(f"Corpus: {len(ids)} leads, {len(query_ids)} queries, recall@{k} vs exact 1536-dim search")
+    print(f"Vector bytes: full {full.shape[1] * 4} B, compact {dims * 2} B ({full.shape[1] * 4 / (dims * 2):.0f}x smaller)")
+    print()
+
+    started = time.perf_counter()
+    offline = top_k(compact, compact[query_ids], query_ids, k)
+    offline_s = time.perf_counter() - started
+    print(f"{'offline exact, 512-dim halfvec':<34} recall {recall(truth, offline.tolist()):.3f}   "
+          f"({offline_s / len(query_ids) * 1e3:.2f} ms/query in NumPy)")
+
+    if skip_index:
+        return
+
+    for label, use_compact in (("HNSW vector(1536)", False), (f"HNSW halfvec({dims})", True)):
+        found, latencies = index_search(ids, full, query_ids, k, use_compact)
+        print(f"{label:<34} recall {recall(truth, found):.3f}   "
+              f"p50 {np.percentile(latencies, 50) * 1e3:.1f} ms   p95 {np.percentile(latencies, 95) * 1e3:.1f} ms")
+
+    print()
+    for row in index_sizes():
+        print(f"  {row['name']:<40} {row['size']}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,116 @@
+"""
+Comparison report: fused (virality + brand in one call) vs two-stage
+scoring on recorded leads.
+
+Every sampled lead is scored three ways, one lead per request:
+  virality  the two-stage virality call
+  brand     the two-stage brand call (run on every lead, so agreement can
+            be measured on all of them, not only virality survivors)
+  fused     one call returning both scores
+The report shows, for each score, the mean absolute difference, the bias
+(fused - two-stage), Pearson r and threshold agreement, and how often the
+final save/reject decision matches. It also shows requests, tokens and
+wall time. The two-stage pipeline only brand-checks virality survivors,
+so its cost is reported as virality + brand x survivor share.
+
+Recorded data is the leads table (title + summary), or a JSONL file with
+one {"title", "summary"} object per line. leads only holds stories that
+passed both stages, so a file that also covers rejected candidates gives
+a fairer picture around the thresholds.
+
+Usage (from lead_generator/, with the usual .env):
+    python benchmarks/fused_scoring_report.py --sample 60
+    python benchmarks/fused_scoring_report.py --input recorded.jsonl --save fused.jsonl
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # code/, for llm_cache
+
+import numpy as np
+import typer
+from config import config
+from logic.filters import filters
+from _recorded import load_leads, usage_totals
+
+
+def run(score_many, leads: list[dict]) -> tuple[list[dict], dict]:
+    copies = [dict(lead) for lead in leads]
+    before = usage_totals()
+    started = time.perf_counter()
+    score_many(copies)
+    elapsed = time.perf_counter() - started
+    after = usage_totals()
+    cost = {key: after[key] - before[key] for key in after}
+    cost["seconds"] = elapsed
+    return copies, cost
+
+
+def agreement(label: str, two_stage: np.ndarray, fused: np.ndarray, threshold: int):
+    diff = fused - two_stage
+    r = np.corrcoef(two_stage, fused)[0, 1] if two_stage.std() and fused.std() else float("nan")
+    agree = np.mean((two_stage >= threshold) == (fused >= threshold))
+    print(f"  {label:<10} |diff| {np.abs(diff).mean():5.2f}   bias {diff.mean():+5.2f}   r {r:.3f}   "
+          f"agreement at {threshold}: {agree:.1%}")
+
+
+def main(sample: int = typer.Option(60, help="Number of recorded leads to score"),
+         input_file: Optional[Path] = typer.Option(None, "--input", help="JSONL of {title, summary} instead of the leads table"),
+         save: Optional[Path] = typer.Option(None, help="Write every lead's scores to this JSONL file")):
+    leads = load_leads(input_file, sample)
+    if len(leads) < 2:
+        typer.echo(f"Need at least 2 recorded leads, found {len(leads)}.")
+        raise typer.Exit(1)
+
+    config.SCORING_BATCH_SIZE = 1
+    virality, virality_cost = run(filters.virality_check_many, leads)
+    brand, brand_cost = run(filters.brand_lens_check_many, leads)
+    fused, fused_cost = run(filters.fused_check_many, leads)
+
+    v2 = np.array([float(l['virality_score'] or 0) for l in virality])
+    b2 = np.array([float(l['brand_score'] or 0) for l in brand])
+    vf = np.array([float(l['virality_score'] or 0) for l in fused])
+    bf = np.array([float(l['brand_score'] or 0) for l in fused])
+    saved_two_stage = (v2 >= config.VIRALITY_THRESHOLD) & (b2 >= config.BRAND_THRESHOLD)
+    saved_fused = (vf >= config.VIRALITY_THRESHOLD) & (bf >= config.BRAND_THRESHOLD)
+
+    print(f"{len(leads)} leads, model {config.OPENAI_MODEL_MAIN}")
+    print()
+    print("Score agreement (fused vs two-stage)")
+    agreement("virality", v2, vf, config.VIRALITY_THRESHOLD)
+    agreement("brand", b2, bf, config.BRAND_THRESHOLD)
+    print(f"  decision   same save/reject verdict for {np.mean(saved_two_stage == saved_fused):.1%} "
+          f"(two-stage saves {saved_two_stage.sum()}, fused saves {saved_fused.sum()})")
+    print()
+
+    # The pipeline only brand-checks virality survivors
+    survivor_share = float(np.mean(v2 >= config.VIRALITY_THRESHOLD))
+    pipeline = {
+        key: virality_cost[key] + brand_cost[key] * survivor_share
+        for key in ("calls", "prompt_tokens", "completion_tokens", "seconds")
+    }
+    print(f"Cost (two-stage pipeline brand-checks {survivor_share:.0%} of leads)")
+    print(f"  {'':<22}{'requests':>10}{'prompt tok':>12}{'compl tok':>11}{'seconds':>9}")
+    rows = (("two-stage, all leads", {k: virality_cost[k] + brand_cost[k] for k in pipeline}),
+            ("two-stage, pipeline", pipeline),
+            ("fused", fused_cost))
+    for label, c in rows:
+        print(f"  {label:<22}{c['calls']:>10.0f}{c['prompt_tokens']:>12.0f}{c['completion_tokens']:>11.0f}{c['seconds']:>9.1f}")
+    saved_tokens = pipeline["prompt_tokens"] + pipeline["completion_tokens"] - fused_cost["prompt_tokens"] - fused_cost["completion_tokens"]
+    print(f"  fused saves {pipeline['seconds'] - fused_cost['seconds']:.1f}s and {saved_tokens:.0f} tokens "
+          f"vs the two-stage pipeline")
+
+    if save:
+        save.write_text("".join(
+            json.dumps({"title": lead["title"], "virality": v, "brand": b, "fused_virality": fv, "fused_brand": fb}) + "\n"
+            for lead, v, b, fv, fb in zip(leads, v2.tolist(), b2.tolist(), vf.tolist(), bf.tolist())
+        ))
+        print(f"Saved {len(leads)} rows to {save}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,71 @@
+"""
+Benchmark: how many extra exact duplicates URL canonicalization catches.
+
+Runs a URL corpus through the old normalization (strip whitespace) and the
+canonical form from utils/urls.py, and reports how many candidates each
+would send on to the paid stages (gatekeeper -> embedding -> 2x GPT-4o).
+The default corpus is synthetic (hand-written variants); pass --input with
+an export of processed_urls for production figures.
+
+Usage (from lead_generator/):
+    python benchmarks/url_canonicalization.py
+    python benchmarks/url_canonicalization.py --input urls.txt
+"""
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import typer
+from utils.urls import canonicalize_url
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "data" / "synthetic_feed_urls.txt"
+
+
+def load_corpus(path: Path) -> list[str]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def main(input: Path = typer.Option(DEFAULT_CORPUS, help="File with one URL per line"),
+         show_groups: bool = typer.Option(False, help="Print every collapsed group")):
+    urls = load_corpus(input)
+
+    started = time.perf_counter()
+    canonical = [canonicalize_url(u) for u in urls]
+    elapsed = time.perf_counter() - started
+
+    legacy_unique = len({u.strip() for u in urls})
+    canonical_unique = len(set(canonical))
+    extra_dupes = legacy_unique - canonical_unique
+
+    synthetic = input.resolve() == DEFAULT_CORPUS
+    print(f"Corpus:                       {input}{' (synthetic, hand-written)' if synthetic else ''}")
+    print(f"URLs:                         {len(urls)}")
+    print(f"Unique (strip only):          {legacy_unique}")
+    print(f"Unique (canonical):           {canonical_unique}")
+    print(f"Extra duplicates caught:      {extra_dupes} ({extra_dupes / max(legacy_unique, 1):.1%} of legacy uniques)")
+    print(f"Canonicalization cost:        {elapsed / max(len(urls), 1) * 1e6:.1f} µs/URL")
+    print()
+    print("Each extra duplicate would otherwise reach the gatekeeper, and if it")
+    print("passes, one embedding plus up to two GPT-4o scoring calls.")
+    if synthetic:
+        print("The corpus is synthetic, so the duplicate rate is not a production")
+        print("estimate; rerun with --input on an export of processed_urls.")
+
+    if show_groups:
+        groups = defaultdict(set)
+        for raw, canon in zip(urls, canonical):
+            groups[canon].add(raw.strip())
+        print()
+        for canon, raws in sorted(groups.items()):
+            if len(raws) > 1:
+                print(canon)
+                for raw in sorted(raws):
+                    print(f"    {raw}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
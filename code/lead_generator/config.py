@@ -37,15 +37,138 @@ class Config:
     OPENAI_MODEL_MINI = "gpt-4o-mini"
     OPENAI_MODEL_MAIN = "gpt-4o"
     OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+    # USD per 1M (input, output) tokens, for cost reporting only
+    MODEL_PRICES = {
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4o-mini": (0.15, 0.60),
+    }
     PERPLEXITY_MODEL = "sonar-pro"
 
     # Application Settings
     RSS_BATCH_SIZE = 1
     FILTER_BATCH_SIZE = 20
+    SCORING_BATCH_SIZE = 1       # Leads per virality/brand request (1 = one lead per call);
+                                 # check benchmarks/batch_scoring_calibration.py before raising
+    SCORING_MODE = "two_stage"   # "two_stage" (virality, then brand for survivors) or
+                                 # "fused" (both scores in one call, thresholds applied locally)
+    # Model cascade: score with OPENAI_MODEL_MINI first and re-score with
+    # OPENAI_MODEL_MAIN only when the cheap score lands in the stage's band,
+    # i.e. threshold - below <= score < threshold + above
+    CASCADE_ENABLED = False
+    CASCADE_BANDS = {
+        "virality": (10, 6),     # (below, above) VIRALITY_THRESHOLD
+        "brand": (10, 8),        # (below, above) BRAND_THRESHOLD
+    }
     SIMILARITY_THRESHOLD = 0.75  # 85% similar = duplicate (strict)
+    # Verdict retention in processed_urls (days; None = never re-evaluate)
+    GATEKEEPER_REJECTION_TTL_DAYS = 90   # Re-judge gatekeeper rejections after this
+    EMBEDDING_FAILURE_TTL_DAYS = 1       # Retry items whose embedding failed
+    SCORING_FAILURE_TTL_DAYS = 1         # Retry items whose virality / brand call failed
+    GATEKEEPER_FAILURE_TTL_DAYS = 1      # Retry items whose gatekeeper call failed
+    FAILED_CANDIDATE_MAX_RETRIES = 3     # Failed items are re-ingested (retry_candidates, migration_v11.sql)
+                                         # at most this many times
+
+    # Lexical near-duplicate prefilter (MinHash over cleaned title + summary)
+    NEAR_DUP_ENABLED = True
+    NEAR_DUP_THRESHOLD = 0.8       # Estimated Jaccard of word shingles to call a duplicate
+    NEAR_DUP_MIN_TOKENS = 6        # Shorter texts are too generic to call duplicates
+    NEAR_DUP_RETENTION_DAYS = 30   # Signatures older than this are pruned
+    # Reuse verdicts of near-identical, already-scored candidates (scored_candidates table)
+    SCORE_REUSE_ENABLED = True
+    SCORE_REUSE_THRESHOLD = 0.92   # Cosine similarity to inherit a past candidate's scores
+
+    # Local prescorer: ridge regression over embeddings, trained on past
+    # virality scores (python main.py train-prescorer, see logic/prescorer.py)
+    PRESCORER_ENABLED = True        # Used only once a model has been trained
+    PRESCORER_SHADOW = True         # Log predicted vs actual scores, never reject
+    PRESCORER_CONFIDENCE = 0.98     # Reject only if below VIRALITY_THRESHOLD with this confidence
+    PRESCORER_MIN_TRAINING_ROWS = 200
+    PRESCORER_REJECTION_TTL_DAYS = 30   # Re-evaluate auto-rejections after this (the model improves)
+    PRESCORER_PATH = Path(__file__).resolve().parent / ".cache" / "prescorer.npz"
+
+    # When the same story arrives from several sources in one run, keep the
+    # copy whose source_origin prefix comes first here
+    SOURCE_PRIORITY = ["RSS:", "Perplexity:", "Reddit:"]
     VIRALITY_THRESHOLD = 78      # Stories must score 80+ virality to proceed
     BRAND_THRESHOLD = 70         # Stories must score 70+ brand fit to be saved
     
+    # Embeddings
+    EMBEDDING_BATCH_SIZE = 100             # Texts per embeddings request
+    EMBEDDING_BATCH_TOKEN_BUDGET = 250_000 # Estimated tokens per request (API hard limit is 300k)
+    EMBEDDING_MAX_INPUT_CHARS = 24_000     # ~8k tokens; longer texts are truncated
+    # Compact mode: request reduced-dimension embeddings and store them as
+    # halfvec in leads.embedding_compact (see migration_v5.sql)
+    EMBEDDING_COMPACT = False
+    EMBEDDING_COMPACT_DIMENSIONS = 512
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_PATH = Path(__file__).resolve().parent / ".cache" / "embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES = 50_000   # LRU-evicted beyond this (~6KB each at 1536 dims)
+
+    # RSS Ingestion
+    RSS_ASYNC = True                 # Fetch all feeds concurrently over a shared client
+    RSS_TIMEOUT = 15.0               # Per-request timeout (seconds)
+    RSS_CONCURRENCY = 16             # Max feeds in flight at once (global cap)
+    RSS_PER_HOST_CONCURRENCY = 4     # Default max in-flight requests per host
+    RSS_HOST_LIMITS = {              # Hosts serving several of our feeds get tighter caps
+        "reddit.com": 2,
+        "phys.org": 2,
+    }
+    RSS_MAX_RETRIES = 2              # Retries after a 429 / 503 response
+    RSS_MAX_RETRY_AFTER = 60.0       # Never sleep longer than this on a Retry-After header
+
+    # Perplexity discovery: each run searches this many of the least recently
+    # searched topics at once (query generation -> search -> normalize per topic)
+    PERPLEXITY_TOPICS_PER_RUN = 3
+    PERPLEXITY_CONCURRENCY = 3       # Searches in flight at once
+    PERPLEXITY_RPM_LIMIT = 40        # Requests/min budget (Perplexity's own limit, separate from OpenAI's)
+    PERPLEXITY_TIMEOUT = 60.0        # Per-request timeout (seconds)
+    PERPLEXITY_LOCAL_PARSE = True    # Parse answers locally (JSON / markdown list); the LLM normalizer
+                                     # runs only when that finds no story with a title and URL
+
+    # Chat response cache (code/llm_cache, shared with the other packages);
+    # only call sites that pass cache=True use it. LLM_CACHE_DISABLED=1 in the
+    # environment turns it off everywhere.
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_TTL_DAYS = 7
+    LLM_CACHE_MAX_ENTRIES = 20_000
+
+    # Async LLM engine (gatekeeper / virality / brand fan out through it)
+    LLM_ASYNC = True                 # False = one call at a time on the sync client
+    LLM_CONCURRENCY = 16             # Max chat completions in flight at once
+    LLM_RPM_LIMIT = 450              # Requests/min budget (keep ~10% under the org limit)
+    LLM_TPM_LIMIT = 450_000          # Tokens/min budget (prompt + expected completion)
+    LLM_EXPECTED_COMPLETION_TOKENS = 300  # Reserved per call until real usage is known
+    LLM_MAX_RETRIES = 5              # Retries after a 429 / 5xx / timeout
+    LLM_MAX_BACKOFF = 60.0           # Longest pause after a 429 (seconds)
+    LLM_TIMEOUT = 60.0               # Per-request timeout (seconds)
+    
+    # Offline scoring through the Batch API (python main.py run --mode batch,
+    # then python main.py collect); results arrive within 24h at half price
+    BATCH_API_BASE_URL = os.getenv("BATCH_API_BASE_URL")  # None = api.openai.com; see services/fake_batch_api.py
+    BATCH_DIR = Path(__file__).resolve().parent / ".cache" / "batches"   # Submitted request JSONL files
+    BATCH_PENDING_TTL_DAYS = 2       # Candidates in an uncollected batch are re-ingested after this
+    BATCH_POLL_SECONDS = 60          # collect --wait: seconds between status checks
+
+    # Streaming pipeline (python main.py run --mode stream): stages overlap,
+    # linked by bounded queues, so a slow stage holds back ingestion
+    STREAM_QUEUE_SIZE = 200          # Candidates buffered between two stages
+    STREAM_BATCH_WAIT = 2.0          # Seconds a stage waits to fill a micro-batch
+    STREAM_EMBED_BATCH_SIZE = 50     # Candidates per embedding / dedup / prescore micro-batch
+    STREAM_SCORE_BATCH_SIZE = 20     # Candidates per scoring micro-batch
+    STREAM_GATEKEEPER_WORKERS = 4    # Concurrent micro-batches per stage
+    STREAM_EMBED_WORKERS = 1         # Keep at 1: in-run semantic dedup compares against earlier batches
+    STREAM_SCORE_WORKERS = 4
+    STREAM_BRAND_WORKERS = 2
+
+    # Buffered writes: saved leads and processed-URL verdicts are committed in
+    # bulk (one transaction per WRITE_BUFFER_ROWS rows or WRITE_BUFFER_SECONDS)
+    # instead of one commit each; the buffer is always flushed when a run ends
+    WRITE_BUFFER_ENABLED = True
+    WRITE_BUFFER_ROWS = 500
+    WRITE_BUFFER_SECONDS = 5.0
+    WRITE_BUFFER_MAX_ATTEMPTS = 3    # Failed flushes in a row (connection errors) before the run fails;
+                                     # rows the database rejects are dropped and logged instead
+
     # Testing / Limits
     MAX_CANDIDATES = None         # Set to None for unlimited, or a number to cap ingestion
     
@@ -1,12 +1,213 @@
+import io
+import json
+import struct
+import time
+import uuid
+from datetime import datetime, timezone
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.extras import Json, RealDictCursor, execute_values
 from tenacity import retry, stop_after_attempt, wait_exponential
 from config import Config
 from utils.logger import logger
+from utils.urls import canonicalize_url
+
+
+class Vector:
+    """
+    A pgvector value backed by a float32 NumPy array.
+    Writes and batched lookups send it through binary COPY as packed
+    big-endian floats, exactly as pgvector's vector_recv / halfvec_recv
+    expect; to_text() gives the compact literal (9 significant digits
+    round-trips float32 exactly, no spaces) for the odd one-off query. pg_type is 'vector' (float4) or 'halfvec' (float2).
+    """
+    __slots__ = ("values", "pg_type")
+    _formats: dict[int, str] = {}
+
+    def __init__(self, values, pg_type: str = "vector"):
+        self.values = np.asarray(values, dtype=np.float32)
+        self.pg_type = pg_type
+
+    def to_text(self) -> str:
+        dims = len(self.values)
+        fmt = self._formats.get(dims)
+        if fmt is None:
+            fmt = self._formats[dims] = "[" + ",".join(["%.9g"] * dims) + "]"
+        return fmt % tuple(self.values.tolist())
+
+    def to_binary(self) -> bytes:
+        # uint16 dimensions, uint16 unused, then float4 / float2 values (network byte order)
+        dtype = ">f2" if self.pg_type == "halfvec" else ">f4"
+        return struct.pack(">HH", len(self.values), 0) + self.values.astype(dtype).tobytes()
+
+
+def embedding_storage() -> tuple[str, str]:
+    """
+    (leads column, pgvector type) embeddings are stored and searched in.
+    """
+    if Config.EMBEDDING_COMPACT:
+        return "embedding_compact", "halfvec"
+    return "embedding", "vector"
+
+
+def parse_vector(text: str) -> np.ndarray:
+    """
+    Parses a pgvector / halfvec text value ('[0.1,0.2,...]') into float32.
+    """
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+def _json_default(value):
+    # Candidates carry datetimes (published_at) and NumPy values (embeddings, predictions)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _json(value) -> Json:
+    return Json(value, dumps=lambda v: json.dumps(v, default=_json_default))
+
+
+def _restore_candidate(candidate: dict) -> dict:
+    # Inverse of _json_default for the fields insert_leads needs typed
+    if candidate.get('published_at'):
+        candidate['published_at'] = datetime.fromisoformat(candidate['published_at'])
+    return candidate
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def _encode_copy_field(value) -> bytes:
+    """
+    Encodes one value in PostgreSQL's binary COPY format. Supports the column
+    types we bulk-load: vector, int4, uuid, timestamptz and text.
+    """
+    if value is None:
+        return struct.pack(">i", -1)
+    if isinstance(value, Vector):
+        data = value.to_binary()
+    elif isinstance(value, bool):
+        data = struct.pack(">?", value)
+    elif isinstance(value, int):
+        data = struct.pack(">i", value)
+    elif isinstance(value, uuid.UUID):
+        data = value.bytes
+    elif isinstance(value, datetime):
+        # Naive datetimes (feedparser) are UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        delta = value - PG_EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+        data = struct.pack(">q", micros)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+    else:
+        raise TypeError(f"Cannot COPY value of type {type(value).__name__}")
+    return struct.pack(">i", len(data)) + data
+
+
+def copy_binary(cur, table: str, columns: tuple, rows: list[tuple]):
+    """
+    Bulk-loads rows with COPY ... FROM STDIN (FORMAT binary).
+    """
+    buf = io.BytesIO()
+    buf.write(PGCOPY_HEADER)
+    field_count = struct.pack(">h", len(columns))
+    for row in rows:
+        buf.write(field_count)
+        for value in row:
+            buf.write(_encode_copy_field(value))
+    buf.write(struct.pack(">h", -1))
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)", buf)
+
+
+class WriteBuffer:
+    """
+    Leads and processed-URL verdicts waiting to be written. Database.flush()
+    sends them in one transaction (a binary COPY of the leads, one upsert of
+    the verdicts) once max_rows have piled up or the oldest has waited
+    max_seconds, and at the end of a run. A lead and its 'saved' verdict
+    always commit together, so a crash never leaves one without the other.
+    After a failed flush the next attempt waits max_seconds.
+    """
+
+    def __init__(self, max_rows: int, max_seconds: float):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.leads: list[tuple[uuid.UUID, dict]] = []
+        # url -> (stage, verdict, reason, ttl_days); a later verdict replaces an earlier one
+        self.urls: dict[str, tuple] = {}
+        self.oldest: float = None
+        self.retry_at: float = None
+        self.failures = 0        # Failed flushes in a row (connection errors)
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self.leads) + len(self.urls)
+
+    def touch(self):
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+
+    def due(self) -> bool:
+        if self.retry_at is not None and time.monotonic() < self.retry_at:
+            return False
+        return self.pending >= self.max_rows or (
+            self.oldest is not None and time.monotonic() - self.oldest >= self.max_seconds
+        )
+
+    def clear(self):
+        self.rows_written += self.pending
+        self.flushes += 1
+        self.leads = []
+        self.urls = {}
+        self.oldest = None
+        self.retry_at = None
+        self.failures = 0
+
+    def failed(self):
+        self.failures += 1
+        self.retry_at = time.monotonic() + self.max_seconds
+
+    def stats(self) -> str:
+        stats = f"{self.rows_written} rows in {self.flushes} commits"
+        if self.rows_dropped:
+            stats += f", {self.rows_dropped} rows rejected"
+        return stats
+
+
+# Processed-URL upsert; a NULL ttl_days gives a NULL expires_at (kept forever)
+PROCESSED_URLS_UPSERT = """
+INSERT INTO processed_urls (url, stage, verdict, reason, expires_at)
+VALUES %s
+ON CONFLICT (url) DO UPDATE SET
+    stage = EXCLUDED.stage,
+    verdict = EXCLUDED.verdict,
+    reason = EXCLUDED.reason,
+    expires_at = EXCLUDED.expires_at,
+    processed_at = NOW()
+"""
+PROCESSED_URLS_TEMPLATE = "(%s, %s, %s, %s, NOW() + %s::float8 * INTERVAL '1 day')"
+
+# Errors that say nothing about the rows themselves; buffered rows are kept
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
 
 class Database:
     def __init__(self):
         self.conn = None
+        self.write_buffer = (
+            WriteBuffer(Config.WRITE_BUFFER_ROWS, Config.WRITE_BUFFER_SECONDS)
+            if Config.WRITE_BUFFER_ENABLED else None
+        )
 
     def connect(self):
         if self.conn is None or self.conn.closed:
@@ -28,9 +229,97 @@ class Database:
         return self.conn.cursor(cursor_factory=RealDictCursor)
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
+        """
+        Flushes buffered writes, then closes the connection.
+        """
+        try:
+            self.flush()
+        finally:
+            if self.conn:
+                self.conn.close()
+                logger.info("Database connection closed")
+
+    def flush(self):
+        """
+        Writes every buffered lead and processed-URL verdict in one
+        transaction. If that fails, the rows are written one at a time (a
+        lead together with its verdict), and rows the database rejects are
+        logged and dropped, so one bad row never holds back the rest.
+        A connection error keeps the unwritten rows buffered and is raised.
+        """
+        buffer = self.write_buffer
+        if buffer is None or not buffer.pending:
+            return
+        try:
+            self._write_buffered(buffer.leads, buffer.urls)
+        except Exception as e:
+            self._rollback()
+            logger.error(f"Flushing {len(buffer.leads)} leads and {len(buffer.urls)} URL verdicts failed: {e}")
+            if isinstance(e, CONNECTION_ERRORS):
+                buffer.failed()
+                raise
+            self._flush_rows(buffer)
+        buffer.clear()
+
+    def _flush_if_due(self):
+        # Connection errors are retried by later flushes, up to WRITE_BUFFER_MAX_ATTEMPTS in a row
+        if not self.write_buffer.due():
+            return
+        try:
+            self.flush()
+        except CONNECTION_ERRORS:
+            if self.write_buffer.failures >= Config.WRITE_BUFFER_MAX_ATTEMPTS:
+                raise
+            logger.warning(f"Keeping {self.write_buffer.pending} buffered rows for the next flush "
+                           f"(attempt {self.write_buffer.failures}/{Config.WRITE_BUFFER_MAX_ATTEMPTS})")
+
+    def _flush_rows(self, buffer: WriteBuffer):
+        """
+        flush() fallback: one transaction per lead (with its verdict), then
+        one per remaining verdict. Stops at a connection error, leaving the
+        unwritten rows in the buffer.
+        """
+        while buffer.leads:
+            lead_id, lead = buffer.leads[0]
+            key = canonicalize_url(lead.get('url'))
+            urls = {key: buffer.urls[key]} if key in buffer.urls else {}
+            buffer.rows_written += self._write_or_drop(f"lead {lead.get('url')}", buffer.leads[:1], urls)
+            buffer.leads.pop(0)
+            for url in urls:
+                del buffer.urls[url]
+        for url in list(buffer.urls):
+            buffer.rows_written += self._write_or_drop(f"verdict for {url}", [], {url: buffer.urls[url]})
+            del buffer.urls[url]
+
+    def _write_or_drop(self, label: str, leads: list, urls: dict) -> int:
+        # Returns the number of rows written
+        try:
+            self._write_buffered(leads, urls)
+        except CONNECTION_ERRORS:
+            self._rollback()
+            self.write_buffer.failed()
+            raise
+        except Exception as e:
+            self._rollback()
+            self.write_buffer.rows_dropped += len(leads) + len(urls)
+            logger.error(f"Dropped buffered {label}: {e}")
+            return 0
+        return len(leads) + len(urls)
+
+    def _write_buffered(self, leads: list, urls: dict):
+        # leads: (id, lead) pairs; urls: url -> (stage, verdict, reason, ttl_days)
+        with self.get_cursor() as cur:
+            if leads:
+                column, pg_type = embedding_storage()
+                copy_binary(cur, "leads", self._lead_columns(column), self._lead_rows(leads, pg_type))
+            if urls:
+                values = [(url, *verdict) for url, verdict in urls.items()]
+                execute_values(cur, PROCESSED_URLS_UPSERT, values, template=PROCESSED_URLS_TEMPLATE)
+            self.conn.commit()
+
+    def _rollback(self):
+        if self.conn and not self.conn.closed:
+            self.conn.rollback()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def execute_query(self, query, params=None):
@@ -67,71 +356,538 @@ class Database:
 
     # --- Business Logic Methods ---
 
-    def check_url_exists(self, url: str) -> bool:
-        query = "SELECT count(*) as count FROM processed_urls WHERE url = %s"
-        result = self.fetch_one(query, (url,))
-        return result['count'] > 0
+    def filter_unprocessed_urls(self, urls: list[str]) -> list[str]:
+        """
+        Resolves the whole candidate list in one round-trip and returns the
+        URLs not yet in processed_urls, in input order.
+        Verdicts past their expires_at (e.g. old gatekeeper rejections) count
+        as unprocessed, so those items are judged again.
+        processed_urls is keyed by canonical URL (utils/urls.py), so any
+        variant of a processed URL counts as processed. The raw URL is
+        looked up too, for rows written before `main.py migrate-urls`.
+        """
+        if not urls:
+            return []
+        keys = {url: canonicalize_url(url) for url in urls}
+        query = """
+        SELECT url FROM processed_urls
+        WHERE url = ANY(%s) AND (expires_at IS NULL OR expires_at > NOW())
+        """
+        lookup = list(set(keys.values()) | set(urls))
+        seen = {row['url'] for row in self.fetch_all(query, (lookup,))}
+        if self.write_buffer:
+            seen.update(key for key in keys.values() if key in self.write_buffer.urls)
+        return [url for url in urls if keys[url] not in seen and url not in seen]
+
+    def mark_url_processed(self, url: str, stage: str = None, verdict: str = None,
+                           reason: str = None, ttl_days: int = None):
+        self.mark_urls_processed([url], stage, verdict, reason, ttl_days)
 
-    def mark_url_processed(self, url: str):
-        query = "INSERT INTO processed_urls (url) VALUES (%s) ON CONFLICT DO NOTHING"
-        self.execute_query(query, (url,))
+    def mark_urls_processed(self, urls: list[str], stage: str = None, verdict: str = None,
+                            reason: str = None, ttl_days: int = None):
+        """
+        Records that URLs were handled, with the stage that decided them and
+        its verdict. ttl_days makes the record expire so the item is
+        re-evaluated later; None keeps it forever. With WRITE_BUFFER_ENABLED
+        the records are buffered until the next flush(). URLs are stored
+        canonicalized.
+        """
+        urls = [canonicalize_url(u) for u in urls if u]
+        if not urls:
+            return
+        ttl_days = ttl_days or None
+        if self.write_buffer:
+            self.write_buffer.touch()
+            for u in urls:
+                self.write_buffer.urls[u] = (stage, verdict, reason, ttl_days)
+            self._flush_if_due()
+            return
+        values = [(u, stage, verdict, reason, ttl_days) for u in dict.fromkeys(urls)]
+        with self.get_cursor() as cur:
+            execute_values(cur, PROCESSED_URLS_UPSERT, values, template=PROCESSED_URLS_TEMPLATE)
+            self.conn.commit()
 
-    def check_similarity(self, embedding: list[float], threshold: float = 0.85) -> bool:
+    def find_signature_candidates(self, buckets: list[int], retention_days: int) -> list[dict]:
         """
-        Checks if a similar lead exists. 
+        Returns recent content signatures sharing any LSH bucket with `buckets`
+        (GIN-indexed array overlap), as dicts with 'url' and 'minhash' bytes.
         """
-        distance_threshold = 1 - threshold
+        if not buckets:
+            return []
         query = """
-        SELECT 1 
-        FROM leads 
-        WHERE embedding <=> %s < %s 
-        LIMIT 1
+        SELECT url, minhash
+        FROM content_signatures
+        WHERE buckets && %s::bigint[]
+          AND created_at > NOW() - make_interval(days => %s)
         """
-        embedding_str = str(embedding)
-        result = self.fetch_one(query, (embedding_str, distance_threshold))
-        return result is not None
+        return self.fetch_all(query, (list(set(buckets)), retention_days))
 
-    def insert_lead(self, lead: dict) -> str:
+    def canonicalize_stored_urls(self) -> dict[str, int]:
+        """
+        One-off migration: rewrites processed_urls.url and
+        content_signatures.url to canonicalize_url(url). Rows that collapse
+        onto the same canonical URL are merged by keeping the newest one
+        (processed_at / created_at), verdict included. Runs in a single
+        transaction; returns {table: rows rewritten or merged away}.
+        """
+        changed = {}
+        with self.get_cursor() as cur:
+            for table, newest in (("processed_urls", "processed_at"), ("content_signatures", "created_at")):
+                cur.execute(f"SELECT url FROM {table}")
+                mapping = [(row['url'], canonicalize_url(row['url'])) for row in cur.fetchall()]
+                mapping = [(raw, canonical) for raw, canonical in mapping if canonical and canonical != raw]
+                changed[table] = len(mapping)
+                if not mapping:
+                    continue
+                cur.execute("CREATE TEMP TABLE url_map (raw text PRIMARY KEY, canonical text NOT NULL) ON COMMIT DROP")
+                execute_values(cur, "INSERT INTO url_map (raw, canonical) VALUES %s", mapping)
+                cur.execute(f"""
+                    WITH ranked AS (
+                        SELECT t.url, row_number() OVER (
+                            PARTITION BY COALESCE(m.canonical, t.url)
+                            ORDER BY t.{newest} DESC NULLS LAST
+                        ) AS rank
+                        FROM {table} t
+                        LEFT JOIN url_map m ON m.raw = t.url
+                        WHERE COALESCE(m.canonical, t.url) IN (SELECT canonical FROM url_map)
+                    )
+                    DELETE FROM {table} t USING ranked r WHERE t.url = r.url AND r.rank > 1
+                """)
+                cur.execute(f"UPDATE {table} t SET url = m.canonical FROM url_map m WHERE t.url = m.raw")
+                cur.execute("DROP TABLE url_map")
+            self.conn.commit()
+        return changed
+
+    def insert_signatures(self, signatures: list[tuple], retention_days: int):
+        """
+        signatures: list of (url, minhash bytes, bucket list); URLs are
+        stored canonicalized.
+        Also prunes signatures past the retention window.
+        """
+        if not signatures:
+            return
         query = """
-        INSERT INTO leads (title, url, summary, embedding, brand_score, virality_score, source_origin, published_at, status)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'new')
-        RETURNING id
+        INSERT INTO content_signatures (url, minhash, buckets)
+        VALUES %s
+        ON CONFLICT (url) DO NOTHING
         """
-        embedding_str = str(lead['embedding'])
-        
-        # We use execute_query directly to get the ID back
-        # Note: execute_query returns the cursor
+        values = [(canonicalize_url(url), psycopg2.Binary(sig), buckets) for url, sig, buckets in signatures]
         with self.get_cursor() as cur:
-            cur.execute(query, (
+            execute_values(cur, query, values)
+            cur.execute(
+                "DELETE FROM content_signatures WHERE created_at < NOW() - make_interval(days => %s)",
+                (retention_days,)
+            )
+            self.conn.commit()
+
+    def get_feed_states(self) -> dict[str, dict]:
+        """
+        Returns conditional-GET state for every known feed, keyed by feed URL.
+        """
+        rows = self.fetch_all("SELECT feed_url, etag, last_modified, content_hash, last_entry_at FROM feed_state")
+        return {row['feed_url']: dict(row) for row in rows}
+
+    def upsert_feed_states(self, states: list[dict]):
+        """
+        states: list of dicts with 'feed_url', 'etag', 'last_modified',
+        'content_hash' and 'last_entry_at' (naive datetimes are UTC).
+        """
+        if not states:
+            return
+
+        query = """
+        INSERT INTO feed_state (feed_url, etag, last_modified, content_hash, last_entry_at)
+        VALUES %s
+        ON CONFLICT (feed_url) DO UPDATE SET
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            content_hash = EXCLUDED.content_hash,
+            last_entry_at = EXCLUDED.last_entry_at,
+            updated_at = NOW()
+        """
+        values = []
+        for s in states:
+            last_entry_at = s.get('last_entry_at')
+            if last_entry_at is not None and last_entry_at.tzinfo is None:
+                last_entry_at = last_entry_at.replace(tzinfo=timezone.utc)
+            values.append((s['feed_url'], s.get('etag'), s.get('last_modified'), s.get('content_hash'), last_entry_at))
+
+        with self.get_cursor() as cur:
+            execute_values(cur, query, values)
+            self.conn.commit()
+
+    def nearest_leads(self, embeddings: list[list[float]]) -> list[dict]:
+        """
+        Batched nearest-neighbour lookup against leads in one round-trip.
+        Returns one {'lead_id', 'distance'} per embedding, in input order
+        (both None when leads is empty).
+        """
+        rows = self._nearest_neighbours("leads", ("id",), embeddings)
+        return [
+            {
+                "lead_id": str(row['id']) if row.get('id') else None,
+                "distance": row.get('distance'),
+            }
+            for row in rows
+        ]
+
+    def nearest_scored_candidates(self, embeddings: list[list[float]]) -> list[dict]:
+        """
+        Batched nearest-neighbour lookup against scored_candidates.
+        Returns one dict per embedding with the neighbour's 'id', 'distance',
+        scores and verdict (all None when there is no neighbour).
+        """
+        columns = ("id", "virality_score", "hook_analysis", "brand_score", "reasoning", "verdict")
+        rows = self._nearest_neighbours("scored_candidates", columns, embeddings)
+        for row in rows:
+            if row.get('id'):
+                row['id'] = str(row['id'])
+        return rows
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _nearest_neighbours(self, table: str, columns: tuple, embeddings: list[list[float]]) -> list[dict]:
+        """
+        Candidate embeddings are binary-COPYed into a temp table, then each
+        gets a LATERAL ORDER BY <=> LIMIT 1 probe, which the HNSW index serves.
+        Returns one dict of `columns` + 'distance' per embedding, in input order.
+        """
+        if not embeddings:
+            return []
+
+        column, pg_type = embedding_storage()
+        selected = ", ".join(f"n.{c}" for c in columns)
+        query = f"""
+        SELECT c.idx, {selected}, n.distance
+        FROM candidate_embeddings c
+        LEFT JOIN LATERAL (
+            SELECT {", ".join(columns)}, {column} <=> c.embedding AS distance
+            FROM {table}
+            WHERE {column} IS NOT NULL
+            ORDER BY {column} <=> c.embedding
+            LIMIT 1
+        ) n ON true
+        """
+        try:
+            with self.get_cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE candidate_embeddings (idx int, embedding {pg_type}) ON COMMIT DROP")
+                copy_binary(cur, "candidate_embeddings", ("idx", "embedding"),
+                            [(i, Vector(e, pg_type)) for i, e in enumerate(embeddings)])
+                cur.execute(query)
+                rows = cur.fetchall()
+                self.conn.commit()
+        except Exception as e:
+            if self.conn:
+                self.conn.rollback()
+            logger.warning(f"Nearest-neighbour lookup on {table} failed: {e}")
+            raise
+
+        results = [dict.fromkeys(columns + ("distance",)) for _ in embeddings]
+        for row in rows:
+            results[row['idx']] = {key: row[key] for key in columns + ("distance",)}
+        return results
+
+    def insert_scored_candidates(self, candidates: list[dict]):
+        """
+        Remembers every scored candidate (embedding + scores + verdict), so a
+        near-duplicate arriving later under another URL can reuse the verdict.
+        URLs are stored canonicalized.
+        """
+        if not candidates:
+            return
+        column, pg_type = embedding_storage()
+        columns = ("url", "title", column, "virality_score", "hook_analysis",
+                   "brand_score", "reasoning", "verdict")
+        rows = [
+            (
+                canonicalize_url(c['url']),
+                c.get('title'),
+                Vector(c['embedding'], pg_type),
+                int(c['virality_score']),
+                c.get('hook_analysis'),
+                int(c['brand_score']) if c.get('brand_score') is not None else None,
+                c.get('reasoning'),
+                c['verdict'],
+            )
+            for c in candidates
+        ]
+        try:
+            with self.get_cursor() as cur:
+                copy_binary(cur, "scored_candidates", columns, rows)
+                self.conn.commit()
+        except Exception as e:
+            if self.conn:
+                self.conn.rollback()
+            logger.error(f"Scored-candidate insert failed: {e}")
+            raise
+
+    def get_scoring_history(self) -> list[dict]:
+        """
+        Every past candidate with an embedding and a virality score, as
+        training data for the prescorer: scored_candidates (saved and
+        rejected) plus leads saved before scored_candidates existed.
+        Embeddings come back as text (see parse_vector).
+        Leads keep their original URL while scored_candidates stores the
+        canonical one, so leads already in scored_candidates are dropped here.
+        """
+        column, _ = embedding_storage()
+        scored = self.fetch_all(f"""
+            SELECT url, {column}::text AS embedding, virality_score, brand_score
+            FROM scored_candidates
+            WHERE {column} IS NOT NULL AND virality_score IS NOT NULL
+        """)
+        leads = self.fetch_all(f"""
+            SELECT url, {column}::text AS embedding, virality_score, brand_score
+            FROM leads
+            WHERE {column} IS NOT NULL AND virality_score IS NOT NULL
+        """)
+        known = {canonicalize_url(row['url']) for row in scored}
+        return scored + [row for row in leads if canonicalize_url(row['url']) not in known]
+
+    def insert_lead(self, lead: dict) -> str:
+        """
+        Inserts one lead and returns its id. With WRITE_BUFFER_ENABLED the
+        row is buffered until the next flush(); the id is generated here,
+        so it is final either way.
+        """
+        if not self.write_buffer:
+            return self.insert_leads([lead])[0]
+        lead_id = uuid.uuid4()
+        self.write_buffer.touch()
+        self.write_buffer.leads.append((lead_id, lead))
+        self._flush_if_due()
+        return str(lead_id)
+
+    def insert_leads(self, leads: list[dict]) -> list[str]:
+        """
+        Inserts leads with one binary COPY (embeddings as packed floats).
+        Ids are generated client-side so they map back to inputs exactly.
+        Returns the new ids in input order.
+        """
+        if not leads:
+            return []
+
+        column, pg_type = embedding_storage()
+        ids = [uuid.uuid4() for _ in leads]
+        rows = self._lead_rows(zip(ids, leads), pg_type)
+
+        try:
+            with self.get_cursor() as cur:
+                copy_binary(cur, "leads", self._lead_columns(column), rows)
+                self.conn.commit()
+        except Exception as e:
+            if self.conn:
+                self.conn.rollback()
+            logger.error(f"Lead insert failed: {e}")
+            raise
+        return [str(i) for i in ids]
+
+    @staticmethod
+    def _lead_columns(embedding_column: str) -> tuple:
+        return ("id", "title", "url", "summary", embedding_column, "brand_score",
+                "virality_score", "source_origin", "published_at", "status")
+
+    @staticmethod
+    def _lead_rows(leads, pg_type: str) -> list[tuple]:
+        # leads: (id, lead) pairs, in _lead_columns order
+        return [
+            (
+                lead_id,
                 lead['title'],
                 lead['url'],
                 lead['summary'],
-                embedding_str,
-                lead['brand_score'],
-                lead['virality_score'],
+                Vector(lead['embedding'], pg_type),
+                int(lead['brand_score']),
+                int(lead['virality_score']),
                 lead['source_origin'],
-                lead.get('published_at')
-            ))
-            lead_id = cur.fetchone()['id']
-            self.conn.commit()
-            return str(lead_id)
+                lead.get('published_at'),
+                'new',
+            )
+            for lead_id, lead in leads
+        ]
+
+    def insert_scoring_batch(self, batch_id: str, scoring_mode: str, model: str,
+                             candidates: list[dict], run_stats: dict):
+        """
+        Persists a submitted Batch API job with everything needed to resume
+        the workflow from PHASE 5 once results are in: the candidates
+        (embeddings included) and the run's funnel counts so far.
+        """
+        query = """
+        INSERT INTO scoring_batches (id, scoring_mode, model, candidates, run_stats)
+        VALUES (%s, %s, %s, %s, %s)
+        """
+        self.execute_query(query, (batch_id, scoring_mode, model, _json(candidates), _json(run_stats)))
 
-    def get_active_discovery_topics(self) -> list[dict]:
+    def queue_retry_candidates(self, candidates: list[dict], stage: str, ttl_days: float):
+        """
+        Stores candidates whose `stage` call failed, to be re-ingested by the
+        first run after ttl_days (their feed will not emit them again).
+        """
+        if not candidates:
+            return
+        query = """
+        INSERT INTO retry_candidates (url, candidate, stage, retry_at)
+        VALUES %s
+        ON CONFLICT (url) DO UPDATE SET
+            candidate = EXCLUDED.candidate,
+            stage = EXCLUDED.stage,
+            retry_at = EXCLUDED.retry_at
+        """
+        values = {canonicalize_url(c['url']): (canonicalize_url(c['url']), _json(c), stage, ttl_days)
+                  for c in candidates if c.get('url')}
+        try:
+            with self.get_cursor() as cur:
+                execute_values(cur, query, list(values.values()),
+                               template="(%s, %s, %s, NOW() + %s::float8 * INTERVAL '1 day')")
+                self.conn.commit()
+        except Exception:
+            self._rollback()
+            raise
+
+    def take_retry_candidates(self) -> list[dict]:
+        """
+        Removes and returns the retry candidates that are due, with
+        published_at restored. Their 'failed' processed_urls verdicts are
+        cleared in the same transaction, so URL dedup lets them through.
+        """
+        try:
+            with self.get_cursor() as cur:
+                cur.execute("DELETE FROM retry_candidates WHERE retry_at <= NOW() RETURNING url, candidate")
+                rows = cur.fetchall()
+                if rows:
+                    cur.execute("DELETE FROM processed_urls WHERE url = ANY(%s) AND verdict = 'failed'",
+                                ([row['url'] for row in rows],))
+                self.conn.commit()
+        except Exception:
+            self._rollback()
+            raise
+        return [_restore_candidate(row['candidate']) for row in rows]
+
+    def get_pending_scoring_batches(self, batch_id: str = None) -> list[dict]:
+        """
+        Submitted batches not yet collected (or just batch_id), oldest first,
+        with candidates' published_at restored to datetimes.
+        """
         query = """
-        SELECT * FROM discovery_topics 
-        WHERE status = 'active' 
-        ORDER BY last_searched_at ASC NULLS FIRST 
-        LIMIT 1
+        SELECT id, scoring_mode, model, candidates, run_stats, created_at
+        FROM scoring_batches
+        WHERE status = 'submitted' AND (%s::text IS NULL OR id = %s)
+        ORDER BY created_at
         """
-        return self.fetch_all(query)
+        rows = self.fetch_all(query, (batch_id, batch_id))
+        for row in rows:
+            row['candidates'] = [_restore_candidate(c) for c in row['candidates']]
+        return rows
 
-    def update_topic_last_searched(self, topic_id: str):
+    def mark_scoring_batch(self, batch_id: str, status: str):
         query = """
-        UPDATE discovery_topics 
-        SET last_searched_at = NOW() 
-        WHERE id = %s
+        UPDATE scoring_batches SET status = %s, collected_at = NOW() WHERE id = %s
         """
-        self.execute_query(query, (topic_id,))
+        self.execute_query(query, (status, batch_id))
+
+    def start_pipeline_run(self, source: str, mode: str) -> str:
+        run_id = str(uuid.uuid4())
+        query = """
+        INSERT INTO pipeline_runs (id, source, mode, status, stats) VALUES (%s, %s, %s, 'running', '{}')
+        """
+        self.execute_query(query, (run_id, source, mode))
+        return run_id
+
+    def checkpoint_candidates(self, run_id: str, stage: str, leads: list[dict], stats: dict, keys: tuple = None):
+        """
+        Journals that leads completed `stage` in this run, with their state
+        (embeddings, scores, ...). keys limits the write to those fields,
+        merged into the state already stored. The run's counts so far are
+        saved in the same transaction.
+        """
+        values = [
+            (run_id, lead['url'], stage,
+             _json({k: lead.get(k) for k in keys} if keys else lead))
+            for lead in leads if lead.get('url')
+        ]
+        try:
+            with self.get_cursor() as cur:
+                if values:
+                    execute_values(cur, """
+                    INSERT INTO pipeline_candidates (run_id, url, stage, state)
+                    VALUES %s
+                    ON CONFLICT (run_id, url) DO UPDATE SET
+                        stage = EXCLUDED.stage,
+                        state = pipeline_candidates.state || EXCLUDED.state,
+                        updated_at = NOW()
+                    """, values)
+                cur.execute(
+                    "UPDATE pipeline_runs SET stage = %s, stats = %s, updated_at = NOW() WHERE id = %s",
+                    (stage, _json(stats), run_id)
+                )
+                self.conn.commit()
+        except Exception:
+            if self.conn:
+                self.conn.rollback()
+            raise
+
+    def get_pipeline_run(self, run_id: str) -> dict:
+        return self.fetch_one("SELECT * FROM pipeline_runs WHERE id = %s", (run_id,))
+
+    def get_run_candidates(self, run_id: str) -> list[dict]:
+        """
+        [{'stage', 'state'}] for every candidate journaled in a run, in the
+        order they were first recorded.
+        """
+        rows = self.fetch_all("""
+            SELECT stage, state FROM pipeline_candidates WHERE run_id = %s ORDER BY seq
+        """, (run_id,))
+        for row in rows:
+            row['state'] = _restore_candidate(row['state'])
+        return rows
+
+    def finish_pipeline_run(self, run_id: str, status: str, stats: dict, error: str = None):
+        """
+        Records how a run ended. The candidate journal is only kept for
+        failed runs (to resume them); otherwise it is cleared. Buffered
+        writes are flushed first, so a finished run's verdicts are stored.
+        """
+        self.flush()
+        with self.get_cursor() as cur:
+            cur.execute("""
+                UPDATE pipeline_runs
+                SET status = %s, stats = %s, error = %s, updated_at = NOW(),
+                    finished_at = CASE WHEN %s = 'failed' THEN NULL ELSE NOW() END
+                WHERE id = %s
+            """, (status, _json(stats), error, status, run_id))
+            if status != 'failed':
+                cur.execute("DELETE FROM pipeline_candidates WHERE run_id = %s", (run_id,))
+            self.conn.commit()
+
+    def get_active_discovery_topics(self, limit: int = 1) -> list[dict]:
+        """
+        Claims the `limit` least recently searched active topics
+        (never-searched first) by stamping last_searched_at in the same
+        statement. Rows another run has locked are skipped, so overlapping
+        runs never search the same topic.
+        """
+        query = """
+        UPDATE discovery_topics
+        SET last_searched_at = NOW()
+        WHERE id IN (
+            SELECT id FROM discovery_topics
+            WHERE status = 'active'
+            ORDER BY last_searched_at ASC NULLS FIRST
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+        """
+        try:
+            with self.get_cursor() as cur:
+                cur.execute(query, (limit,))
+                rows = cur.fetchall()
+                self.conn.commit()
+                return rows
+        except Exception as e:
+            self._rollback()
+            logger.error(f"Claiming discovery topics failed: {e}")
+            raise
 
     def insert_discovery_topics(self, topics: list[dict]):
         """
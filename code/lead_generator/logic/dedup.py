@@ -0,0 +1,154 @@
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from config import config
+from utils.minhash import MinHashIndex, band_buckets, minhash, tokenize
+from utils.text import clean_text
+from utils.urls import canonicalize_url
+
+
+def source_priority(lead: Dict[str, Any]) -> int:
+    """
+    Rank of a lead's source in SOURCE_PRIORITY (lower is preferred).
+    Unknown sources rank last.
+    """
+    origin = lead.get('source_origin') or ""
+    for rank, prefix in enumerate(config.SOURCE_PRIORITY):
+        if origin.startswith(prefix):
+            return rank
+    return len(config.SOURCE_PRIORITY)
+
+
+def collapse_near_duplicates(leads: List[Dict[str, Any]],
+                             threshold: float) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Dict[str, Any], float]]]:
+    """
+    Collapses same-run near-duplicates to one representative per cluster.
+    All embeddings are stacked into one matrix and compared in a single
+    vectorized cosine-similarity pass. Leads are visited in source-priority
+    order; each unclaimed lead becomes a representative and claims every
+    unclaimed lead at or above `threshold` similarity.
+    Returns (representatives in input order, [(dropped, kept, similarity), ...]).
+    """
+    if len(leads) < 2:
+        return list(leads), []
+
+    matrix = _unit_rows(leads)
+    similarity = matrix @ matrix.T
+
+    order = sorted(range(len(leads)), key=lambda i: (source_priority(leads[i]), i))
+    claimed = np.zeros(len(leads), dtype=bool)
+    kept = []
+    dropped = []
+    for i in order:
+        if claimed[i]:
+            continue
+        claimed[i] = True
+        kept.append(i)
+        members = np.flatnonzero((similarity[i] >= threshold) & ~claimed)
+        claimed[members] = True
+        dropped.extend((leads[j], leads[i], float(similarity[i, j])) for j in members)
+
+    return [leads[i] for i in sorted(kept)], dropped
+
+
+class SeenEmbeddings:
+    """
+    Leads kept earlier in the same run (e.g. by previous streaming
+    batches), held as a growing float32 matrix of unit vectors plus each
+    lead's url and title, so a long run does not keep every lead dict.
+    """
+
+    def __init__(self):
+        self.matrix: Optional[np.ndarray] = None
+        self.keys: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, leads: List[Dict[str, Any]]):
+        if not leads:
+            return
+        rows = _unit_rows(leads)
+        count = len(self.keys)
+        if self.matrix is None or count + len(rows) > len(self.matrix):
+            # Grow by doubling so appends stay amortized O(1)
+            grown = np.empty((max(2 * (count + len(rows)), 64), rows.shape[1]), dtype=np.float32)
+            if count:
+                grown[:count] = self.matrix[:count]
+            self.matrix = grown
+        self.matrix[count : count + len(rows)] = rows
+        self.keys.extend({'url': lead.get('url'), 'title': lead.get('title')} for lead in leads)
+
+    def collapse(self, leads: List[Dict[str, Any]],
+                 threshold: float) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Dict[str, Any], float]]]:
+        """
+        Drops leads at or above `threshold` similarity to a seen lead. The
+        earlier lead always wins, whatever its source priority.
+        Returns (survivors, [(dropped, {'url', 'title'} of kept, similarity), ...]).
+        """
+        if not leads or not self.keys:
+            return list(leads), []
+
+        similarity = _unit_rows(leads) @ self.matrix[:len(self.keys)].T
+        best = similarity.argmax(axis=1)
+        survivors = []
+        dropped = []
+        for i, lead in enumerate(leads):
+            score = float(similarity[i, best[i]])
+            if score >= threshold:
+                dropped.append((lead, self.keys[best[i]], score))
+            else:
+                survivors.append(lead)
+        return survivors, dropped
+
+
+def _unit_rows(leads: List[Dict[str, Any]]) -> np.ndarray:
+    matrix = np.asarray([lead['embedding'] for lead in leads], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def lexical_signatures(leads: List[Dict[str, Any]], min_tokens: int) -> List[Optional[Tuple[np.ndarray, List[int]]]]:
+    """
+    MinHash signature and LSH buckets of each lead's cleaned title + summary.
+    None for texts shorter than min_tokens (too generic to judge).
+    """
+    signatures = []
+    for lead in leads:
+        tokens = tokenize(clean_text(f"{lead.get('title') or ''} {lead.get('summary') or ''}"))
+        if len(tokens) < min_tokens:
+            signatures.append(None)
+            continue
+        signature = minhash(tokens)
+        signatures.append((signature, band_buckets(signature)))
+    return signatures
+
+
+def collapse_lexical_duplicates(leads: List[Dict[str, Any]],
+                                signatures: List[Optional[Tuple[np.ndarray, List[int]]]],
+                                known: List[Tuple[str, np.ndarray]],
+                                threshold: float) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str, float]]]:
+    """
+    Drops leads whose text is a near-copy of a recently seen one (`known`,
+    as (canonical url, signature)) or of an earlier lead in this run.
+    A lead never matches its own URL, so a re-run after a crash is safe.
+    Returns (survivors, [(dropped, matched_url, estimated_jaccard), ...]).
+    """
+    index = MinHashIndex(threshold)
+    for url, signature in known:
+        index.add(url, signature)
+
+    survivors = []
+    dropped = []
+    for lead, entry in zip(leads, signatures):
+        if entry is None:
+            survivors.append(lead)
+            continue
+        signature, buckets = entry
+        key = canonicalize_url(lead['url']) if lead.get('url') else None
+        match = index.find(signature, buckets, exclude_key=key)
+        if match:
+            dropped.append((lead, match[0], match[1]))
+            continue
+        index.add(key, signature, buckets)
+        survivors.append(lead)
+    return survivors, dropped
@@ -1,19 +1,46 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from functools import partial
 from services.llm import llm
+from logic.perplexity_parser import parse_stories
 from utils.logger import logger
 from config import config
+from utils.text import normalize_url
+import asyncio
 import json
 import datetime
+import time
 import re
 
 class Filters:
-    def __init__(self):
-        pass
+    # Output fields (key, placeholder) and closing calibration line per scoring stage
+    VIRALITY_FIELDS = [
+        ("virality_score", "<number 0-100>"),
+        ("hook_analysis", '"<1-2 sentences. What\'s the \'Wait. What?\' moment? Or why is there no clear hook?>"'),
+    ]
+    VIRALITY_CALIBRATION = "Be honest and critical. Most stories score 50-75. Reserve 85+ for genuinely exceptional, wide-appeal hooks."
+    BRAND_FIELDS = [
+        ("brand_score", "<number 0-100>"),
+        ("reasoning", '"<2-3 sentences. Be blunt. Does this have a clear \'Wait. What?\' moment? Is it accessible to non-experts? What works or doesn\'t?>"'),
+    ]
+    BRAND_CALIBRATION = "Be honest and critical. Most stories score 50-75. Reserve 90+ for genuinely exceptional brand fits."
 
-    def generate_search_query(self, topic: str) -> str:
+    def __init__(self):
+        # Leads a batched scoring response left out, re-scored one by one
+        self.batch_fallbacks = 0
+        # Per-stage totals for the run summary: leads, escalated, seconds, cost
+        self.stage_stats: Dict[str, Dict[str, float]] = {}
+        # Perplexity answers parsed locally vs. sent to the LLM normalizer
+        self.perplexity_parses = {"local": 0, "llm": 0}
+
+    async def generate_search_query_async(self, topic: str) -> str:
         """
         Generates a specific search query for a given topic.
+        Must run inside llm.async_session().
         """
+        system_prompt, user_prompt = self._search_query_prompts(topic)
+        return self._with_current_year(await llm.achat_completion(system_prompt, user_prompt, cache=True))
+
+    def _search_query_prompts(self, topic: str) -> Tuple[str, str]:
         current_year = datetime.datetime.now().year
         system_prompt = f"""You are an expert researcher for TheBoldUnknown — a publication that reveals the hidden strangeness woven through reality with stories that make people stop scrolling and think: "Wait. What?"
 
@@ -35,13 +62,15 @@ Examples:
 Output ONLY the search query string. No explanation, no quotes, just the query."""
         
         user_prompt = f"Topic: {topic}"
-        query = llm.chat_completion(system_prompt, user_prompt)
+        return system_prompt, user_prompt
 
+    @staticmethod
+    def _with_current_year(query: str) -> str:
         # Normalize year in the query so we always target the current year
         if not query:
             return query
 
-        year_str = str(current_year)
+        year_str = str(datetime.datetime.now().year)
         # Replace any explicit 20xx year with the current year
         query_normalized = re.sub(r"20[0-9]{2}", year_str, query)
 
@@ -51,11 +80,39 @@ Output ONLY the search query string. No explanation, no quotes, just the query."
 
         return query_normalized
 
-    def normalize_perplexity_result(self, raw_content: str, topic_origin: str) -> List[Dict[str, Any]]:
+    async def normalize_perplexity_result_async(self, raw_content: str, topic_origin: str,
+                                                citations: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Parses raw Perplexity output into structured LeadCandidate objects.
+        The local parser (logic/perplexity_parser.py) goes first; the LLM
+        normalizer only runs when it finds no valid story.
+        Must run inside llm.async_session().
+        """
+        stories = self._parse_locally(raw_content, citations)
+        if stories is None:
+            response = await llm.achat_completion_json(self._normalize_system_prompt(), self._with_sources(raw_content, citations))
+            stories = response.get('stories', [])
+        return self._perplexity_candidates(stories, topic_origin)
+
+    def _parse_locally(self, raw_content: str, citations: Optional[List[str]]) -> Optional[List[Dict[str, str]]]:
+        """
+        Stories from the local parser, or None when the LLM has to normalize.
         """
-        system_prompt = """You are a precise data extraction assistant.
+        stories = parse_stories(raw_content, citations) if config.PERPLEXITY_LOCAL_PARSE else []
+        self.perplexity_parses["local" if stories else "llm"] += 1
+        return stories or None
+
+    @staticmethod
+    def _with_sources(raw_content: str, citations: Optional[List[str]]) -> str:
+        # Lets the LLM resolve [n] markers the answer points at
+        if not citations:
+            return raw_content
+        sources = "\n".join(f"[{i}] {url}" for i, url in enumerate(citations, 1))
+        return f"{raw_content}\n\nSources:\n{sources}"
+
+    @staticmethod
+    def _normalize_system_prompt() -> str:
+        return """You are a precise data extraction assistant.
 
 Your task: Parse the provided text (which may contain markdown, prose, or mixed formatting) and extract all distinct stories or research items mentioned.
 
@@ -78,16 +135,13 @@ Rules:
 - If no valid stories are found, return {"stories": []}.
 - Do not invent information. Only extract what is present."""
 
-        user_prompt = raw_content
-        
-        response = llm.chat_completion_json(system_prompt, user_prompt)
-        stories = response.get('stories', [])
-        
+    @staticmethod
+    def _perplexity_candidates(stories: List[Dict[str, Any]], topic_origin: str) -> List[Dict[str, Any]]:
         normalized = []
         for s in stories:
             normalized.append({
                 "title": s.get('title'),
-                "url": s.get('url'),
+                "url": normalize_url(s.get('url')),
                 "summary": s.get('summary'),
                 "source_origin": f"Perplexity: {topic_origin}",
                 "published_at": None
@@ -99,10 +153,59 @@ Rules:
         Batch filters 20 titles at once for initial relevance.
         Returns the list of items that passed.
         """
+        survivors, _ = self.smart_gatekeeper_verdicts(batch)
+        return survivors
+
+    def smart_gatekeeper_verdicts(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Like smart_gatekeeper, but also returns the items the gatekeeper
+        actually judged and rejected: (survivors, rejected).
+        If the LLM call fails, nothing passes and nothing counts as rejected.
+        """
         if not batch:
-            return []
+            return [], []
 
-        # Prepare prompt
+        system_prompt, user_prompt = self._gatekeeper_prompts(batch)
+        response = llm.chat_completion_json(system_prompt, user_prompt, cache=True)
+        return self._apply_gatekeeper(batch, response)
+
+    async def smart_gatekeeper_verdicts_async(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Async smart_gatekeeper_verdicts; must run inside llm.async_session().
+        """
+        if not batch:
+            return [], []
+
+        system_prompt, user_prompt = self._gatekeeper_prompts(batch)
+        response = await llm.achat_completion_json(system_prompt, user_prompt, cache=True)
+        return self._apply_gatekeeper(batch, response)
+
+    def smart_gatekeeper_verdicts_many(self, batches: List[List[Dict[str, Any]]]) -> List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        Judges many batches concurrently through the LLM scheduler
+        (or one after another when LLM_ASYNC is off).
+        Returns one (survivors, rejected) pair per batch, in input order.
+        """
+        started, usage = time.monotonic(), llm.usage_snapshot()
+        if not config.LLM_ASYNC:
+            verdicts = [self.smart_gatekeeper_verdicts(batch) for batch in batches]
+        else:
+            verdicts = llm.gather([partial(self.smart_gatekeeper_verdicts_async, batch) for batch in batches])
+        self._record_stage("gatekeeper", sum(len(batch) for batch in batches), 0, time.monotonic() - started,
+                           llm.usage_since(usage))
+        return verdicts
+
+    async def smart_gatekeeper_many_async(self, batches: List[List[Dict[str, Any]]]) -> List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        Async smart_gatekeeper_verdicts_many; must run inside llm.async_session().
+        """
+        started = time.monotonic()
+        with llm.track_usage() as usage:
+            verdicts = await asyncio.gather(*(self.smart_gatekeeper_verdicts_async(batch) for batch in batches))
+        self._record_stage("gatekeeper", sum(len(batch) for batch in batches), 0, time.monotonic() - started, usage)
+        return verdicts
+
+    def _gatekeeper_prompts(self, batch: List[Dict[str, Any]]) -> Tuple[str, str]:
         titles_text = "\n".join([f"{i}: {item['title']}" for i, item in enumerate(batch)])
         
         system_prompt = """You are the first-pass scout for TheBoldUnknown — a publication that reveals the hidden strangeness woven through reality with stories that make people stop scrolling and think: "Wait. What?"
@@ -146,28 +249,65 @@ OUTPUT FORMAT (JSON only):
 Return ONLY the JSON object with the indices of titles that passed."""
 
         user_prompt = titles_text
+        return system_prompt, user_prompt
 
-        response = llm.chat_completion_json(system_prompt, user_prompt)
+    def _apply_gatekeeper(self, batch: List[Dict[str, Any]], response: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        if 'passed_indices' not in response:
+            logger.warning("Gatekeeper returned no verdict for this batch")
+            return [], []
         passed_indices = response.get('passed_indices', [])
         
         survivors = []
         for idx in passed_indices:
-            if 0 <= idx < len(batch):
+            if isinstance(idx, int) and 0 <= idx < len(batch):
                 survivors.append(batch[idx])
         
-        return survivors
+        passed = {id(item) for item in survivors}
+        rejected = [item for item in batch if id(item) not in passed]
+        return survivors, rejected
 
-    def virality_check(self, lead: Dict[str, Any]) -> Dict[str, Any]:
+    def virality_check(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
         """
         Stage 2 Filter: Virality Check.
         Scores a lead's viral potential (0-100).
         Returns the lead dict enriched with virality_score.
         """
-        system_prompt = """You are a Virality Analyst for TheBoldUnknown.
+        system_prompt, user_prompt = self._virality_prompts(lead)
+        analysis = llm.chat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_virality(lead, analysis)
+
+    async def virality_check_async(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
+        """
+        Async virality_check; must run inside llm.async_session().
+        """
+        system_prompt, user_prompt = self._virality_prompts(lead)
+        analysis = await llm.achat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_virality(lead, analysis)
+
+    def virality_check_many(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Scores many leads, SCORING_BATCH_SIZE per request, concurrently
+        through the LLM scheduler (or one request at a time when LLM_ASYNC
+        is off). Leads are enriched in place and returned in input order.
+        """
+        return self._score_many(leads, "virality")
+
+    def _virality_prompts(self, lead: Dict[str, Any]) -> Tuple[str, str]:
+        return self._virality_system_prompt(batched=False), self._lead_text(lead)
+
+    def _virality_system_prompt(self, batched: bool) -> str:
+        return """You are a Virality Analyst for TheBoldUnknown.
 
 Your ONLY job is to score how likely this story is to make someone stop scrolling and think: "Wait. What?"
 
-The goal is WIDE AUDIENCE APPEAL — not niche intellectual interest.
+""" + self._virality_rubric() + """---
+
+""" + self._output_format(self.VIRALITY_FIELDS, batched) + """
+
+""" + self.VIRALITY_CALIBRATION
+
+    def _virality_rubric(self) -> str:
+        return """The goal is WIDE AUDIENCE APPEAL — not niche intellectual interest.
 
 VIRALITY SCORE (0-100):
 
@@ -204,38 +344,57 @@ VIRALITY KILLERS (what creates LOW scores):
 - Fear/outrage bait: Relies on negative emotions rather than curiosity
 - Predictable: "Of course that happened"
 
----
-
-OUTPUT FORMAT (JSON only):
-{
-  "virality_score": <number 0-100>,
-  "hook_analysis": "<1-2 sentences. What's the 'Wait. What?' moment? Or why is there no clear hook?>"
-}
+"""
 
-Be honest and critical. Most stories score 50-75. Reserve 85+ for genuinely exceptional, wide-appeal hooks."""
-
-        user_prompt = f"""Title: {lead['title']}
-
-Summary: {lead['summary']}"""
-        
-        analysis = llm.chat_completion_json(system_prompt, user_prompt, model=config.OPENAI_MODEL_MAIN)
-        
-        lead['virality_score'] = analysis.get('virality_score', 0)
+    def _apply_virality(self, lead: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        # A failed or malformed call leaves the lead unscored (None), not scored 0
+        lead['virality_score'] = self._score_value(analysis, 'virality_score')
         lead['hook_analysis'] = analysis.get('hook_analysis', '')
         
         return lead
 
-    def brand_lens_check(self, lead: Dict[str, Any]) -> Dict[str, Any]:
+    def brand_lens_check(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
         """
         Stage 3 Filter: Brand Alignment Check.
         Scores how well the lead fits TheBoldUnknown's brand identity.
         Returns the lead dict enriched with brand_score and new_topics.
         """
-        system_prompt = """You are the Editor-in-Chief of TheBoldUnknown.
+        system_prompt, user_prompt = self._brand_prompts(lead)
+        analysis = llm.chat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_brand(lead, analysis)
+
+    async def brand_lens_check_async(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
+        """
+        Async brand_lens_check; must run inside llm.async_session().
+        """
+        system_prompt, user_prompt = self._brand_prompts(lead)
+        analysis = await llm.achat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_brand(lead, analysis)
+
+    def brand_lens_check_many(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Brand-scores many leads, SCORING_BATCH_SIZE per request, concurrently
+        through the LLM scheduler (or one request at a time when LLM_ASYNC
+        is off). Leads are enriched in place and returned in input order.
+        """
+        return self._score_many(leads, "brand")
+
+    def _brand_prompts(self, lead: Dict[str, Any]) -> Tuple[str, str]:
+        return self._brand_system_prompt(batched=False), self._lead_text(lead)
+
+    def _brand_system_prompt(self, batched: bool) -> str:
+        return """You are the Editor-in-Chief of TheBoldUnknown.
 
 This story has already passed a virality check. Your job is to determine if it fits the BRAND.
 
-BRAND IDENTITY:
+""" + self._brand_rubric() + """---
+
+""" + self._output_format(self.BRAND_FIELDS, batched) + """
+
+""" + self.BRAND_CALIBRATION
+
+    def _brand_rubric(self) -> str:
+        return """BRAND IDENTITY:
 TheBoldUnknown reveals the hidden strangeness woven through reality — the moments, discoveries, and details that make people stop scrolling and think: "Wait. What?"
 
 The stories are grounded and intelligent, but they LEAD WITH WTF FACTOR, not academic framing.
@@ -293,26 +452,336 @@ BRAND SCORE (0-100):
 
 Below 50: Poor fit. Generic news, falls into hard exclusions, leads with jargon instead of strangeness, fear-mongering, or lacks genuine "Wait. What?" quality.
 
----
+"""
 
-OUTPUT FORMAT (JSON only):
-{
-  "brand_score": <number 0-100>,
-  "reasoning": "<2-3 sentences. Be blunt. Does this have a clear 'Wait. What?' moment? Is it accessible to non-experts? What works or doesn't?>"
-}
-
-Be honest and critical. Most stories score 50-75. Reserve 90+ for genuinely exceptional brand fits."""
-
-        user_prompt = f"""Title: {lead['title']}
-
-Summary: {lead['summary']}"""
-        
-        analysis = llm.chat_completion_json(system_prompt, user_prompt, model=config.OPENAI_MODEL_MAIN)
-        
-        lead['brand_score'] = analysis.get('brand_score', 0)
+    def _apply_brand(self, lead: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        lead['brand_score'] = self._score_value(analysis, 'brand_score')
         lead['reasoning'] = analysis.get('reasoning', '')
         # lead['new_topics'] removed to prevent echo chambers
         
         return lead
 
+    def fused_check(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
+        """
+        Fused Stage 2+3: virality and brand fit scored in one request.
+        Returns the lead dict enriched with virality_score, hook_analysis,
+        brand_score and reasoning; the caller applies both thresholds.
+        """
+        system_prompt, user_prompt = self._fused_system_prompt(batched=False), self._lead_text(lead)
+        analysis = llm.chat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_fused(lead, analysis)
+
+    async def fused_check_async(self, lead: Dict[str, Any], model: str = None) -> Dict[str, Any]:
+        """
+        Async fused_check; must run inside llm.async_session().
+        """
+        system_prompt, user_prompt = self._fused_system_prompt(batched=False), self._lead_text(lead)
+        analysis = await llm.achat_completion_json(system_prompt, user_prompt, model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        return self._apply_fused(lead, analysis)
+
+    def fused_check_many(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fused-scores many leads, SCORING_BATCH_SIZE per request, concurrently
+        through the LLM scheduler. Leads are enriched in place and returned
+        in input order.
+        """
+        return self._score_many(leads, "fused")
+
+    def _fused_system_prompt(self, batched: bool) -> str:
+        return """You are the scoring desk for TheBoldUnknown. Every story gets two independent scores:
+1. VIRALITY: how likely it is to make someone stop scrolling and think: "Wait. What?"
+2. BRAND FIT: whether it fits the brand, judged as the Editor-in-Chief would.
+
+Score the two separately. A strong hook does not make a story on-brand, and a good brand fit can still have a weak hook.
+
+=== PART 1: VIRALITY ===
+
+""" + self._virality_rubric() + """=== PART 2: BRAND FIT ===
+
+""" + self._brand_rubric() + """---
+
+""" + self._output_format(self.VIRALITY_FIELDS + self.BRAND_FIELDS, batched) + """
+
+Be honest and critical. Most stories score 50-75 on both. Reserve 85+ virality for genuinely exceptional, wide-appeal hooks, and 90+ brand for genuinely exceptional brand fits."""
+
+    def _apply_fused(self, lead: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        self._apply_virality(lead, analysis)
+        return self._apply_brand(lead, analysis)
+
+    @staticmethod
+    def _score_value(analysis: Dict[str, Any], key: str) -> Optional[float]:
+        score = analysis.get(key)
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return None
+        return score
+
+    # ------------------------------------------------------------------
+    # Batched scoring (K leads per request, shared rubric)
+    # ------------------------------------------------------------------
+
+    def _scoring_stage(self, stage: str):
+        """
+        (system_prompt_builder, apply_fn, score_keys, single_check, single_check_async)
+        """
+        if stage == "virality":
+            return (self._virality_system_prompt, self._apply_virality, ("virality_score",),
+                    self.virality_check, self.virality_check_async)
+        if stage == "fused":
+            return (self._fused_system_prompt, self._apply_fused, ("virality_score", "brand_score"),
+                    self.fused_check, self.fused_check_async)
+        return (self._brand_system_prompt, self._apply_brand, ("brand_score",),
+                self.brand_lens_check, self.brand_lens_check_async)
+
+    def _score_many(self, leads: List[Dict[str, Any]], stage: str) -> List[Dict[str, Any]]:
+        if not leads:
+            return leads
+        if config.CASCADE_ENABLED:
+            return self._cascade(leads, stage)
+
+        started, usage = time.monotonic(), llm.usage_snapshot()
+        self._run_stage(leads, stage, config.OPENAI_MODEL_MAIN)
+        self._record_stage(stage, len(leads), 0, time.monotonic() - started, llm.usage_since(usage))
+        return leads
+
+    async def score_many_async(self, leads: List[Dict[str, Any]], stage: str) -> List[Dict[str, Any]]:
+        """
+        Async _score_many (cascade included) for callers that already run
+        an event loop; must run inside llm.async_session().
+        """
+        if not leads:
+            return leads
+        started = time.monotonic()
+        escalate = []
+        with llm.track_usage() as usage:
+            if config.CASCADE_ENABLED:
+                await self._run_stage_async(leads, stage, llm.model_mini)
+                escalate = [lead for lead in leads if self._needs_escalation(lead, stage)]
+                if escalate:
+                    logger.info(f"[CASCADE] {stage}: escalating {len(escalate)}/{len(leads)} borderline leads to {llm.model_main}")
+                    await self._run_stage_async(escalate, stage, llm.model_main)
+            else:
+                await self._run_stage_async(leads, stage, config.OPENAI_MODEL_MAIN)
+        self._record_stage(stage, len(leads), len(escalate), time.monotonic() - started, usage)
+        return leads
+
+    def _cascade(self, leads: List[Dict[str, Any]], stage: str) -> List[Dict[str, Any]]:
+        """
+        Scores every lead with the mini model, then re-scores with the main
+        model only the leads whose cheap score is borderline (inside the
+        stage's CASCADE_BANDS) or came back without its analysis text.
+        """
+        started, usage = time.monotonic(), llm.usage_snapshot()
+        self._run_stage(leads, stage, llm.model_mini)
+        escalate = [lead for lead in leads if self._needs_escalation(lead, stage)]
+        if escalate:
+            logger.info(f"[CASCADE] {stage}: escalating {len(escalate)}/{len(leads)} borderline leads to {llm.model_main}")
+            self._run_stage(escalate, stage, llm.model_main)
+        self._record_stage(stage, len(leads), len(escalate), time.monotonic() - started, llm.usage_since(usage))
+        return leads
+
+    def _needs_escalation(self, lead: Dict[str, Any], stage: str) -> bool:
+        def borderline(score_key: str, note_key: str, band_stage: str, threshold: int) -> bool:
+            # A response without its score or analysis text is a failed or malformed call
+            if lead.get(score_key) is None or not lead.get(note_key):
+                return True
+            below, above = config.CASCADE_BANDS[band_stage]
+            return threshold - below <= (lead.get(score_key) or 0) < threshold + above
+
+        if stage in ("virality", "fused"):
+            if borderline("virality_score", "hook_analysis", "virality", config.VIRALITY_THRESHOLD):
+                return True
+            # Fused: brand only matters for leads that clear virality
+            if stage == "virality" or (lead['virality_score'] or 0) < config.VIRALITY_THRESHOLD:
+                return False
+        return borderline("brand_score", "reasoning", "brand", config.BRAND_THRESHOLD)
+
+    def _run_stage(self, leads: List[Dict[str, Any]], stage: str, model: str):
+        k = max(1, config.SCORING_BATCH_SIZE)
+        chunks = [leads[i : i + k] for i in range(0, len(leads), k)]
+        if config.LLM_ASYNC:
+            llm.gather([partial(self._score_batch_async, chunk, stage, model) for chunk in chunks])
+        else:
+            for chunk in chunks:
+                self._score_batch(chunk, stage, model)
+
+    async def _run_stage_async(self, leads: List[Dict[str, Any]], stage: str, model: str):
+        k = max(1, config.SCORING_BATCH_SIZE)
+        await asyncio.gather(*(self._score_batch_async(leads[i : i + k], stage, model) for i in range(0, len(leads), k)))
+
+    def _record_stage(self, stage: str, leads: int, escalated: int, seconds: float, usage: Dict[str, Dict[str, int]]):
+        stats = self.stage_stats.setdefault(stage, {"leads": 0, "escalated": 0, "seconds": 0.0, "cost": 0.0})
+        stats["leads"] += leads
+        stats["escalated"] += escalated
+        stats["seconds"] += seconds
+        stats["cost"] += llm.estimate_cost(usage)
+
+    def stage_report(self) -> List[str]:
+        """
+        One line per scoring stage: leads, escalation rate, wall time and
+        estimated cost (MODEL_PRICES).
+        """
+        lines = []
+        for stage, stats in self.stage_stats.items():
+            line = f"{stage}: {stats['leads']} leads, {stats['seconds']:.1f}s, ${stats['cost']:.4f}"
+            if config.CASCADE_ENABLED and stage != "gatekeeper":
+                rate = stats['escalated'] / stats['leads'] if stats['leads'] else 0.0
+                line += f", {stats['escalated']} escalated ({rate:.0%})"
+            lines.append(line)
+        return lines
+
+    def perplexity_parse_report(self) -> Optional[str]:
+        """
+        Share of Perplexity answers the local parser handled, or None if
+        there were none this run.
+        """
+        total = self.perplexity_parses["local"] + self.perplexity_parses["llm"]
+        if not total:
+            return None
+        local = self.perplexity_parses["local"]
+        return f"{local}/{total} answers parsed locally ({local / total:.0%}), {self.perplexity_parses['llm']} sent to the LLM"
+
+    def _score_batch(self, leads: List[Dict[str, Any]], stage: str, model: str = None) -> List[Dict[str, Any]]:
+        """
+        Scores several leads in one request (shared rubric, one JSON entry per
+        index). Leads missing from the response are re-scored individually.
+        """
+        system_builder, apply, score_keys, check, _ = self._scoring_stage(stage)
+        if len(leads) == 1:
+            check(leads[0], model=model)
+            return leads
+
+        response = llm.chat_completion_json(system_builder(batched=True), self._batch_text(leads),
+                                            model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        for lead in self._apply_batch(leads, response, apply, score_keys, stage):
+            check(lead, model=model)
+        return leads
+
+    async def _score_batch_async(self, leads: List[Dict[str, Any]], stage: str, model: str = None) -> List[Dict[str, Any]]:
+        system_builder, apply, score_keys, _, check_async = self._scoring_stage(stage)
+        if len(leads) == 1:
+            await check_async(leads[0], model=model)
+            return leads
+
+        response = await llm.achat_completion_json(system_builder(batched=True), self._batch_text(leads),
+                                                   model=model or config.OPENAI_MODEL_MAIN, cache=True)
+        missing = self._apply_batch(leads, response, apply, score_keys, stage)
+        await asyncio.gather(*(check_async(lead, model=model) for lead in missing))
+        return leads
+
+    def _apply_batch(self, leads: List[Dict[str, Any]], response: Dict[str, Any], apply, score_keys: Tuple[str, ...], stage: str) -> List[Dict[str, Any]]:
+        """
+        Applies each entry of a batched response to the lead at its index.
+        Returns the leads without exactly one valid entry (missing index,
+        repeated index, or a non-numeric score), to be re-scored individually.
+        """
+        entries = response.get('scores')
+        by_index, repeated = {}, set()
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            idx = entry.get('index')
+            scores = [entry.get(key) for key in score_keys]
+            if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < len(leads):
+                continue
+            if any(isinstance(score, bool) or not isinstance(score, (int, float)) for score in scores):
+                continue
+            if idx in by_index:
+                repeated.add(idx)
+            by_index[idx] = entry
+
+        missing = []
+        for i, lead in enumerate(leads):
+            if i in by_index and i not in repeated:
+                apply(lead, by_index[i])
+            else:
+                missing.append(lead)
+
+        if missing:
+            self.batch_fallbacks += len(missing)
+            logger.warning(f"Batched {stage} scoring returned no valid score for {len(missing)}/{len(leads)} leads, re-scoring individually")
+        return missing
+
+    # ------------------------------------------------------------------
+    # Offline scoring (Batch API requests built from the same prompts)
+    # ------------------------------------------------------------------
+
+    def scoring_requests(self, leads: List[Dict[str, Any]], stage: str, model: str = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        (custom_id, chat params) for scoring leads offline, SCORING_BATCH_SIZE
+        per request, with exactly the prompts the synchronous path sends.
+        The custom_id ("<stage>:<first index>:<count>") says which leads the
+        answer belongs to.
+        """
+        system_builder = self._scoring_stage(stage)[0]
+        model = model or config.OPENAI_MODEL_MAIN
+        k = max(1, config.SCORING_BATCH_SIZE)
+        requests = []
+        for start in range(0, len(leads), k):
+            chunk = leads[start : start + k]
+            if len(chunk) == 1:
+                system_prompt, user_prompt = system_builder(batched=False), self._lead_text(chunk[0])
+            else:
+                system_prompt, user_prompt = system_builder(batched=True), self._batch_text(chunk)
+            params = llm.chat_params(system_prompt, user_prompt, model, json_mode=True)
+            requests.append((f"{stage}:{start}:{len(chunk)}", params))
+        return requests
+
+    def apply_scoring_results(self, leads: List[Dict[str, Any]], results: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Applies Batch API answers ({custom_id: content}) from
+        scoring_requests() to the same list of leads. Returns the leads with
+        no usable answer, to be scored synchronously.
+        """
+        answered = set()
+        missing = []
+        for custom_id, content in results.items():
+            stage, start, count = custom_id.rsplit(":", 2)
+            _, apply, score_keys, _, _ = self._scoring_stage(stage)
+            chunk = leads[int(start) : int(start) + int(count)]
+            answered.update(id(lead) for lead in chunk)
+            try:
+                response = json.loads(content)
+            except (TypeError, ValueError):
+                response = None
+            if not isinstance(response, dict):
+                missing.extend(chunk)
+            elif len(chunk) == 1:
+                apply(chunk[0], response)
+                if any(chunk[0].get(key) is None for key in score_keys):
+                    missing.append(chunk[0])
+            else:
+                missing.extend(self._apply_batch(chunk, response, apply, score_keys, stage))
+
+        missing.extend(lead for lead in leads if id(lead) not in answered)
+        return missing
+
+    @staticmethod
+    def _lead_text(lead: Dict[str, Any]) -> str:
+        return f"""Title: {lead['title']}
+
+Summary: {lead['summary']}"""
+
+    def _batch_text(self, leads: List[Dict[str, Any]]) -> str:
+        return "\n\n".join(f"Story {i}:\n{self._lead_text(lead)}" for i, lead in enumerate(leads))
+
+    @staticmethod
+    def _output_format(fields: List[Tuple[str, str]], batched: bool) -> str:
+        if not batched:
+            lines = ",\n".join(f'  "{key}": {placeholder}' for key, placeholder in fields)
+            return f"""OUTPUT FORMAT (JSON only):
+{{
+{lines}
+}}"""
+        entry = ", ".join(f'"{key}": {placeholder}' for key, placeholder in fields)
+        return f"""You will receive several numbered stories. Score each one on its own merits, exactly as if it were the only story you were shown. Do not rank them against each other.
+
+OUTPUT FORMAT (JSON only):
+{{
+  "scores": [
+    {{"index": <story number>, {entry}}}
+  ]
+}}
+
+Return exactly one entry per story, using its number as "index"."""
+
 filters = Filters()
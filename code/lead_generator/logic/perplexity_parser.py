@@ -0,0 +1,158 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+CITATION_RE = re.compile(r"\[(\d{1,3})\]")
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+BARE_URL_RE = re.compile(r"https?://[^\s)\]>\"']+")
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+LIST_ITEM_RE = re.compile(r"^\s*(?:\d{1,2}[.)]|[-*+•])\s+(.*)$")
+HEADING_RE = re.compile(r"^\s*#{2,6}\s+(.*)$")
+
+# Keys a JSON object may keep its story list under
+LIST_KEYS = ("stories", "results", "items", "articles", "papers", "data")
+# List items / headings that introduce the answer's sources, not a story
+SOURCE_LABELS = {"sources", "references", "citations", "links"}
+
+
+def parse_stories(content: str, citations: Optional[List[str]] = None) -> List[Dict[str, str]]:
+    """
+    Extracts stories ({'title', 'url', 'summary'}) from a Perplexity answer
+    without an LLM call. Tries, in order: JSON in code fences, bare JSON
+    in the text, then a markdown list (or ### sections) of stories.
+    Citation markers like [2] resolve to citations[1] when a story has no
+    URL of its own. Stories without a title or an http(s) URL are left out;
+    an empty result means the text needs the LLM normalizer.
+    """
+    if not content or not content.strip():
+        return []
+    citations = citations or []
+
+    for block in FENCE_RE.findall(content):
+        stories = _valid(_from_json(_load_json(block)), citations)
+        if stories:
+            return stories
+
+    for data in _embedded_json(content):
+        stories = _valid(_from_json(data), citations)
+        if stories:
+            return stories
+
+    return _valid(_from_markdown(content), citations)
+
+
+def _load_json(text: str) -> Any:
+    try:
+        return json.loads(text.strip())
+    except ValueError:
+        return None
+
+
+def _embedded_json(text: str):
+    """
+    Yields every JSON array / object that starts at a '[' or '{' in text.
+    """
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            data, _ = decoder.raw_decode(text, match.start())
+        except ValueError:
+            continue
+        if isinstance(data, (list, dict)) and data:
+            yield data
+
+
+def _from_json(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        for key in LIST_KEYS:
+            if isinstance(data.get(key), list):
+                return _from_json(data[key])
+        return [data] if "title" in data else []
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    return []
+
+
+def _from_markdown(content: str) -> List[Dict[str, str]]:
+    """
+    One story per top-level list item or ### heading; indented or
+    following lines are folded into its summary. Every item must look like
+    a story entry: a heading, a bold title, or its own link. A bulleted
+    answer of plain sentences (with only [n] markers) yields nothing.
+    """
+    stories = []
+    current = None
+    for line in content.splitlines():
+        item = LIST_ITEM_RE.match(line) if not line.startswith(("  ", "\t")) else None
+        heading = HEADING_RE.match(line)
+        if item or heading:
+            current = {"text": (item or heading).group(1).strip(), "more": [], "heading": bool(heading)}
+            stories.append(current)
+        elif current is not None and line.strip():
+            current["more"].append(line.strip(" \t-*"))
+    if not all(entry["heading"] or _has_title_or_link(entry["text"], entry["more"]) for entry in stories):
+        return []
+    return [_markdown_story(entry["text"], entry["more"]) for entry in stories]
+
+
+def _has_title_or_link(text: str, more: List[str]) -> bool:
+    body = " ".join([text] + more)
+    return bool(BOLD_RE.search(text) or MARKDOWN_LINK_RE.search(body) or BARE_URL_RE.search(body))
+
+
+def _markdown_story(text: str, more: List[str]) -> Dict[str, str]:
+    body = " ".join([text] + more)
+    link = MARKDOWN_LINK_RE.search(body)
+    bold = BOLD_RE.search(text)
+
+    if bold:
+        title = MARKDOWN_LINK_RE.sub(r"\1", bold.group(1) or bold.group(2))
+        rest = body.replace(bold.group(0), "", 1)
+    elif link and link.start() == 0:
+        title = link.group(1)
+        rest = body[link.end():]
+    else:
+        # "Title: summary" / "Title - summary", else the whole line is the title
+        parts = re.split(r":\s|\s[-–—]\s", text, maxsplit=1)
+        title = parts[0]
+        rest = " ".join(parts[1:] + more)
+
+    url = link.group(2) if link else None
+    if url is None:
+        bare = BARE_URL_RE.search(body)
+        url = bare.group(0).rstrip(".,;") if bare else None
+
+    summary = MARKDOWN_LINK_RE.sub(r"\1", rest)
+    summary = BARE_URL_RE.sub("", summary)
+    summary = re.sub(r"\(\s*\)|\*\*|__", "", summary)
+    return {"title": title, "url": url, "summary": summary}
+
+
+def _valid(stories: List[Dict[str, Any]], citations: List[str]) -> List[Dict[str, str]]:
+    valid = []
+    for story in stories:
+        title = _clean(story.get("title"))
+        summary = _clean(story.get("summary") or story.get("description") or story.get("snippet"))
+        url = story.get("url") or story.get("link") or story.get("source")
+        url = url.strip() if isinstance(url, str) else ""
+
+        if not url.startswith(("http://", "https://")):
+            # "[3]", or no URL at all: take the first citation the story points at
+            markers = CITATION_RE.findall(f"{url} {story.get('title') or ''} {story.get('summary') or ''}")
+            url = next((citations[int(n) - 1] for n in markers if 0 < int(n) <= len(citations)), "")
+
+        # A bare list of source links is not a list of stories
+        if not title or title.lower() in SOURCE_LABELS or title.startswith(("http://", "https://")):
+            continue
+        if url.startswith(("http://", "https://")):
+            valid.append({"title": title, "url": url, "summary": summary})
+    return valid
+
+
+def _clean(value: Any) -> str:
+    if not isinstance(value, str):
+        return ""
+    value = CITATION_RE.sub("", value)
+    value = re.sub(r"\s+", " ", value)
+    return value.strip(" \t:-–—*_\"'")
@@ -0,0 +1,152 @@
+import time
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config import config
+from utils.logger import logger
+
+# Ridge penalties tried by cross-validation
+RIDGE_ALPHAS = (0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0)
+CV_FOLDS = 5
+
+
+def _features(embeddings) -> np.ndarray:
+    matrix = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def fit_ridge(X: np.ndarray, y: np.ndarray, alpha: float) -> Tuple[np.ndarray, float]:
+    """
+    Closed-form ridge regression on centred data. Solves the n x n dual
+    system when there are fewer rows than embedding dimensions.
+    Returns (weights, intercept).
+    """
+    x_mean, y_mean = X.mean(axis=0), y.mean()
+    Xc, yc = X - x_mean, y - y_mean
+    n, d = Xc.shape
+    if n < d:
+        weights = Xc.T @ np.linalg.solve(Xc @ Xc.T + alpha * np.eye(n), yc)
+    else:
+        weights = np.linalg.solve(Xc.T @ Xc + alpha * np.eye(d), Xc.T @ yc)
+    return weights, float(y_mean - x_mean @ weights)
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, alphas=RIDGE_ALPHAS, folds: int = CV_FOLDS) -> Tuple[float, np.ndarray]:
+    """
+    Picks the ridge penalty with the lowest out-of-fold error.
+    Returns (best_alpha, out_of_fold_predictions for it).
+    """
+    fold_of = np.random.default_rng(0).permutation(len(y)) % folds
+    best_alpha, best_rmse, best_predictions = alphas[0], np.inf, None
+    for alpha in alphas:
+        predictions = np.empty(len(y))
+        for fold in range(folds):
+            test = fold_of == fold
+            weights, intercept = fit_ridge(X[~test], y[~test], alpha)
+            predictions[test] = X[test] @ weights + intercept
+        rmse = float(np.sqrt(np.mean((predictions - y) ** 2)))
+        if rmse < best_rmse:
+            best_alpha, best_rmse, best_predictions = alpha, rmse, predictions
+    return best_alpha, best_predictions
+
+
+class Prescorer:
+    """
+    Local virality pre-scorer: ridge regression from a candidate's embedding
+    to the virality score GPT-4o gave similar past candidates.
+    A candidate is confidently low when even the optimistic end of its
+    prediction (prediction + z * out-of-fold residual std, z set by
+    PRESCORER_CONFIDENCE) is below VIRALITY_THRESHOLD.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.model: Optional[Dict[str, Any]] = None
+        self._loaded_mtime: Optional[float] = None
+
+    def load(self) -> bool:
+        """
+        Loads (or reloads, after a retrain) the saved model. Returns False
+        when no model has been trained yet.
+        """
+        if not self.path.exists():
+            self.model = None
+            return False
+        mtime = self.path.stat().st_mtime
+        if self.model is not None and mtime == self._loaded_mtime:
+            return True
+        try:
+            with np.load(self.path) as saved:
+                self.model = {key: saved[key] for key in saved.files}
+            self._loaded_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load prescorer model from {self.path}: {e}")
+            self.model = None
+        return self.model is not None
+
+    def trained_at(self) -> Optional[float]:
+        return float(self.model['trained_at']) if self.model is not None else None
+
+    def train(self, embeddings: List[List[float]], scores: List[float]) -> Dict[str, float]:
+        """
+        Fits the model on (embedding, virality score) pairs, picks the ridge
+        penalty by cross-validation, saves it, and returns training metrics
+        (out-of-fold MAE, residual std, and how many rows would have been
+        rejected at the configured confidence, and how many of those wrongly).
+        """
+        X = _features(embeddings)
+        y = np.asarray(scores, dtype=np.float64)
+        alpha, oof = cross_validate(X, y)
+        residual_std = float(np.std(y - oof))
+        weights, intercept = fit_ridge(X, y, alpha)
+
+        z = NormalDist().inv_cdf(config.PRESCORER_CONFIDENCE)
+        would_reject = oof + z * residual_std < config.VIRALITY_THRESHOLD
+        wrongly = would_reject & (y >= config.VIRALITY_THRESHOLD)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            self.path,
+            weights=weights.astype(np.float32),
+            intercept=np.float64(intercept),
+            residual_std=np.float64(residual_std),
+            alpha=np.float64(alpha),
+            dims=np.int64(X.shape[1]),
+            rows=np.int64(len(y)),
+            trained_at=np.float64(time.time()),
+        )
+        self.model = None
+        self.load()
+
+        return {
+            "rows": len(y),
+            "dims": X.shape[1],
+            "alpha": alpha,
+            "mae": float(np.mean(np.abs(y - oof))),
+            "residual_std": residual_std,
+            "would_reject": int(would_reject.sum()),
+            "wrongly_rejected": int(wrongly.sum()),
+        }
+
+    def score(self, embeddings: List[List[float]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns (predicted_scores, optimistic_upper_bounds), or None when no
+        model is loaded or it was trained on a different embedding size.
+        """
+        if self.model is None or not embeddings:
+            return None
+        X = _features(embeddings)
+        if X.shape[1] != int(self.model['dims']):
+            logger.warning(
+                f"Prescorer was trained on {int(self.model['dims'])}-dim embeddings, got {X.shape[1]}; "
+                "retrain with `python main.py train-prescorer`"
+            )
+            return None
+        predictions = X @ self.model['weights'].astype(np.float64) + float(self.model['intercept'])
+        z = NormalDist().inv_cdf(config.PRESCORER_CONFIDENCE)
+        return predictions, predictions + z * float(self.model['residual_std'])
+
+
+prescorer = Prescorer(config.PRESCORER_PATH)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+from utils.logger import logger
+
+# End-of-stream marker; each stage passes it on once all its workers are done
+DONE = object()
+
+# How often a half-filled micro-batch checks its queue for more items
+POLL_SECONDS = 0.05
+
+
+async def next_batch(queue: asyncio.Queue, size: int, max_wait: float) -> Optional[List[Any]]:
+    """
+    Takes up to `size` items: waits as long as needed for the first, then
+    at most max_wait seconds for the rest. Returns None once the stream has
+    ended. DONE is put back, so every worker on the queue sees it.
+    Polls rather than wait_for(queue.get()), which can lose an item (or a
+    cancellation) when the timeout and the item arrive together.
+    """
+    first = await queue.get()
+    if first is DONE:
+        queue.put_nowait(DONE)
+        return None
+
+    batch = [first]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < size:
+        if queue.empty():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(POLL_SECONDS, remaining))
+            continue
+        item = queue.get_nowait()
+        if item is DONE:
+            queue.put_nowait(DONE)
+            break
+        batch.append(item)
+    return batch
+
+
+class Stage:
+    """
+    One step of the streaming pipeline: `workers` concurrent loops take
+    micro-batches of up to batch_size from inbox, run `handle` on them and
+    put what it returns on outbox. Bounded queues give backpressure: a
+    worker blocks on a full outbox until the next stage catches up.
+    """
+
+    def __init__(self, name: str, handle: Callable[[List[Any]], Awaitable[List[Any]]], inbox: asyncio.Queue,
+                 outbox: Optional[asyncio.Queue], workers: int, batch_size: int, max_wait: float):
+        self.name = name
+        self.handle = handle
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+
+    async def run(self):
+        await gather_or_cancel([self._work() for _ in range(self.workers)])
+        if self.outbox is not None:
+            await self.outbox.put(DONE)
+
+    async def _work(self):
+        while True:
+            batch = await next_batch(self.inbox, self.batch_size, self.max_wait)
+            if batch is None:
+                return
+            started = time.monotonic()
+            survivors = await self.handle(batch) or []
+            self.busy_seconds += time.monotonic() - started
+            self.batches += 1
+            self.items_in += len(batch)
+            self.items_out += len(survivors)
+            if self.outbox is not None:
+                for item in survivors:
+                    await self.outbox.put(item)
+
+    def report(self) -> str:
+        return (f"{self.name}: {self.items_in} in / {self.items_out} out in {self.batches} batches "
+                f"({self.workers} workers, {self.busy_seconds:.1f}s busy)")
+
+
+async def run_pipeline(producers: List[Awaitable[None]], source: asyncio.Queue, stages: List[Stage]):
+    """
+    Runs the producers (which fill `source`) and every stage concurrently.
+    `source` gets DONE once all producers are finished. If anything fails,
+    the rest is cancelled and the error re-raised.
+    """
+    async def produce():
+        await gather_or_cancel(producers)
+        await source.put(DONE)
+
+    try:
+        await gather_or_cancel([produce()] + [stage.run() for stage in stages])
+    finally:
+        for stage in stages:
+            logger.info(f"[STREAM] {stage.report()}")
+
+
+async def gather_or_cancel(coros: List[Awaitable[Any]]):
+    """
+    asyncio.gather, except that the first failure cancels (and waits for)
+    the other coroutines instead of leaving them running.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -1,157 +1,822 @@
-from typing import List
+from typing import Awaitable, Callable, List, Optional
 from services.rss import rss_service
 from services.perplexity import perplexity_service
 from services.llm import llm
+from services.batch import batch_service, FINISHED_STATUSES
 from database import db
 from logic.filters import filters
 from logic.discovery import discovery_engine
+from logic.prescorer import prescorer
+from logic.dedup import SeenEmbeddings, collapse_near_duplicates, lexical_signatures, collapse_lexical_duplicates
+from logic.streaming import Stage, run_pipeline
+from utils.minhash import from_bytes, to_bytes
 from config import config
 from utils.logger import logger
+from utils.urls import canonicalize_url, dedupe_by_url
+import asyncio
 import time
 
+# Scoring output journaled for resumed runs (the rest of a lead's state is already stored)
+SCORE_FIELDS = ('virality_score', 'hook_analysis', 'brand_score', 'reasoning')
+# Counters each phase adds to, by the journal stage its input was checkpointed at.
+# A resumed run clears the counters of every phase it runs again.
+RESUMED_COUNTERS = {
+    'ingested': ('after_gatekeeper',),
+    'gatekeeper': ('after_semantic', 'after_prescorer', 'prescore_rejects', 'reused_virality', 'reused_brand'),
+    'filtered': ('after_virality', 'saved', 'scoring_failures'),
+}
+# What a failed candidate keeps for its retry: the item as ingested
+RETRY_FIELDS = ('title', 'url', 'summary', 'source_origin', 'published_at')
+
+
+def _count(stats: dict, key: str, n: int):
+    # Funnel counters add up, so phases can run per chunk (streaming) or resume
+    stats[key] = stats.get(key, 0) + n
+
+
 class Workflow:
     def __init__(self):
         pass
 
-    def run(self, source: str = "all"):
-        logger.info(f"Starting workflow run. Source: {source}")
+    def run(self, source: str = "all", mode: str = "sync", resume_run_id: str = None):
+        """
+        mode="sync" scores and saves candidates in this run. mode="stream"
+        does the same with every phase running at once on micro-batches
+        (see _stream). mode="batch" stops after PHASE 4c and submits their
+        scoring to the Batch API; collect() finishes the run once the
+        results are in.
+        Every stage's survivors are journaled in pipeline_candidates, so a
+        run that crashed can be continued with resume_run_id: each candidate
+        picks up after the last stage it completed.
+        """
+        if resume_run_id:
+            run_id = resume_run_id
+            stats, pending = self._resume(run_id)
+            truncated = False
+        else:
+            logger.info(f"Starting workflow run. Source: {source}, mode: {mode}")
+            run_id = db.start_pipeline_run(source, mode)
+            logger.info(f"Run {run_id} (after a crash, continue it with: python main.py run --resume {run_id})")
+            stats = {'run_id': run_id}
         
-        candidates = []
+        try:
+            if mode == "stream" and not resume_run_id:
+                truncated = asyncio.run(self._stream(source, run_id, stats))
+            else:
+                if not resume_run_id:
+                    url_checked, truncated = self._ingest(source, stats)
+                    self._checkpoint(run_id, "ingested", url_checked, stats)
+                    pending = {"ingested": url_checked}
+            
+                # Phases only run for candidates that have not completed them yet
+                gatekeeper_survivors = pending.get("gatekeeper", [])
+                if pending.get("ingested"):
+                    gatekeeper_survivors = self._gatekeeper(pending["ingested"], stats) + gatekeeper_survivors
+                    self._checkpoint(run_id, "gatekeeper", gatekeeper_survivors, stats)
+            
+                prescore_survivors = pending.get("filtered", []) + pending.get("virality", []) + pending.get("brand", [])
+                if gatekeeper_survivors:
+                    prescore_survivors = self._embed_and_prescore(gatekeeper_survivors, stats) + prescore_survivors
+                    self._checkpoint(run_id, "filtered", prescore_survivors, stats)
+            
+                if mode == "batch" and not resume_run_id and self._submit_batch(prescore_survivors, stats):
+                    # The candidates are safe in scoring_batches; collect() takes over from PHASE 5
+                    self._save_feed_states(truncated)
+                    db.finish_pipeline_run(run_id, "submitted", stats)
+                    self._summary(stats, "SCORING SUBMITTED")
+                    return
+            
+                self._score_and_save(prescore_survivors, stats, config.SCORING_MODE, run_id=run_id)
+            self._save_feed_states(truncated)
+            self._refuel(stats)
+        except Exception as e:
+            try:
+                db.finish_pipeline_run(run_id, "failed", stats, error=str(e))
+            except Exception as journal_error:
+                logger.warning(f"Could not record failure of run {run_id}: {journal_error}")
+            logger.error(f"Run {run_id} failed; continue it with: python main.py run --resume {run_id}")
+            raise
+        
+        db.finish_pipeline_run(run_id, "completed", stats)
+        self._summary(stats, "WORKFLOW COMPLETE")
+
+    def _resume(self, run_id: str):
+        """
+        Loads a crashed run's journal: (stats so far, {stage: candidates}).
+        Candidates that already reached a verdict (processed_urls) are left out.
+        """
+        run = db.get_pipeline_run(run_id)
+        if run is None:
+            raise ValueError(f"No pipeline run {run_id}")
+        if run['status'] not in ("running", "failed"):
+            raise ValueError(f"Run {run_id} is {run['status']}, nothing to resume")
+        
+        rows = db.get_run_candidates(run_id)
+        open_urls = set(db.filter_unprocessed_urls([row['state']['url'] for row in rows]))
+        pending = {}
+        for row in rows:
+            if row['state']['url'] in open_urls:
+                pending.setdefault(row['stage'], []).append(row['state'])
+        
+        # Every phase from the earliest open stage on runs again and recounts
+        stats = dict(run['stats'] or {})
+        stages = list(RESUMED_COUNTERS)
+        first = min((stages.index(stage) for stage in pending if stage in RESUMED_COUNTERS), default=len(stages) - 1)
+        for stage in stages[first:]:
+            for key in RESUMED_COUNTERS[stage]:
+                stats.pop(key, None)
+        
+        progress = ", ".join(f"{len(leads)} after {stage}" for stage, leads in pending.items()) or "nothing left"
+        logger.info(f"Resuming run {run_id} (last checkpoint: {run['stage']}): {progress}, "
+                    f"{len(rows) - len(open_urls)} already decided")
+        return stats, pending
+
+    def _checkpoint(self, run_id: str, stage: str, leads: List[dict], stats: dict, keys: tuple = None):
+        """
+        Journals leads as having completed `stage` (only `keys` of each, when
+        given), so run --resume skips that work. A failed write only costs
+        resumability, never the run.
+        """
+        try:
+            db.checkpoint_candidates(run_id, stage, leads, stats, keys)
+        except Exception as e:
+            logger.warning(f"Could not checkpoint run {run_id} after {stage}: {e}")
+
+    async def _stream(self, source: str, run_id: str, stats: dict) -> bool:
+        """
+        mode="stream": PHASES 1-7 as concurrent stages linked by bounded
+        queues (STREAM_QUEUE_SIZE), each working on micro-batches with its
+        own number of workers. Feeds are scored while others still
+        download, and only a few queues' worth of candidates is in memory
+        at a time. Database calls stay on the event loop thread (the
+        connection is shared); only LLM and HTTP calls run concurrently.
+        Returns whether MAX_CANDIDATES cut the run short.
+        """
+        queues = [asyncio.Queue(config.STREAM_QUEUE_SIZE) for _ in range(5)]
+        ingested, deduped, gatekept, filtered, scored = queues
+        seen_urls = set()
+        in_run = SeenEmbeddings()
+        truncated = False
+        stage = "fused" if config.SCORING_MODE == "fused" else "virality"
+
+        async def fetch_rss():
+            logger.info("Fetching RSS feeds...")
+            async for items in rss_service.stream_all_async(self._feed_states()):
+                for item in items:
+                    await ingested.put(item)
+
+        async def fetch_perplexity():
+            topics = self._next_topics()
+            if topics:
+                async with perplexity_service.async_session():
+                    await self._discover(topics, found=put_ingested)
+
+        async def fetch_retries():
+            await put_ingested(self._retries())
+
+        async def put_ingested(items):
+            for item in items:
+                await ingested.put(item)
+
+        async def dedup(batch):
+            # PHASES 2-2b; URLs are coalesced across every batch of the run
+            nonlocal truncated
+            fresh = []
+            for lead in batch:
+                key = canonicalize_url(lead['url']) if lead.get('url') else None
+                if key in seen_urls:
+                    continue
+                if config.MAX_CANDIDATES and stats.get('ingested', 0) + len(fresh) >= config.MAX_CANDIDATES:
+                    truncated = True
+                    continue
+                if key:
+                    seen_urls.add(key)
+                fresh.append(lead)
+            _count(stats, 'ingested', len(fresh))
+            url_checked = self._dedup(fresh, stats)
+            self._checkpoint(run_id, "ingested", url_checked, stats)
+            return url_checked
+
+        async def gatekeeper(batch):
+            verdicts = await filters.smart_gatekeeper_many_async([batch])
+            survivors = self._gatekeeper_verdicts([batch], verdicts, stats)
+            self._checkpoint(run_id, "gatekeeper", survivors, stats)
+            return survivors
+
+        async def embed(batch):
+            embeddings = await llm.aget_embeddings(self._embedding_texts(batch))
+            survivors = self._embed_and_prescore(batch, stats, embeddings, in_run=in_run)
+            self._checkpoint(run_id, "filtered", survivors, stats)
+            return survivors
+
+        async def score(batch):
+            to_score = self._unscored(batch)
+            await filters.score_many_async(to_score, stage)
+            self._checkpoint(run_id, "virality", self._scored(to_score, 'virality_score'), stats, SCORE_FIELDS)
+            scored_candidates = []
+            survivors = self._virality_verdicts(batch, stats, scored_candidates)
+            self._remember_scored(scored_candidates)
+            return survivors
+
+        async def brand(batch):
+            to_score = [lead for lead in batch if lead.get('brand_score') is None]
+            await filters.score_many_async(to_score, "brand")
+            self._checkpoint(run_id, "brand", self._scored(to_score, 'brand_score'), stats, SCORE_FIELDS)
+            scored_candidates = []
+            self._brand_verdicts_and_save(batch, {id(lead) for lead in to_score}, stats, scored_candidates)
+            self._remember_scored(scored_candidates)
+            return []
+
+        producers = [fetch_retries()]
+        if source in ["all", "rss"]:
+            producers.append(fetch_rss())
+        if source in ["all", "perplexity"]:
+            producers.append(fetch_perplexity())
+
+        wait = config.STREAM_BATCH_WAIT
+        stages = [
+            Stage("dedup", dedup, ingested, deduped, 1, config.STREAM_EMBED_BATCH_SIZE, wait),
+            Stage("gatekeeper", gatekeeper, deduped, gatekept, config.STREAM_GATEKEEPER_WORKERS, config.FILTER_BATCH_SIZE, wait),
+            Stage("embed", embed, gatekept, filtered, config.STREAM_EMBED_WORKERS, config.STREAM_EMBED_BATCH_SIZE, wait),
+            Stage(stage, score, filtered, scored, config.STREAM_SCORE_WORKERS, config.STREAM_SCORE_BATCH_SIZE, wait),
+            Stage("brand", brand, scored, None, config.STREAM_BRAND_WORKERS, config.STREAM_SCORE_BATCH_SIZE, wait),
+        ]
+        started = time.monotonic()
+        async with llm.async_session():
+            await run_pipeline(producers, ingested, stages)
+        logger.info(f"[STREAM] Pipeline drained in {time.monotonic() - started:.1f}s")
+        if truncated:
+            logger.info(f"Stopped ingesting at {config.MAX_CANDIDATES} candidates (MAX_CANDIDATES)")
+        return truncated
+
+    def collect(self, batch_id: str = None, wait: bool = False):
+        """
+        Finishes runs submitted with mode="batch": applies the Batch API
+        scores and continues from PHASE 5. Candidates the batch has no
+        usable answer for are scored synchronously. Batches still running
+        are left for a later collect unless wait=True.
+        """
+        pending = db.get_pending_scoring_batches(batch_id)
+        if not pending:
+            logger.info("No submitted scoring batches to collect.")
+            return
+        
+        for row in pending:
+            if wait:
+                batch = batch_service.wait(row['id'], config.BATCH_POLL_SECONDS)
+            else:
+                batch = batch_service.retrieve(row['id'])
+            if batch.status not in FINISHED_STATUSES:
+                logger.info(f"[BATCH] {row['id']} is still {batch.status}, collect again later")
+                continue
+            
+            candidates = row['candidates']
+            fresh = [lead for lead in candidates if not lead.get('reused_from')]
+            results = batch_service.results(batch)
+            missing = filters.apply_scoring_results(fresh, results)
+            logger.info(f"[BATCH] {row['id']} {batch.status}: {len(results)} responses for {len(fresh)} candidates")
+            if missing:
+                logger.warning(f"[BATCH] {len(missing)} candidates have no batch score, scoring them now")
+            
+            stats = dict(row['run_stats'] or {})
+            self._score_and_save(candidates, stats, row['scoring_mode'], to_score=missing)
+            # The batch only counts as collected once its leads are stored
+            db.flush()
+            db.mark_scoring_batch(row['id'], "collected")
+            self._refuel(stats)
+            if stats.get('run_id'):
+                db.finish_pipeline_run(stats['run_id'], "completed", stats)
+            self._summary(stats, f"BATCH {row['id']} COLLECTED")
+
+    def _ingest(self, source: str, stats: dict):
+        """
+        PHASES 1-2b: ingestion, URL dedup and the lexical near-dup prefilter.
+        Returns (new candidates, truncated).
+        """
+        # Candidates whose calls failed in an earlier run, now due for retry
+        candidates = self._retries()
 
         # ============================================
         # PHASE 1: INGESTION
         # ============================================
         if source in ["all", "rss"]:
             logger.info("Fetching RSS feeds...")
-            rss_items = rss_service.fetch_all()
+            rss_items = rss_service.fetch_all(self._feed_states())
             candidates.extend(rss_items)
             logger.info(f"Fetched {len(rss_items)} items from RSS.")
 
         if source in ["all", "perplexity"]:
-            logger.info("Fetching from Perplexity...")
-            topic_record = db.get_active_discovery_topics()
-            if topic_record:
-                topic_data = topic_record[0]
-                topic = topic_data['topic']
-                topic_id = topic_data['id']
-                logger.info(f"Selected topic: {topic}")
-                
-                query = filters.generate_search_query(topic)
-                logger.info(f"Generated query: {query}")
-                
-                raw_result = perplexity_service.search(query)
-                if raw_result:
-                    normalized = filters.normalize_perplexity_result(raw_result, topic)
-                    candidates.extend(normalized)
-                    logger.info(f"Fetched {len(normalized)} items from Perplexity.")
-                    
-                    db.update_topic_last_searched(topic_id)
-            else:
-                logger.info("No active discovery topics found.")
+            topics = self._next_topics()
+            if topics:
+                candidates.extend(self._discover_sync(topics))
+
+        # Coalesce the same story arriving from several feeds (canonical URL match)
+        candidates, in_run_url_dupes = dedupe_by_url(candidates)
+        if in_run_url_dupes:
+            logger.info(f"Coalesced {in_run_url_dupes} duplicate URLs across sources")
 
         # Apply candidate limit if set (for testing)
+        truncated = False
         if config.MAX_CANDIDATES and len(candidates) > config.MAX_CANDIDATES:
+            truncated = True
             logger.info(f"Limiting candidates from {len(candidates)} to {config.MAX_CANDIDATES} (MAX_CANDIDATES)")
             candidates = candidates[:config.MAX_CANDIDATES]
         
         logger.info(f"Total candidates: {len(candidates)}")
+        _count(stats, 'ingested', len(candidates))
+        return self._dedup(candidates, stats), truncated
+
+    def _retries(self) -> List[dict]:
+        try:
+            retries = db.take_retry_candidates()
+        except Exception as e:
+            logger.warning(f"Could not load candidates queued for retry: {e}")
+            return []
+        if retries:
+            logger.info(f"Re-ingesting {len(retries)} candidates whose calls failed in an earlier run")
+        return retries
+
+    def _retry_later(self, leads: List[dict], stage: str, ttl_days: float):
+        """
+        Marks leads whose `stage` call failed (verdict "failed", expiring
+        after ttl_days) and queues them in retry_candidates. Their feed has
+        moved on (watermark, body hash), so this is their only way back;
+        after FAILED_CANDIDATE_MAX_RETRIES attempts they are given up.
+        """
+        if not leads:
+            return
+        db.mark_urls_processed([lead.get('url') for lead in leads], stage=stage, verdict="failed", ttl_days=ttl_days)
+        retry = []
+        for lead in leads:
+            attempts = lead.get('retry_attempts', 0) + 1
+            if attempts > config.FAILED_CANDIDATE_MAX_RETRIES:
+                logger.warning(f"Giving up on '{lead.get('title')}' after {attempts} failed attempts ({stage})")
+                continue
+            retry.append({**{key: lead.get(key) for key in RETRY_FIELDS}, 'retry_attempts': attempts})
+        try:
+            db.queue_retry_candidates(retry, stage, ttl_days)
+        except Exception as e:
+            logger.warning(f"Could not queue {len(retry)} failed candidates for retry: {e}")
+
+    def _feed_states(self) -> dict:
+        try:
+            return db.get_feed_states()
+        except Exception as e:
+            logger.warning(f"Could not load feed state, fetching all feeds in full: {e}")
+            return {}
+
+    def _next_topics(self) -> List[dict]:
+        logger.info("Fetching from Perplexity...")
+        topics = db.get_active_discovery_topics(config.PERPLEXITY_TOPICS_PER_RUN)
+        if not topics:
+            logger.info("No active discovery topics found.")
+        return topics
+
+    def _discover_sync(self, topics: List[dict]) -> List[dict]:
+        """
+        _discover from sync code, in its own event loop and API sessions.
+        """
+        async def discover():
+            async with llm.async_session(), perplexity_service.async_session():
+                return await self._discover(topics)
+        return asyncio.run(discover())
+
+    async def _discover(self, topics: List[dict], found: Callable[[List[dict]], Awaitable[None]] = None) -> List[dict]:
+        """
+        Runs the query generation -> search -> normalize chain of every
+        topic concurrently (OpenAI calls through the LLM scheduler, searches
+        through Perplexity's own). The topics were already marked searched
+        when get_active_discovery_topics claimed them.
+        found() gets each topic's candidates as soon as they are ready.
+        Must run inside llm.async_session() and
+        perplexity_service.async_session().
+        """
+        async def search(topic_data: dict) -> Optional[List[dict]]:
+            normalized = await self._perplexity_search(topic_data['topic'])
+            if normalized and found:
+                await found(normalized)
+            return normalized
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(search(topic_data) for topic_data in topics))
+
+        candidates = [item for result in results if result for item in result]
+        logger.info(f"Fetched {len(candidates)} items from Perplexity for {len(topics)} topics "
+                    f"in {time.monotonic() - started:.1f}s.")
+        return candidates
 
+    async def _perplexity_search(self, topic: str) -> Optional[List[dict]]:
+        """
+        Query generation, Perplexity search and normalization for one topic.
+        Returns None when nothing came back.
+        """
+        logger.info(f"Selected topic: {topic}")
+        
+        query = await filters.generate_search_query_async(topic)
+        if not query:
+            return None
+        logger.info(f"Generated query: {query}")
+        
+        raw_result, citations = await perplexity_service.asearch(query)
+        if not raw_result:
+            return None
+        normalized = await filters.normalize_perplexity_result_async(raw_result, topic, citations)
+        logger.info(f"Fetched {len(normalized)} items from Perplexity for '{topic}'.")
+        return normalized
+
+    def _dedup(self, candidates: List[dict], stats: dict) -> List[dict]:
+        """
+        PHASES 2-2b: drops already-processed URLs and lexical near-copies.
+        """
         # ============================================
         # PHASE 2: URL DEDUPLICATION (First - Free & Instant)
         # ============================================
-        url_checked = []
-        url_dupes = 0
-        
-        for lead in candidates:
-            url = lead.get('url')
-            if not url:
-                continue
-            if db.check_url_exists(url):
-                url_dupes += 1
-                continue
-            url_checked.append(lead)
+        with_url = [lead for lead in candidates if lead.get('url')]
+        unprocessed = set(db.filter_unprocessed_urls([lead['url'] for lead in with_url]))
+        url_checked = [lead for lead in with_url if lead['url'] in unprocessed]
+        url_dupes = len(with_url) - len(url_checked)
         
         logger.info(f"After URL dedup: {len(url_checked)} candidates ({url_dupes} duplicates removed)")
+        _count(stats, 'after_url_dedup', len(url_checked))
 
+        # ============================================
+        # PHASE 2b: LEXICAL NEAR-DUP PREFILTER (MinHash - CPU only)
+        # ============================================
+        lexical_dupes = 0
+        if config.NEAR_DUP_ENABLED and url_checked:
+            try:
+                signatures = lexical_signatures(url_checked, config.NEAR_DUP_MIN_TOKENS)
+                buckets = [b for entry in signatures if entry for b in entry[1]]
+                known = [
+                    (row['url'], from_bytes(row['minhash']))
+                    for row in db.find_signature_candidates(buckets, config.NEAR_DUP_RETENTION_DAYS)
+                ]
+                signature_by_url = {
+                    lead['url']: entry for lead, entry in zip(url_checked, signatures) if entry
+                }
+                
+                url_checked, dropped = collapse_lexical_duplicates(url_checked, signatures, known, config.NEAR_DUP_THRESHOLD)
+                for dupe, matched_url, score in dropped:
+                    logger.info(f"[NEAR-DUP] {score:.0%} similar to {matched_url}, skipping: {dupe.get('title')}")
+                lexical_dupes = len(dropped)
+                
+                db.mark_urls_processed([dupe['url'] for dupe, _, _ in dropped], stage="near_duplicate", verdict="duplicate")
+                db.insert_signatures(
+                    [
+                        (lead['url'], to_bytes(signature_by_url[lead['url']][0]), signature_by_url[lead['url']][1])
+                        for lead in url_checked if lead['url'] in signature_by_url
+                    ],
+                    config.NEAR_DUP_RETENTION_DAYS
+                )
+            except Exception as e:
+                logger.warning(f"Near-duplicate prefilter skipped: {e}")
+            
+            logger.info(f"After Near-dup prefilter: {len(url_checked)} candidates ({lexical_dupes} near-copies removed)")
+        
+        _count(stats, 'after_near_dup', len(url_checked))
+        return url_checked
+
+    def _gatekeeper(self, url_checked: List[dict], stats: dict) -> List[dict]:
         # ============================================
         # PHASE 3: BATCH GATEKEEPER (Quick Relevance Filter)
         # ============================================
         batch_size = config.FILTER_BATCH_SIZE
-        gatekeeper_survivors = []
+        batches = [url_checked[i : i + batch_size] for i in range(0, len(url_checked), batch_size)]
+        
+        # All batches are judged concurrently; verdicts come back in batch order
+        phase_started = time.monotonic()
+        verdicts = filters.smart_gatekeeper_verdicts_many(batches)
+        logger.info(f"Gatekeeper judged {len(batches)} batches in {time.monotonic() - phase_started:.1f}s")
+        return self._gatekeeper_verdicts(batches, verdicts, stats)
 
-        for i in range(0, len(url_checked), batch_size):
-            batch = url_checked[i : i + batch_size]
-            logger.info(f"Gatekeeper batch {i//batch_size + 1}/{(len(url_checked)+batch_size-1)//batch_size}")
-            
-            batch_survivors = filters.smart_gatekeeper(batch)
+    def _gatekeeper_verdicts(self, batches: List[List[dict]], verdicts: list, stats: dict) -> List[dict]:
+        """
+        Persists gatekeeper rejections and returns the survivors of all batches.
+        """
+        gatekeeper_survivors = []
+        for n, (batch, (batch_survivors, batch_rejected)) in enumerate(zip(batches, verdicts), 1):
+            logger.info(f"Gatekeeper batch {n}/{len(batches)}")
             gatekeeper_survivors.extend(batch_survivors)
             logger.info(f"Batch survivor rate: {len(batch_survivors)}/{len(batch)}")
+            if batch and not batch_survivors and not batch_rejected:
+                # The call failed: nothing was judged
+                self._retry_later(batch, "gatekeeper", config.GATEKEEPER_FAILURE_TTL_DAYS)
+            
+            # Persist rejections so the same titles are not re-judged next run
+            db.mark_urls_processed(
+                [item['url'] for item in batch_rejected],
+                stage="gatekeeper", verdict="rejected", ttl_days=config.GATEKEEPER_REJECTION_TTL_DAYS
+            )
 
         logger.info(f"After Gatekeeper: {len(gatekeeper_survivors)} candidates")
+        _count(stats, 'after_gatekeeper', len(gatekeeper_survivors))
+        return gatekeeper_survivors
 
+    def _embed_and_prescore(self, gatekeeper_survivors: List[dict], stats: dict,
+                            embeddings: List[List[float]] = None, in_run: SeenEmbeddings = None) -> List[dict]:
+        """
+        PHASES 4-4c: embeddings, semantic dedup, score reuse and prescore.
+        Returns the candidates left to score. Pass embeddings (aligned with
+        gatekeeper_survivors) when they were already fetched, e.g. async.
+        in_run holds the embeddings of earlier micro-batches of the same run;
+        copies of them are dropped too, and this batch is added to it.
+        """
         # ============================================
         # PHASE 4: SEMANTIC DEDUPLICATION (Embedding Similarity)
         # ============================================
         embedding_survivors = []
         semantic_dupes = 0
         
-        for lead in gatekeeper_survivors:
-            title = lead.get('title', 'Unknown')
-            
-            # Generate embedding
-            embedding = llm.get_embedding(f"{lead['title']}\n{lead['summary']}")
+        # Generate all embeddings up front (one request per EMBEDDING_BATCH_SIZE leads)
+        if embeddings is None:
+            embeddings = llm.get_embeddings(self._embedding_texts(gatekeeper_survivors))
+        
+        embedded = []
+        embed_failures = []
+        for lead, embedding in zip(gatekeeper_survivors, embeddings):
             if not embedding:
-                logger.warning(f"[EMBED] Failed to generate embedding for: {title}")
+                logger.warning(f"[EMBED] Failed to generate embedding for: {lead.get('title', 'Unknown')}")
+                embed_failures.append(lead)
                 continue
-            
             lead['embedding'] = embedding
+            embedded.append(lead)
+        # Short TTL: a transient API failure should be retried, just not on every tick
+        self._retry_later(embed_failures, "embedding", config.EMBEDDING_FAILURE_TTL_DAYS)
+        
+        # Same story from several feeds in this run: keep one copy (by source priority)
+        embedded, intra_run_dupes = collapse_near_duplicates(embedded, config.SIMILARITY_THRESHOLD)
+        for dupe, kept, similarity in intra_run_dupes:
+            logger.info(f"[DEDUP] Same-run duplicate ({similarity:.2f}) of '{kept.get('title')}', skipping: {dupe.get('title')}")
+        db.mark_urls_processed([dupe.get('url') for dupe, _, _ in intra_run_dupes], stage="semantic_duplicate", verdict="duplicate")
+        semantic_dupes += len(intra_run_dupes)
+        if in_run is not None:
+            embedded, earlier_dupes = in_run.collapse(embedded, config.SIMILARITY_THRESHOLD)
+            for dupe, kept, similarity in earlier_dupes:
+                logger.info(f"[DEDUP] Same-run duplicate ({similarity:.2f}) of '{kept.get('title')}', skipping: {dupe.get('title')}")
+            db.mark_urls_processed([dupe.get('url') for dupe, _, _ in earlier_dupes], stage="semantic_duplicate", verdict="duplicate")
+            semantic_dupes += len(earlier_dupes)
+            in_run.add(embedded)
+        
+        # Nearest existing lead for every candidate in one query
+        nearest = db.nearest_leads([lead['embedding'] for lead in embedded])
+        distance_threshold = 1 - config.SIMILARITY_THRESHOLD
+        
+        for lead, match in zip(embedded, nearest):
+            title = lead.get('title', 'Unknown')
+            distance = match['distance']
+            lead['nearest_lead_distance'] = distance
             
-            # Strict similarity check (0.85 threshold = 85% similar is a dupe)
-            if db.check_similarity(embedding, threshold=config.SIMILARITY_THRESHOLD):
-                logger.info(f"[DEDUP] Semantically similar, skipping: {title}")
-                db.mark_url_processed(lead.get('url'))
+            # Strict similarity check (cosine distance below 1 - SIMILARITY_THRESHOLD is a dupe)
+            if distance is not None and distance < distance_threshold:
+                logger.info(f"[DEDUP] Semantically similar (distance {distance:.3f} to lead {match['lead_id']}), skipping: {title}")
+                db.mark_url_processed(lead.get('url'), stage="semantic_duplicate", verdict="duplicate",
+                                      reason=f"lead {match['lead_id']} at distance {distance:.3f}")
                 semantic_dupes += 1
                 continue
             
             embedding_survivors.append(lead)
         
+        survivor_distances = sorted(l['nearest_lead_distance'] for l in embedding_survivors if l['nearest_lead_distance'] is not None)
+        if survivor_distances:
+            logger.info(
+                f"[DEDUP] Survivor nearest-lead distance: min {survivor_distances[0]:.3f}, "
+                f"median {survivor_distances[len(survivor_distances) // 2]:.3f} (cutoff {distance_threshold:.3f})"
+            )
+        
         logger.info(f"After Semantic dedup: {len(embedding_survivors)} candidates ({semantic_dupes} similar stories removed)")
 
+        # ============================================
+        # PHASE 4b: SCORE REUSE (near-identical past candidates)
+        # ============================================
+        # The same story re-published under a new URL inherits the scores it
+        # got last time instead of paying for two more GPT-4o calls
+        reused_virality = 0
+        reused_brand = 0
+        if config.SCORE_REUSE_ENABLED and embedding_survivors:
+            try:
+                matches = db.nearest_scored_candidates([lead['embedding'] for lead in embedding_survivors])
+            except Exception as e:
+                logger.warning(f"Score reuse skipped: {e}")
+                matches = []
+            reuse_threshold = 1 - config.SCORE_REUSE_THRESHOLD
+            
+            for lead, match in zip(embedding_survivors, matches):
+                distance = match['distance']
+                if distance is None or distance >= reuse_threshold or match['virality_score'] is None:
+                    continue
+                lead['reused_from'] = match['id']
+                lead['virality_score'] = match['virality_score']
+                lead['hook_analysis'] = match['hook_analysis']
+                reused_virality += 1
+                if match['brand_score'] is not None:
+                    lead['brand_score'] = match['brand_score']
+                    lead['reasoning'] = match['reasoning']
+                    reused_brand += 1
+                logger.info(f"[REUSE] Scores from candidate {match['id']} (distance {distance:.3f}): {lead.get('title')}")
+            
+            if embedding_survivors:
+                logger.info(
+                    f"[REUSE] {reused_virality}/{len(embedding_survivors)} candidates reused past scores "
+                    f"({reused_virality / len(embedding_survivors):.0%}), saving {reused_virality} virality "
+                    f"and {reused_brand} brand calls"
+                )
+        
+        # ============================================
+        # PHASE 4c: LOCAL PRESCORE (ridge over embeddings - CPU only)
+        # ============================================
+        prescore_survivors = embedding_survivors
+        prescore_rejects = 0
+        if config.PRESCORER_ENABLED and prescorer.load():
+            pending = [lead for lead in embedding_survivors if not lead.get('reused_from')]
+            scored = prescorer.score([lead['embedding'] for lead in pending])
+            if scored is not None:
+                rejected = set()
+                for lead, predicted, upper in zip(pending, *scored):
+                    lead['predicted_virality'] = float(predicted)
+                    if upper >= config.VIRALITY_THRESHOLD:
+                        continue
+                    lead['prescore_reject'] = True
+                    if config.PRESCORER_SHADOW:
+                        continue
+                    logger.info(f"[PRESCORE] Rejected (predicted {predicted:.0f}, at most {upper:.0f}): {lead.get('title')}")
+                    db.mark_url_processed(lead.get('url'), stage="prescore", verdict="rejected",
+                                          reason=f"predicted {predicted:.0f}, at most {upper:.0f}",
+                                          ttl_days=config.PRESCORER_REJECTION_TTL_DAYS)
+                    rejected.add(id(lead))
+                prescore_rejects = len(rejected)
+                prescore_survivors = [lead for lead in embedding_survivors if id(lead) not in rejected]
+                mode = "shadow mode, nothing rejected" if config.PRESCORER_SHADOW else f"{prescore_rejects} auto-rejected"
+                flagged = sum(1 for lead in pending if lead.get('prescore_reject'))
+                logger.info(f"[PRESCORE] {flagged}/{len(pending)} candidates confidently below {config.VIRALITY_THRESHOLD} ({mode})")
+        
+        _count(stats, 'after_semantic', len(embedding_survivors))
+        _count(stats, 'after_prescorer', len(prescore_survivors))
+        _count(stats, 'prescore_rejects', prescore_rejects)
+        _count(stats, 'reused_virality', reused_virality)
+        _count(stats, 'reused_brand', reused_brand)
+        return prescore_survivors
+
+    @staticmethod
+    def _embedding_texts(leads: List[dict]) -> List[str]:
+        return [f"{lead['title']}\n{lead['summary']}" for lead in leads]
+
+    def _submit_batch(self, prescore_survivors: List[dict], stats: dict) -> bool:
+        """
+        Writes PHASE 5 scoring requests as JSONL, submits them to the Batch
+        API and persists the job with its candidates. Returns False when
+        there is nothing to score (the run then finishes synchronously).
+        """
+        to_score = [lead for lead in prescore_survivors if not lead.get('reused_from')]
+        if not to_score:
+            logger.info("[BATCH] Nothing to score, finishing the run synchronously")
+            return False
+        
+        # Two-stage runs get virality from the batch; collect() brand-checks the survivors
+        stage = "fused" if config.SCORING_MODE == "fused" else "virality"
+        requests = filters.scoring_requests(to_score, stage)
+        path = batch_service.write_requests(requests, config.BATCH_DIR / f"scoring_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+        batch_id = batch_service.submit(path, f"lead_generator {stage} scoring, {len(to_score)} candidates")
+        try:
+            db.insert_scoring_batch(batch_id, config.SCORING_MODE, config.OPENAI_MODEL_MAIN, prescore_survivors, stats)
+        except Exception:
+            logger.error(f"[BATCH] {batch_id} was submitted but could not be recorded; its requests are in {path}")
+            raise
+        
+        # Not re-ingested (and re-submitted) by later runs while the batch is pending
+        db.mark_urls_processed([lead['url'] for lead in prescore_survivors], stage="batch", verdict="pending",
+                               ttl_days=config.BATCH_PENDING_TTL_DAYS)
+        stats['batch'] = f"{batch_id} ({len(requests)} requests for {len(to_score)} candidates)"
+        return True
+
+    def _score_and_save(self, prescore_survivors: List[dict], stats: dict, scoring_mode: str,
+                        to_score: List[dict] = None, run_id: str = None):
+        """
+        PHASES 5-7: virality (or fused) scoring, brand check and save.
+        to_score defaults to every candidate not scored yet (reused scores,
+        or scored before a resumed run crashed); collect() passes only the
+        ones the Batch API left unscored. Fresh scores are journaled under
+        run_id as soon as they arrive.
+        """
+        # Freshly scored candidates, remembered for reuse by future runs
+        scored_candidates = []
+
         # ============================================
         # PHASE 5: VIRALITY CHECK (Threshold: 80+)
         # ============================================
+        phase_started = time.monotonic()
+        if to_score is None:
+            to_score = self._unscored(prescore_survivors)
+        if scoring_mode == "fused":
+            # Virality and brand in one call; both thresholds are applied below
+            filters.fused_check_many(to_score)
+        else:
+            filters.virality_check_many(to_score)
+        if to_score:
+            logger.info(f"[VIRALITY] Scored {len(to_score)} candidates ({scoring_mode}) in {time.monotonic() - phase_started:.1f}s")
+            if run_id:
+                self._checkpoint(run_id, "virality", self._scored(to_score, 'virality_score'), stats, SCORE_FIELDS)
+        virality_survivors = self._virality_verdicts(prescore_survivors, stats, scored_candidates)
+
+        # ============================================
+        # PHASE 6: BRAND CHECK (Threshold: 70+)
+        # ============================================
+        phase_started = time.monotonic()
+        # Fused scoring (or score reuse) already set brand_score for most survivors
+        to_score = [lead for lead in virality_survivors if lead.get('brand_score') is None]
+        filters.brand_lens_check_many(to_score)
+        if to_score:
+            logger.info(f"[BRAND] Scored {len(to_score)} candidates in {time.monotonic() - phase_started:.1f}s")
+            if run_id:
+                self._checkpoint(run_id, "brand", self._scored(to_score, 'brand_score'), stats, SCORE_FIELDS)
+        self._brand_verdicts_and_save(virality_survivors, {id(lead) for lead in to_score}, stats, scored_candidates)
+        self._remember_scored(scored_candidates)
+
+    @staticmethod
+    def _unscored(prescore_survivors: List[dict]) -> List[dict]:
+        # Reused scores, and scores from before a resumed run crashed, are kept
+        return [lead for lead in prescore_survivors
+                if not lead.get('reused_from') and lead.get('virality_score') is None]
+
+    @staticmethod
+    def _scored(leads: List[dict], score_key: str) -> List[dict]:
+        # Leads whose scoring call failed are not journaled; a resumed run scores them again
+        return [lead for lead in leads if lead.get(score_key) is not None]
+
+    def _scoring_failed(self, lead: dict, stage: str, stats: dict):
+        """
+        A lead whose scoring call failed is neither a rejection nor a
+        scored candidate: it is queued for retry after
+        SCORING_FAILURE_TTL_DAYS and never offered for score reuse.
+        """
+        logger.warning(f"[{stage.upper()}] Not scored (call failed), retrying in a later run: {lead.get('title', 'Unknown')}")
+        self._retry_later([lead], stage, config.SCORING_FAILURE_TTL_DAYS)
+        _count(stats, 'scoring_failures', 1)
+
+    def _virality_verdicts(self, prescore_survivors: List[dict], stats: dict, scored_candidates: List[dict]) -> List[dict]:
+        """
+        Applies VIRALITY_THRESHOLD to scored candidates. Returns the survivors.
+        """
         virality_survivors = []
+        fresh = [lead for lead in prescore_survivors if not lead.get('reused_from')]
+        
+        # Prescorer predictions vs the real scores (shadow mode: would-be rejections)
+        predicted = [lead for lead in fresh if 'predicted_virality' in lead and lead['virality_score'] is not None]
+        if predicted:
+            for lead in predicted:
+                if lead.get('prescore_reject'):
+                    logger.info(f"[PRESCORE] Shadow reject: predicted {lead['predicted_virality']:.0f}, "
+                                f"actual {lead['virality_score']}: {lead.get('title')}")
+            errors = [abs(lead['predicted_virality'] - lead['virality_score']) for lead in predicted]
+            wrong = sum(1 for lead in predicted if lead.get('prescore_reject') and lead['virality_score'] >= config.VIRALITY_THRESHOLD)
+            logger.info(f"[PRESCORE] MAE {sum(errors) / len(errors):.1f} on {len(predicted)} candidates, "
+                        f"{wrong} flagged candidates actually passed virality")
         
-        for lead in embedding_survivors:
+        for lead in prescore_survivors:
             title = lead.get('title', 'Unknown')
             url = lead.get('url')
+            reused = lead.get('reused_from')
             
-            lead = filters.virality_check(lead)
-            
+            if lead['virality_score'] is None:
+                self._scoring_failed(lead, "virality", stats)
+                continue
             if lead['virality_score'] < config.VIRALITY_THRESHOLD:
                 logger.info(f"[VIRALITY] Rejected ({lead['virality_score']}/100): {title}")
-                db.mark_url_processed(url)
+                reason = f"score {lead['virality_score']}" + (f" (reused from {reused})" if reused else "")
+                db.mark_url_processed(url, stage="virality", verdict="rejected", reason=reason)
+                if not reused:
+                    scored_candidates.append({**lead, 'verdict': "rejected_virality"})
                 continue
             
             logger.info(f"[VIRALITY] Passed ({lead['virality_score']}/100): {title}")
             virality_survivors.append(lead)
 
         logger.info(f"After Virality check: {len(virality_survivors)} candidates")
+        _count(stats, 'after_virality', len(virality_survivors))
+        return virality_survivors
 
-        # ============================================
-        # PHASE 6: BRAND CHECK (Threshold: 70+)
-        # ============================================
+    def _brand_verdicts_and_save(self, virality_survivors: List[dict], brand_scored: set, stats: dict,
+                                 scored_candidates: List[dict]):
+        """
+        Applies BRAND_THRESHOLD and saves the leads that pass (PHASE 7).
+        brand_scored holds id() of the leads brand-scored just now, as
+        opposed to inheriting a reused score.
+        """
         saved_count = 0
         
         for lead in virality_survivors:
             title = lead.get('title', 'Unknown')
             url = lead.get('url')
+            reused = lead.get('reused_from') if id(lead) not in brand_scored else None
             
-            lead = filters.brand_lens_check(lead)
-            
+            if lead['brand_score'] is None:
+                self._scoring_failed(lead, "brand", stats)
+                continue
             if lead['brand_score'] < config.BRAND_THRESHOLD:
                 logger.info(f"[BRAND] Rejected ({lead['brand_score']}/100): {title}")
-                db.mark_url_processed(url)
+                reason = f"score {lead['brand_score']}" + (f" (reused from {reused})" if reused else "")
+                db.mark_url_processed(url, stage="brand", verdict="rejected", reason=reason)
+                if not lead.get('reused_from'):
+                    scored_candidates.append({**lead, 'verdict': "rejected_brand"})
                 continue
 
             # ============================================
@@ -162,8 +827,27 @@ class Workflow:
             logger.info(f"[SAVED] {title} (Virality: {lead['virality_score']}, Brand: {lead['brand_score']})")
             
             # Mark URL as processed
-            db.mark_url_processed(url)
-            
+            db.mark_url_processed(url, stage="saved", verdict="saved", reason=f"lead {lead_id}")
+            if not lead.get('reused_from'):
+                scored_candidates.append({**lead, 'verdict': "saved"})
+        
+        _count(stats, 'saved', saved_count)
+
+    def _remember_scored(self, scored_candidates: List[dict]):
+        if scored_candidates:
+            try:
+                db.insert_scored_candidates(scored_candidates)
+            except Exception as e:
+                logger.warning(f"Could not remember scored candidates for reuse: {e}")
+
+    def _save_feed_states(self, truncated: bool):
+        # Feed state is only saved once every candidate has been handled (or
+        # queued in a scoring batch), so a crashed (or MAX_CANDIDATES-truncated)
+        # run re-reads the same entries
+        if rss_service.pending_feed_states and not truncated:
+            db.upsert_feed_states(list(rss_service.pending_feed_states.values()))
+
+    def _refuel(self, stats: dict):
         # ============================================
         # PHASE 8: REFUEL (Discovery Engine)
         # ============================================
@@ -179,19 +863,45 @@ class Workflow:
         if discovery_payload:
             db.insert_discovery_topics(discovery_payload)
             logger.info(f"[DISCOVERY] Injected {len(discovery_payload)} fresh entropy topics: {new_topics_list}")
+        stats['entropy'] = len(new_topics_list)
 
+    def _summary(self, stats: dict, title: str):
         # ============================================
         # SUMMARY
         # ============================================
         logger.info("=" * 50)
-        logger.info("WORKFLOW COMPLETE")
-        logger.info(f"  Total ingested:        {len(candidates)}")
-        logger.info(f"  After URL dedup:       {len(url_checked)}")
-        logger.info(f"  After Gatekeeper:      {len(gatekeeper_survivors)}")
-        logger.info(f"  After Semantic dedup:  {len(embedding_survivors)}")
-        logger.info(f"  After Virality:        {len(virality_survivors)}")
-        logger.info(f"  Saved to DB:           {saved_count}")
-        logger.info(f"  Entropy Injected:      {len(new_topics_list)} topics")
+        logger.info(title)
+        logger.info(f"  Total ingested:        {stats.get('ingested', 0)}")
+        logger.info(f"  After URL dedup:       {stats.get('after_url_dedup', 0)}")
+        logger.info(f"  After Near-dup filter: {stats.get('after_near_dup', 0)}")
+        logger.info(f"  After Gatekeeper:      {stats.get('after_gatekeeper', 0)}")
+        logger.info(f"  After Semantic dedup:  {stats.get('after_semantic', 0)}")
+        if stats.get('prescore_rejects'):
+            logger.info(f"  After Prescorer:       {stats.get('after_prescorer', 0)}")
+        if 'batch' in stats:
+            logger.info(f"  Scoring batch:         {stats['batch']}")
+        if 'after_virality' in stats:
+            logger.info(f"  After Virality:        {stats['after_virality']}")
+        if config.SCORE_REUSE_ENABLED:
+            logger.info(f"  Scores reused:         {stats.get('reused_virality', 0)} virality / {stats.get('reused_brand', 0)} brand")
+        if stats.get('scoring_failures'):
+            logger.info(f"  Scoring failures:      {stats['scoring_failures']} (retried in a later run)")
+        if 'saved' in stats:
+            logger.info(f"  Saved to DB:           {stats['saved']}")
+        if 'entropy' in stats:
+            logger.info(f"  Entropy Injected:      {stats['entropy']} topics")
+        if filters.perplexity_parse_report():
+            logger.info(f"  Perplexity parsing:    {filters.perplexity_parse_report()}")
+        if db.write_buffer:
+            logger.info(f"  Buffered writes:       {db.write_buffer.stats()}")
+        if llm.embedding_cache:
+            logger.info(f"  Embedding cache:       {llm.embedding_cache.stats()}")
+        if llm.response_cache:
+            logger.info(f"  LLM response cache:    {llm.response_cache.stats()}")
+        if config.LLM_ASYNC:
+            logger.info(f"  LLM scheduler:         {llm.scheduler.stats()}")
+        for line in filters.stage_report():
+            logger.info(f"  Scoring {line}")
         logger.info("=" * 50)
 
 workflow = Workflow()
@@ -1,23 +1,100 @@
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# code/ on sys.path for the shared llm_cache package (used by services/llm.py)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
 import typer
 from logic.workflow import workflow
-from database import db
+from logic.prescorer import prescorer
+from database import db, parse_vector
 from utils.logger import logger
 from config import config
 
 app = typer.Typer()
 
 @app.command()
-def run(source: str = typer.Option("all", help="Source to run: 'rss', 'perplexity', or 'all'")):
+def run(source: str = typer.Option("all", help="Source to run: 'rss', 'perplexity', or 'all'"),
+        mode: str = typer.Option("sync", help="'sync' scores now; 'stream' overlaps every phase on micro-batches; 'batch' submits scoring to the Batch API (finish with `collect`)"),
+        resume: Optional[str] = typer.Option(None, help="Continue a crashed run from each candidate's last completed stage")):
     """
     Runs the lead generation workflow.
     """
+    if mode not in ("sync", "stream", "batch"):
+        typer.echo(f"Unknown mode '{mode}', expected 'sync', 'stream' or 'batch'.")
+        raise typer.Exit(1)
     try:
         config.validate()
-        logger.info(f"Configuration valid. Starting workflow with source={source}")
-        workflow.run(source=source)
+        if resume:
+            logger.info(f"Configuration valid. Resuming run {resume}")
+        else:
+            logger.info(f"Configuration valid. Starting workflow with source={source}, mode={mode}")
+        workflow.run(source=source, mode=mode, resume_run_id=resume)
     except Exception as e:
         logger.error(f"Workflow failed: {e}")
         # raise # Uncomment to see full traceback in dev
+    finally:
+        # Writes anything still buffered (e.g. after a failure mid-run)
+        db.close()
+
+@app.command()
+def collect(batch_id: Optional[str] = typer.Argument(None, help="Batch to collect (default: every submitted batch)"),
+            wait: bool = typer.Option(False, help="Poll until unfinished batches complete instead of skipping them")):
+    """
+    Collects Batch API scores from `run --mode batch` and finishes those runs (PHASE 5 onward).
+    """
+    try:
+        config.validate()
+        workflow.collect(batch_id=batch_id, wait=wait)
+    except Exception as e:
+        logger.error(f"Collect failed: {e}")
+    finally:
+        db.close()
+
+@app.command()
+def train_prescorer(if_older_than: Optional[float] = typer.Option(
+        None, help="Only retrain if the saved model is older than this many days (for cron)")):
+    """
+    Trains (or retrains) the local virality prescorer from past scores.
+    """
+    if if_older_than is not None and prescorer.load():
+        age_days = (time.time() - prescorer.trained_at()) / 86400
+        if age_days < if_older_than:
+            typer.echo(f"Prescorer is {age_days:.1f} days old, not retraining.")
+            return
+
+    rows = db.get_scoring_history()
+    if len(rows) < config.PRESCORER_MIN_TRAINING_ROWS:
+        typer.echo(f"Need at least {config.PRESCORER_MIN_TRAINING_ROWS} scored candidates, found {len(rows)}.")
+        raise typer.Exit(1)
+
+    metrics = prescorer.train(
+        [parse_vector(row['embedding']) for row in rows],
+        [row['virality_score'] for row in rows],
+    )
+    typer.echo(
+        f"Trained on {metrics['rows']} candidates ({metrics['dims']} dims, alpha {metrics['alpha']}): "
+        f"out-of-fold MAE {metrics['mae']:.1f}, residual std {metrics['residual_std']:.1f}"
+    )
+    typer.echo(
+        f"At {config.PRESCORER_CONFIDENCE:.0%} confidence it would have auto-rejected {metrics['would_reject']} "
+        f"of them, {metrics['wrongly_rejected']} of which actually reached {config.VIRALITY_THRESHOLD}+."
+    )
+    typer.echo(f"Saved to {config.PRESCORER_PATH}")
+
+@app.command()
+def migrate_urls():
+    """
+    Rewrites stored processed_urls / content_signatures keys to their canonical form (run once after upgrading).
+    """
+    try:
+        changed = db.canonicalize_stored_urls()
+        for table, count in changed.items():
+            typer.echo(f"{table}: {count} URLs canonicalized (duplicates merged, newest verdict kept)")
+    finally:
+        db.close()
 
 @app.command()
 def stats():
@@ -0,0 +1,26 @@
+-- Run journal: every workflow run, and each candidate's last completed stage
+-- with its state (gatekeeper pass, embedding, scores), so a crashed run can
+-- continue where it stopped: python main.py run --resume <run_id>
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+  id uuid PRIMARY KEY,
+  source text,
+  mode text,                          -- sync / batch
+  status text NOT NULL CHECK (status IN ('running', 'completed', 'submitted', 'failed')),
+  stage text,                         -- last checkpointed stage
+  stats jsonb,                        -- funnel counts so far
+  error text,
+  started_at timestamp with time zone DEFAULT now(),
+  updated_at timestamp with time zone DEFAULT now(),
+  finished_at timestamp with time zone
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_candidates (
+  run_id uuid NOT NULL REFERENCES pipeline_runs(id) ON DELETE CASCADE,
+  url text NOT NULL,
+  seq bigserial,                      -- keeps ingestion order on resume
+  stage text NOT NULL,                -- ingested, gatekeeper, filtered, virality, brand
+  state jsonb NOT NULL,               -- the candidate as of that stage
+  created_at timestamp with time zone DEFAULT now(),
+  updated_at timestamp with time zone DEFAULT now(),
+  PRIMARY KEY (run_id, url)
+);
@@ -0,0 +1,11 @@
+-- Candidates whose gatekeeper / embedding / scoring call failed. Their feed
+-- state has moved past them (watermark, body hash), so the feed will not
+-- emit them again; each run re-ingests the ones whose retry_at has passed.
+CREATE TABLE IF NOT EXISTS retry_candidates (
+  url text PRIMARY KEY,               -- canonical URL (utils/urls.py)
+  candidate jsonb NOT NULL,           -- the ingested item (title, url, summary, source_origin, published_at)
+  stage text,                         -- stage whose call failed
+  retry_at timestamp with time zone NOT NULL,
+  created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS retry_candidates_retry_at_idx ON retry_candidates (retry_at);
@@ -0,0 +1,9 @@
+-- Conditional-GET state per RSS feed (ETag / Last-Modified / body hash / entry watermark)
+CREATE TABLE IF NOT EXISTS feed_state (
+  feed_url text PRIMARY KEY,
+  etag text,
+  last_modified text,
+  content_hash text,
+  last_entry_at timestamp with time zone,
+  updated_at timestamp with time zone DEFAULT now()
+);
@@ -0,0 +1,18 @@
+-- Compact embeddings: 512-dim halfvec column + HNSW index (requires pgvector >= 0.7.0)
+-- Enable with Config.EMBEDDING_COMPACT = True once this has run.
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS embedding_compact halfvec(512);
+
+-- Backfill existing rows. text-embedding-3 models are trained so that a prefix
+-- of the vector, re-normalized, is the embedding the `dimensions` parameter
+-- returns. So the first 512 dims of each stored 1536-dim vector give the same
+-- space new rows are written in.
+UPDATE leads
+SET embedding_compact = l2_normalize(subvector(embedding, 1, 512))::halfvec(512)
+WHERE embedding IS NOT NULL AND embedding_compact IS NULL;
+
+CREATE INDEX IF NOT EXISTS leads_embedding_compact_idx
+  ON leads USING hnsw (embedding_compact halfvec_cosine_ops);
+
+-- Once compact mode is on and verified, the full-precision index can be dropped
+-- to reclaim memory (new rows in compact mode leave `embedding` NULL):
+-- DROP INDEX IF EXISTS leads_embedding_idx;
@@ -0,0 +1,9 @@
+-- Persisted LSH index for the lexical near-duplicate prefilter (utils/minhash.py)
+CREATE TABLE IF NOT EXISTS content_signatures (
+  url text PRIMARY KEY,
+  minhash bytea NOT NULL,
+  buckets bigint[] NOT NULL,
+  created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS content_signatures_buckets_idx ON content_signatures USING gin (buckets);
+CREATE INDEX IF NOT EXISTS content_signatures_created_at_idx ON content_signatures (created_at);
@@ -0,0 +1,8 @@
+-- Record which stage decided each processed URL, and let some verdicts expire
+ALTER TABLE processed_urls
+  ADD COLUMN IF NOT EXISTS stage text,        -- gatekeeper, near_duplicate, semantic_duplicate, embedding, virality, brand, saved
+  ADD COLUMN IF NOT EXISTS verdict text,      -- rejected, duplicate, failed, saved
+  ADD COLUMN IF NOT EXISTS reason text,
+  ADD COLUMN IF NOT EXISTS expires_at timestamp with time zone;  -- NULL = permanent
+
+CREATE INDEX IF NOT EXISTS processed_urls_expires_at_idx ON processed_urls (expires_at) WHERE expires_at IS NOT NULL;
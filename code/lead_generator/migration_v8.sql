@@ -0,0 +1,20 @@
+-- Every candidate that reached virality/brand scoring, with its embedding and scores.
+-- New candidates that are near-identical to one of these inherit its verdict
+-- instead of being re-scored by GPT-4o (see SCORE_REUSE_* in config.py).
+CREATE TABLE IF NOT EXISTS scored_candidates (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  url text NOT NULL,
+  title text,
+  embedding vector(1536),
+  embedding_compact halfvec(512),
+  virality_score integer,
+  hook_analysis text,
+  brand_score integer,
+  reasoning text,
+  verdict text CHECK (verdict IN ('saved', 'rejected_virality', 'rejected_brand')),
+  created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS scored_candidates_embedding_idx
+  ON scored_candidates USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX IF NOT EXISTS scored_candidates_embedding_compact_idx
+  ON scored_candidates USING hnsw (embedding_compact halfvec_cosine_ops);
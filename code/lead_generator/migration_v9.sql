@@ -0,0 +1,14 @@
+-- Scoring jobs submitted to the OpenAI Batch API (python main.py run --mode batch).
+-- Each row holds the candidates waiting for their scores, so
+-- python main.py collect can resume the workflow from PHASE 5.
+CREATE TABLE IF NOT EXISTS scoring_batches (
+  id text PRIMARY KEY,                 -- Batch API batch id
+  scoring_mode text NOT NULL,          -- SCORING_MODE at submit time (two_stage / fused)
+  model text NOT NULL,
+  candidates jsonb NOT NULL,           -- Leads after PHASE 4c, embeddings included
+  run_stats jsonb,                     -- Funnel counts of the submitting run, for the summary
+  status text NOT NULL DEFAULT 'submitted' CHECK (status IN ('submitted', 'collected')),
+  created_at timestamp with time zone DEFAULT now(),
+  collected_at timestamp with time zone
+);
+CREATE INDEX IF NOT EXISTS scoring_batches_pending_idx ON scoring_batches (created_at) WHERE status = 'submitted';
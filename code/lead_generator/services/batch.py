@@ -0,0 +1,97 @@
+from openai import OpenAI
+from config import config
+from utils.logger import logger
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+import json
+import time
+
+# Batch states after which no more results will arrive
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchService:
+    """
+    OpenAI Batch API for offline scoring: chat requests are written as JSONL,
+    uploaded, and answered within the 24h completion window at half the
+    synchronous price, outside the per-minute rate limits.
+    BATCH_API_BASE_URL points the client at another server (e.g. the local
+    fake in services/fake_batch_api.py).
+    """
+
+    def __init__(self):
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.BATCH_API_BASE_URL)
+
+    def write_requests(self, requests: List[Tuple[str, Dict[str, Any]]], path: Path) -> Path:
+        """
+        Writes (custom_id, chat params) pairs as Batch API input JSONL.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, body in requests:
+                f.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
+                }, ensure_ascii=False) + "\n")
+        return path
+
+    def submit(self, path: Path, description: str) -> str:
+        """
+        Uploads a request file and starts a batch. Returns the batch id.
+        """
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"description": description},
+        )
+        logger.info(f"[BATCH] Submitted {path.name} as {batch.id}")
+        return batch.id
+
+    def retrieve(self, batch_id: str):
+        return self.client.batches.retrieve(batch_id)
+
+    def wait(self, batch_id: str, poll_seconds: float):
+        """
+        Polls until the batch reaches a finished status, and returns it.
+        """
+        while True:
+            batch = self.retrieve(batch_id)
+            if batch.status in FINISHED_STATUSES:
+                return batch
+            counts = batch.request_counts
+            progress = f" ({counts.completed}/{counts.total} done)" if counts else ""
+            logger.info(f"[BATCH] {batch_id} is {batch.status}{progress}, checking again in {poll_seconds:.0f}s")
+            time.sleep(poll_seconds)
+
+    def results(self, batch) -> Dict[str, str]:
+        """
+        {custom_id: message content} for every request that succeeded.
+        Failed or expired requests are left out (the caller re-scores them).
+        """
+        if not batch.output_file_id:
+            return {}
+        results = {}
+        errors = 0
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                errors += 1
+                continue
+            try:
+                results[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"] or ""
+            except (KeyError, IndexError, TypeError):
+                errors += 1
+        if errors:
+            logger.warning(f"[BATCH] {batch.id}: {errors} requests came back without a usable response")
+        return results
+
+
+batch_service = BatchService()
@@ -0,0 +1,107 @@
+import hashlib
+import sqlite3
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache in a local SQLite file.
+    Keys are sha256(model + normalized text), values are float32 vectors.
+    Size is bounded by max_entries; the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def connect(self):
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Returns {key: vector} for the keys present, and bumps their recency.
+        """
+        if not keys:
+            return {}
+        try:
+            self.connect()
+            found = {}
+            unique = list(set(keys))
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            now = time.time()
+            self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed, treating as miss: {e}")
+            found = {}
+
+        self.hits += sum(1 for k in keys if k in found)
+        self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items: List[Tuple[str, List[float]]]):
+        if not items:
+            return
+        try:
+            self.connect()
+            now = time.time()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items]
+            )
+            self._evict()
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def _evict(self):
+        count = self.conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0%} hit rate)"
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
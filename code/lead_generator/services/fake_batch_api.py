@@ -0,0 +1,208 @@
+"""
+Local stand-in for the OpenAI Batch API, for testing `main.py run --mode
+batch` and `main.py collect` offline. Implements just the endpoints
+services/batch.py uses (file upload, batch create/retrieve, file content)
+and answers every chat request with deterministic fake scores:
+the JSON keys are read from the prompt's OUTPUT FORMAT block, *_score keys
+get a number from a hash of the story text, other keys a placeholder.
+Batched prompts (several numbered stories) get one entry per story.
+
+Usage (from lead_generator/):
+    python services/fake_batch_api.py --port 8089 --delay 30 --drop 0.05
+    BATCH_API_BASE_URL=http://127.0.0.1:8089/v1 python main.py run --mode batch
+    BATCH_API_BASE_URL=http://127.0.0.1:8089/v1 python main.py collect --wait
+
+--delay keeps batches "in_progress" for that many seconds; --drop answers
+that share of requests with an error, to exercise the re-scoring fallback.
+State is in memory, so batches are lost when the server stops.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import typer
+
+files: dict[str, dict] = {}
+batches: dict[str, dict] = {}
+lock = threading.Lock()
+settings = {"delay": 0.0, "drop": 0.0}
+
+
+def fake_score(key: str, text: str) -> int:
+    digest = hashlib.sha256(f"{key}\n{text}".encode("utf-8")).hexdigest()
+    return 40 + int(digest[:8], 16) % 61
+
+
+def fake_entry(keys: list[str], text: str) -> dict:
+    return {
+        key: fake_score(key, text) if key.endswith("_score") else f"Fake {key.replace('_', ' ')}."
+        for key in keys
+    }
+
+
+def fake_completion(body: dict) -> str:
+    """
+    Message content for one chat request, shaped like the OUTPUT FORMAT the
+    prompt asks for.
+    """
+    messages = body.get("messages") or []
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+    output_format = system.rsplit("OUTPUT FORMAT", 1)[-1]
+    keys = [k for k in dict.fromkeys(re.findall(r'"(\w+)":', output_format)) if k not in ("scores", "index")]
+
+    if '"scores"' in output_format:
+        stories = re.split(r"^Story (\d+):\n", user, flags=re.M)[1:]
+        return json.dumps({"scores": [
+            {"index": int(number), **fake_entry(keys, text)}
+            for number, text in zip(stories[::2], stories[1::2])
+        ]})
+    return json.dumps(fake_entry(keys, user))
+
+
+def answer(line: str) -> dict:
+    request = json.loads(line)
+    if random.random() < settings["drop"]:
+        return {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": None,
+                "error": {"code": "server_error", "message": "Dropped by fake_batch_api --drop"}}
+    content = fake_completion(request["body"])
+    prompt_tokens = len(json.dumps(request["body"])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"batch_req_{uuid.uuid4().hex}",
+        "custom_id": request["custom_id"],
+        "response": {
+            "status_code": 200,
+            "request_id": uuid.uuid4().hex,
+            "body": {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["body"].get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            },
+        },
+        "error": None,
+    }
+
+
+def store_file(content: bytes, filename: str, purpose: str) -> dict:
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    record = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+              "filename": filename, "purpose": purpose, "status": "processed"}
+    files[file_id] = {**record, "content": content}
+    return record
+
+
+def batch_view(batch: dict) -> dict:
+    """
+    The batch as the API would report it now (in_progress until --delay has passed).
+    """
+    view = {key: value for key, value in batch.items() if not key.startswith("_")}
+    if time.time() < batch["_ready_at"]:
+        view["status"] = "in_progress"
+        view["output_file_id"] = None
+        view["request_counts"] = {"total": batch["request_counts"]["total"], "completed": 0, "failed": 0}
+    return view
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def not_found(self):
+        self.send_json({"error": {"message": f"No route for {self.command} {self.path}", "type": "invalid_request_error"}}, 404)
+
+    def body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        with lock:
+            if self.path == "/v1/files":
+                form = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.body()
+                )
+                fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+                upload = fields["file"]
+                purpose = fields["purpose"].get_content().strip() if "purpose" in fields else "batch"
+                return self.send_json(store_file(upload.get_payload(decode=True), upload.get_filename() or "upload.jsonl", purpose))
+
+            if self.path == "/v1/batches":
+                params = json.loads(self.body())
+                source = files.get(params["input_file_id"])
+                if source is None:
+                    return self.not_found()
+                lines = [line for line in source["content"].decode("utf-8").splitlines() if line.strip()]
+                answers = [answer(line) for line in lines]
+                failed = sum(1 for a in answers if a["error"])
+                output = store_file("".join(json.dumps(a) + "\n" for a in answers).encode("utf-8"),
+                                    "batch_output.jsonl", "batch_output")
+                now = int(time.time())
+                batch = {
+                    "id": f"batch_{uuid.uuid4().hex[:24]}",
+                    "object": "batch",
+                    "endpoint": params["endpoint"],
+                    "input_file_id": params["input_file_id"],
+                    "completion_window": params["completion_window"],
+                    "status": "completed",
+                    "output_file_id": output["id"],
+                    "error_file_id": None,
+                    "created_at": now,
+                    "completed_at": now + int(settings["delay"]),
+                    "request_counts": {"total": len(answers), "completed": len(answers) - failed, "failed": failed},
+                    "metadata": params.get("metadata"),
+                    "_ready_at": time.time() + settings["delay"],
+                }
+                batches[batch["id"]] = batch
+                return self.send_json(batch_view(batch))
+        self.not_found()
+
+    def do_GET(self):
+        with lock:
+            match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+            if match and match.group(1) in batches:
+                return self.send_json(batch_view(batches[match.group(1)]))
+            match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+            if match and match.group(1) in files:
+                content = files[match.group(1)]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                return
+        self.not_found()
+
+    def log_message(self, format, *args):
+        print(f"[fake-batch] {self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+
+def main(port: int = typer.Option(8089, help="Port to listen on"),
+         delay: float = typer.Option(0.0, help="Seconds a batch stays in_progress"),
+         drop: float = typer.Option(0.0, help="Share of requests answered with an error (0-1)")):
+    settings["delay"], settings["drop"] = delay, drop
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Fake Batch API on http://127.0.0.1:{port}/v1 (delay {delay:.0f}s, drop {drop:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,55 +1,488 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, stop_after_attempt, wait_exponential
 from config import config
+from services.embedding_cache import EmbeddingCache
 from utils.logger import logger
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import asyncio
 import json
-from typing import List, Dict, Any
+import random
+import time
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+# The response cache lives in code/llm_cache/, shared with the other pipeline
+# packages; entry points put code/ on sys.path (see main.py)
+from llm_cache import ResponseCache
+from llm_cache.cache import is_cacheable
+
+# Usage totals of the enclosing track_usage() block, if any
+_usage_scope: ContextVar[Optional[Dict[str, Dict[str, int]]]] = ContextVar("usage_scope", default=None)
+
+
+class RateLimitScheduler:
+    """
+    Admission control for async chat completions.
+    - Two token buckets: requests/min and tokens/min. Each call reserves one
+      request and its estimated tokens before it is sent; the estimate is
+      corrected with the real usage when the response arrives.
+    - A cap on calls in flight (slots).
+    - On a 429 every caller pauses (Retry-After, else exponential backoff)
+      and the refill rate is halved; each success restores 5% of it.
+    Bucket levels persist across event loops; the asyncio primitives are
+    recreated for each loop by bind().
+    """
+
+    # Buckets hold at most this many seconds of budget, so an idle
+    # scheduler can't release a whole minute's worth in one burst
+    BURST_SECONDS = 10.0
+
+    def __init__(self, rpm: int, tpm: int, concurrency: int, max_backoff: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self.max_backoff = max_backoff
+        self.request_capacity = max(1.0, rpm * self.BURST_SECONDS / 60)
+        self.token_capacity = max(1.0, tpm * self.BURST_SECONDS / 60)
+        self.requests_available = self.request_capacity
+        self.tokens_available = self.token_capacity
+        self.rate_scale = 1.0
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self.consecutive_throttles = 0
+        self.calls = 0
+        self.throttled_calls = 0
+        self.waited = 0.0
+        self.slots: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def bind(self):
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests_available = min(
+            self.request_capacity, self.requests_available + elapsed * self.rpm / 60 * self.rate_scale
+        )
+        self.tokens_available = min(
+            self.token_capacity, self.tokens_available + elapsed * self.tpm / 60 * self.rate_scale
+        )
+
+    async def acquire(self, tokens: int):
+        """
+        Waits until one request and `tokens` tokens are available, then
+        reserves them. Callers are admitted in arrival order.
+        """
+        tokens = min(tokens, self.token_capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill()
+                if self.requests_available >= 1 and self.tokens_available >= tokens:
+                    self.requests_available -= 1
+                    self.tokens_available -= tokens
+                    break
+                wait = max(
+                    (1 - self.requests_available) / (self.rpm / 60 * self.rate_scale),
+                    (tokens - self.tokens_available) / (self.tpm / 60 * self.rate_scale),
+                    0.01,
+                )
+                await asyncio.sleep(wait)
+        self.calls += 1
+        self.waited += time.monotonic() - started
+
+    def settle(self, estimated: int, actual: int):
+        # Overdraft is allowed; it just delays the next admissions
+        self.tokens_available -= actual - estimated
+
+    def throttled(self, retry_after: Optional[float]) -> float:
+        """
+        Records a 429: pauses all callers and halves the refill rate.
+        Returns the pause in seconds.
+        """
+        self.throttled_calls += 1
+        self.consecutive_throttles += 1
+        self.rate_scale = max(0.1, self.rate_scale / 2)
+        if retry_after is None:
+            retry_after = 2 ** self.consecutive_throttles + random.uniform(0, 1)
+        delay = min(retry_after, self.max_backoff)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+    def succeeded(self):
+        self.consecutive_throttles = 0
+        self.rate_scale = min(1.0, self.rate_scale + 0.05)
+
+    def stats(self) -> str:
+        return (
+            f"{self.calls} calls, {self.throttled_calls} rate-limited, "
+            f"{self.waited:.1f}s queued, rate at {self.rate_scale:.0%}"
+        )
+
 
 class LLMService:
     def __init__(self):
         self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        self.model_mini = config.OPENAI_MODEL_MAIN
+        self.async_client: Optional[AsyncOpenAI] = None
+        # Chat completion usage per model: {model: {"calls", "prompt_tokens", "completion_tokens"}}
+        self.usage: Dict[str, Dict[str, int]] = {}
+        self.scheduler = RateLimitScheduler(
+            config.LLM_RPM_LIMIT, config.LLM_TPM_LIMIT, config.LLM_CONCURRENCY, config.LLM_MAX_BACKOFF
+        )
+        self.model_mini = config.OPENAI_MODEL_MINI
         self.model_main = config.OPENAI_MODEL_MAIN
         self.embedding_model = config.OPENAI_EMBEDDING_MODEL
+        self.embedding_dimensions = config.EMBEDDING_COMPACT_DIMENSIONS if config.EMBEDDING_COMPACT else None
+        self.embedding_cache = (
+            EmbeddingCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_MAX_ENTRIES)
+            if config.EMBEDDING_CACHE_ENABLED else None
+        )
+        # Chat responses, for call sites that opt in with cache=True
+        self.response_cache = (
+            ResponseCache(ttl_days=config.LLM_CACHE_TTL_DAYS, max_entries=config.LLM_CACHE_MAX_ENTRIES)
+            if config.LLM_CACHE_ENABLED else None
+        )
 
     def get_embedding(self, text: str) -> List[float]:
-        try:
-            text = text.replace("\n", " ")
-            return self.client.embeddings.create(input=[text], model=self.embedding_model).data[0].embedding
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return []
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str], batch_size: int = None) -> List[List[float]]:
+        """
+        Embeds many texts with as few requests as possible.
+        Texts are chunked by count (batch_size) and by estimated tokens
+        (EMBEDDING_BATCH_TOKEN_BUDGET). A failing chunk is retried on its own;
+        if it still fails, its texts get [] so results stay aligned with inputs.
+        Texts already in the embedding cache are never sent to the API.
+        """
+        prepared, results, keys = self._cached_embeddings(texts)
+
+        # Only texts the cache couldn't answer go to the API
+        pending = [t if not results[i] else "" for i, t in enumerate(prepared)]
+        fresh = []
+        for chunk in self._embedding_chunks(pending, batch_size or config.EMBEDDING_BATCH_SIZE):
+            try:
+                vectors = self._embed_chunk([prepared[i] for i in chunk])
+            except Exception as e:
+                logger.error(f"Error generating embeddings for {len(chunk)} texts: {e}")
+                continue
+            for i, vector in zip(chunk, vectors):
+                results[i] = vector
+                if keys:
+                    fresh.append((keys[i], vector))
+
+        if self.embedding_cache:
+            self.embedding_cache.put_many(fresh)
+        return results
+
+    async def aget_embeddings(self, texts: List[str], batch_size: int = None) -> List[List[float]]:
+        """
+        Async get_embeddings; must run inside async_session(). Request
+        chunks are sent concurrently.
+        """
+        prepared, results, keys = self._cached_embeddings(texts)
+        pending = [t if not results[i] else "" for i, t in enumerate(prepared)]
+        chunks = self._embedding_chunks(pending, batch_size or config.EMBEDDING_BATCH_SIZE)
+        responses = await asyncio.gather(
+            *(self._aembed_chunk([prepared[i] for i in chunk]) for chunk in chunks), return_exceptions=True
+        )
+
+        fresh = []
+        for chunk, vectors in zip(chunks, responses):
+            if isinstance(vectors, Exception):
+                logger.error(f"Error generating embeddings for {len(chunk)} texts: {vectors}")
+                continue
+            for i, vector in zip(chunk, vectors):
+                results[i] = vector
+                if keys:
+                    fresh.append((keys[i], vector))
+
+        if self.embedding_cache:
+            self.embedding_cache.put_many(fresh)
+        return results
+
+    def _cached_embeddings(self, texts: List[str]):
+        """
+        (prepared texts, results with cache hits filled in, cache keys or []).
+        """
+        prepared = [self._prepare_embedding_text(t) for t in texts]
+        results: List[List[float]] = [[] for _ in texts]
+
+        keys = []
+        if self.embedding_cache:
+            # Reduced-dimension vectors are a different embedding space; key them apart
+            cache_model = self.embedding_model
+            if self.embedding_dimensions:
+                cache_model = f"{cache_model}:{self.embedding_dimensions}"
+            keys = [EmbeddingCache.make_key(cache_model, t) for t in prepared]
+            cached = self.embedding_cache.get_many([k for k, t in zip(keys, prepared) if t.strip()])
+            for i, key in enumerate(keys):
+                if key in cached:
+                    results[i] = cached[key]
+        return prepared, results, keys
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=20), reraise=True)
+    def _embed_chunk(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(**self._embedding_params(texts))
+        # The API tags each vector with its input index; don't rely on ordering
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=20), reraise=True)
+    async def _aembed_chunk(self, texts: List[str]) -> List[List[float]]:
+        response = await self.async_client.embeddings.create(**self._embedding_params(texts))
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    def _embedding_params(self, texts: List[str]) -> Dict[str, Any]:
+        params = {"input": texts, "model": self.embedding_model}
+        if self.embedding_dimensions:
+            params["dimensions"] = self.embedding_dimensions
+        return params
+
+    @staticmethod
+    def _prepare_embedding_text(text: str) -> str:
+        # Whitespace is collapsed so the text we embed is exactly the text we cache
+        text = " ".join((text or "").split())
+        return text[:config.EMBEDDING_MAX_INPUT_CHARS]
+
+    @staticmethod
+    def _embedding_chunks(texts: List[str], batch_size: int) -> List[List[int]]:
+        """
+        Groups input indices into request-sized chunks. Empty texts are skipped
+        (the API rejects them). Tokens are estimated at ~4 characters each.
+        """
+        chunks, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            tokens = len(text) // 4 + 1
+            if current and (len(current) >= batch_size or current_tokens + tokens > config.EMBEDDING_BATCH_TOKEN_BUDGET):
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
 
     def chat_completion(self, 
                         system_prompt: str, 
                         user_prompt: str, 
                         model: str = None, 
-                        json_mode: bool = False) -> str:
-        if model is None:
-            model = self.model_main
-            
+                        json_mode: bool = False,
+                        cache: bool = False) -> str:
+        """
+        cache=True answers identical requests from the response cache
+        (deterministic re-runs); leave it off where a fresh answer matters.
+        """
         try:
-            params = {
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            }
-            if json_mode:
-                params["response_format"] = {"type": "json_object"}
-
+            params = self.chat_params(system_prompt, user_prompt, model, json_mode)
+            key, content = self._cache_lookup(params, cache)
+            if content is not None:
+                return content
             response = self.client.chat.completions.create(**params)
-            return response.choices[0].message.content
+            self._record_usage(params["model"], response)
+            content = response.choices[0].message.content
+            self._cache_store(key, content, params)
+            return content
         except Exception as e:
             logger.error(f"Error in chat completion: {e}")
             return ""
 
-    def chat_completion_json(self, system_prompt: str, user_prompt: str, model: str = None) -> Dict[str, Any]:
-        content = self.chat_completion(system_prompt, user_prompt, model, json_mode=True)
+    def chat_completion_json(self, system_prompt: str, user_prompt: str, model: str = None, cache: bool = False) -> Dict[str, Any]:
+        content = self.chat_completion(system_prompt, user_prompt, model, json_mode=True, cache=cache)
         try:
             return json.loads(content)
         except json.JSONDecodeError:
             logger.error("Failed to parse JSON response from LLM")
             return {}
 
+    def chat_params(self, system_prompt: str, user_prompt: str, model: str = None, json_mode: bool = False) -> Dict[str, Any]:
+        """
+        Chat completion request body (also what Batch API input lines carry).
+        """
+        params = {
+            "model": model or self.model_main,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+        if json_mode:
+            params["response_format"] = {"type": "json_object"}
+        return params
+
+    @asynccontextmanager
+    async def async_session(self):
+        """
+        Opens an AsyncOpenAI client bound to the running event loop. The
+        client's own retries are off; achat_completion retries through the
+        scheduler instead, so backoff is shared by every concurrent call.
+        """
+        self.async_client = AsyncOpenAI(
+            api_key=config.OPENAI_API_KEY, max_retries=0, timeout=config.LLM_TIMEOUT
+        )
+        self.scheduler.bind()
+        try:
+            yield self
+        finally:
+            await self.async_client.close()
+            self.async_client = None
+
+    def gather(self, jobs: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+        """
+        Runs async LLM jobs concurrently from sync code, under the rate-limit
+        scheduler. Results come back in input order.
+        """
+        if not jobs:
+            return []
+        return asyncio.run(self._gather(jobs))
+
+    async def _gather(self, jobs: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+        async with self.async_session():
+            return await asyncio.gather(*(job() for job in jobs))
+
+    async def achat_completion(self,
+                               system_prompt: str,
+                               user_prompt: str,
+                               model: str = None,
+                               json_mode: bool = False,
+                               cache: bool = False) -> str:
+        """
+        Async chat_completion; must run inside async_session(). 429s pause
+        the whole scheduler; timeouts, connection errors and 5xx are retried
+        with exponential backoff. Returns "" once retries are exhausted.
+        """
+        if self.async_client is None:
+            raise RuntimeError("achat_completion must run inside llm.async_session()")
+
+        params = self.chat_params(system_prompt, user_prompt, model, json_mode)
+        key, content = self._cache_lookup(params, cache)
+        if content is not None:
+            return content
+        estimated = self._estimate_tokens(system_prompt, user_prompt)
+
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            retry_in = None
+            async with self.scheduler.slots:
+                await self.scheduler.acquire(estimated)
+                try:
+                    response = await self.async_client.chat.completions.create(**params)
+                except RateLimitError as e:
+                    if getattr(e, "code", None) == "insufficient_quota":
+                        logger.error(f"Error in chat completion: {e}")
+                        return ""
+                    delay = self.scheduler.throttled(self._retry_after(e))
+                    logger.warning(f"Rate limited by OpenAI, pausing all calls for {delay:.1f}s (attempt {attempt + 1})")
+                    continue
+                except (APIConnectionError, InternalServerError) as e:
+                    retry_in = min(config.LLM_MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.0)
+                    logger.warning(f"Chat completion failed ({e.__class__.__name__}), retrying in {retry_in:.1f}s")
+                except Exception as e:
+                    logger.error(f"Error in chat completion: {e}")
+                    return ""
+                else:
+                    self.scheduler.succeeded()
+                    self._record_usage(params["model"], response)
+                    if response.usage:
+                        self.scheduler.settle(estimated, response.usage.total_tokens)
+                    content = response.choices[0].message.content or ""
+                    self._cache_store(key, content, params)
+                    return content
+            await asyncio.sleep(retry_in)
+
+        logger.error(f"Chat completion failed after {config.LLM_MAX_RETRIES} retries")
+        return ""
+
+    async def achat_completion_json(self, system_prompt: str, user_prompt: str, model: str = None, cache: bool = False) -> Dict[str, Any]:
+        content = await self.achat_completion(system_prompt, user_prompt, model, json_mode=True, cache=cache)
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            logger.error("Failed to parse JSON response from LLM")
+            return {}
+
+    def _cache_lookup(self, params: Dict[str, Any], cache: bool):
+        """
+        Returns (key, cached_content); key is None when caching is off for this call.
+        """
+        if not cache or self.response_cache is None:
+            return None, None
+        key = ResponseCache.make_key(params)
+        return key, self.response_cache.get(key)
+
+    def _cache_store(self, key: Optional[str], content: str, params: Dict[str, Any]):
+        if key is not None and is_cacheable(content, params):
+            self.response_cache.put(key, content, params["model"])
+
+    def _record_usage(self, model: str, response):
+        for usage in (self.usage, _usage_scope.get()):
+            if usage is None:
+                continue
+            totals = usage.setdefault(model, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            totals["calls"] += 1
+            if getattr(response, "usage", None):
+                totals["prompt_tokens"] += response.usage.prompt_tokens or 0
+                totals["completion_tokens"] += response.usage.completion_tokens or 0
+
+    @contextmanager
+    def track_usage(self):
+        """
+        Yields a usage dict that collects only the calls made inside the
+        block (and the tasks it starts), unlike usage_since(), which also
+        counts calls from concurrent stages.
+        """
+        usage: Dict[str, Dict[str, int]] = {}
+        token = _usage_scope.set(usage)
+        try:
+            yield usage
+        finally:
+            _usage_scope.reset(token)
+
+    def usage_snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {model: dict(totals) for model, totals in self.usage.items()}
+
+    def usage_since(self, snapshot: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        empty = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        return {
+            model: {key: totals[key] - snapshot.get(model, empty)[key] for key in totals}
+            for model, totals in self.usage.items()
+        }
+
+    @staticmethod
+    def estimate_cost(usage: Dict[str, Dict[str, int]]) -> float:
+        """
+        USD cost of a usage dict at MODEL_PRICES (models without a price count as 0).
+        """
+        cost = 0.0
+        for model, totals in usage.items():
+            input_price, output_price = config.MODEL_PRICES.get(model, (0.0, 0.0))
+            cost += (totals["prompt_tokens"] * input_price + totals["completion_tokens"] * output_price) / 1_000_000
+        return cost
+
+    @staticmethod
+    def _estimate_tokens(system_prompt: str, user_prompt: str) -> int:
+        # ~4 characters per token, plus room for the completion
+        return (len(system_prompt) + len(user_prompt)) // 4 + config.LLM_EXPECTED_COMPLETION_TOKENS
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
 llm = LLMService()
@@ -1,28 +1,93 @@
 import httpx
 from config import config
+from services.llm import RateLimitScheduler
 from utils.logger import logger
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import json
+import random
 
 class PerplexityService:
     def __init__(self):
         self.api_key = config.PERPLEXITY_API_KEY
         self.base_url = "https://api.perplexity.ai/chat/completions"
         self.model = config.PERPLEXITY_MODEL
+        self.async_client: Optional[httpx.AsyncClient] = None
+        # Perplexity's own budget, separate from OpenAI's; it limits requests
+        # only, so the token bucket is set out of reach
+        self.scheduler = RateLimitScheduler(
+            config.PERPLEXITY_RPM_LIMIT, 10**9, config.PERPLEXITY_CONCURRENCY, config.LLM_MAX_BACKOFF
+        )
 
-    def search(self, query: str) -> List[Dict[str, Any]]:
+    @asynccontextmanager
+    async def async_session(self):
         """
-        Queries Perplexity and returns a list of lead candidates.
+        Opens one pooled AsyncClient for every asearch() in the block and
+        binds the rate-limit scheduler to the running event loop.
+        """
+        limits = httpx.Limits(
+            max_connections=config.PERPLEXITY_CONCURRENCY,
+            max_keepalive_connections=config.PERPLEXITY_CONCURRENCY
+        )
+        self.async_client = httpx.AsyncClient(timeout=config.PERPLEXITY_TIMEOUT, limits=limits)
+        self.scheduler.bind()
+        try:
+            yield self
+        finally:
+            await self.async_client.aclose()
+            self.async_client = None
+
+    async def asearch(self, query: str) -> Tuple[str, List[str]]:
+        """
+        Async search; must run inside async_session(). Admitted by the
+        Perplexity scheduler (PERPLEXITY_RPM_LIMIT / PERPLEXITY_CONCURRENCY);
+        429s pause every caller, 5xx and network errors are retried.
+        Returns (raw response content, citation URLs), or ("", []) on failure.
         """
         if not self.api_key:
             logger.error("Perplexity API key not set")
-            return []
+            return "", []
+        if self.async_client is None:
+            raise RuntimeError("asearch must run inside perplexity_service.async_session()")
+
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            retry_in = None
+            async with self.scheduler.slots:
+                await self.scheduler.acquire(0)
+                try:
+                    response = await self.async_client.post(self.base_url, headers=self._headers(), json=self._payload(query))
+                    if response.status_code == 429:
+                        delay = self.scheduler.throttled(self._retry_after(response))
+                        logger.warning(f"Rate limited by Perplexity, pausing searches for {delay:.1f}s (attempt {attempt + 1})")
+                        continue
+                    response.raise_for_status()
+                    data = response.json()
+                    content = data['choices'][0]['message']['content']
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                        logger.error(f"Error querying Perplexity: {e}")
+                        return "", []
+                    retry_in = min(config.LLM_MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.0)
+                    logger.warning(f"Perplexity search failed ({e.__class__.__name__}), retrying in {retry_in:.1f}s")
+                except Exception as e:
+                    logger.error(f"Error querying Perplexity: {e}")
+                    return "", []
+                else:
+                    self.scheduler.succeeded()
+                    return content, self._citations(data)
+            await asyncio.sleep(retry_in)
 
-        headers = {
+        logger.error(f"Perplexity search failed after {config.LLM_MAX_RETRIES} retries")
+        return "", []
+
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
+    def _payload(self, query: str) -> Dict[str, Any]:
         # Prompt for Perplexity to return structured data
         messages = [
             {
@@ -35,31 +100,25 @@ class PerplexityService:
             }
         ]
 
-        payload = {
+        return {
             "model": self.model,
             "messages": messages
         }
 
-        try:
-            with httpx.Client(timeout=60.0) as client:
-                response = client.post(self.base_url, headers=headers, json=payload)
-                response.raise_for_status()
-                
-                data = response.json()
-                content = data['choices'][0]['message']['content']
-                
-                # Parse the content
-                # Note: Perplexity might return text + JSON, so we rely on LLM or robust parsing elsewhere
-                # But for now let's try to parse simple JSON if it's clean, or return text to be processed
-                
-                # The n8n guide suggests using an OpenAI node to parse Perplexity output if it's not clean JSON.
-                # In this Python implementation, we can call the LLM service to normalize if JSON parse fails.
-                # For now, let's assume we need to normalize it.
-                
-                return content # Return raw content for normalization by LLM
+    @staticmethod
+    def _citations(data: Dict[str, Any]) -> List[str]:
+        """
+        The answer's source URLs, in the order its [n] markers count them:
+        the 'citations' list, or 'search_results' entries on newer responses.
+        """
+        citations = data.get('citations') or [r.get('url') for r in data.get('search_results') or [] if isinstance(r, dict)]
+        return [url for url in citations if isinstance(url, str)]
 
-        except Exception as e:
-            logger.error(f"Error querying Perplexity: {e}")
-            return []
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
 
 perplexity_service = PerplexityService()
@@ -1,7 +1,13 @@
+import asyncio
 import feedparser
+import hashlib
 import httpx
 import re
-from typing import List, Dict, Any
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, AsyncIterator
+from urllib.parse import urlparse
+from config import config
 from utils.logger import logger
 from utils.text import clean_text, normalize_url
 import datetime
@@ -121,38 +127,259 @@ class RSSService:
             "Accept": "application/rss+xml, application/xml, */*"
         }
 
-    def fetch_all(self) -> List[Dict[str, Any]]:
+        # Per-feed fetch latency (seconds) from the most recent run
+        self.feed_latencies: Dict[str, float] = {}
+
+        # Conditional-GET state loaded from the feed_state table, and the
+        # updated state produced by the current run (saved once the run completes)
+        self.feed_states: Dict[str, Dict[str, Any]] = {}
+        self.pending_feed_states: Dict[str, Dict[str, Any]] = {}
+        self.unchanged_feeds = 0
+
+    def fetch_all(self, feed_states: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Fetches every feed. feed_states (feed_url -> state row) enables
+        conditional GETs; unchanged feeds contribute no items.
+        """
+        self._reset_run_state(feed_states)
+        if config.RSS_ASYNC:
+            return asyncio.run(self._fetch_all_async())
+
         all_items = []
         for feed_url in self.feeds:
             try:
                 # Use Reddit-specific headers for Reddit feeds
                 is_reddit = "reddit.com" in feed_url
-                headers = self.reddit_headers if is_reddit else self.headers
+                headers = self._conditional_headers(feed_url, self.reddit_headers if is_reddit else self.headers)
                 
                 # Use httpx to fetch the content first with proper headers
                 # This avoids 403 Forbidden errors from strict sites
-                response = httpx.get(feed_url, headers=headers, timeout=15.0, follow_redirects=True)
-                response.raise_for_status()
-                content = response.content
+                started = time.perf_counter()
+                response = httpx.get(feed_url, headers=headers, timeout=config.RSS_TIMEOUT, follow_redirects=True)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                self.feed_latencies[feed_url] = time.perf_counter() - started
 
-                # Parse the raw content
-                feed = feedparser.parse(content)
-                
-                if feed.bozo:
-                    # Log warning but still try to process what we got
-                    logger.warning(f"Feed parsing warning {feed_url}: {feed.bozo_exception}")
-                
-                logger.info(f"Fetched {len(feed.entries)} items from {feed_url}")
-                
-                for entry in feed.entries:
-                    item = self._normalize_entry(entry, feed_url, is_reddit=is_reddit)
-                    if item:
-                        all_items.append(item)
+                all_items.extend(self._handle_response(response, feed_url, is_reddit))
             except Exception as e:
                 logger.error(f"Error fetching feed {feed_url}: {e}")
         
+        self._log_unchanged()
+        return all_items
+
+    async def _fetch_all_async(self) -> List[Dict[str, Any]]:
+        """
+        Fetches every feed concurrently over one shared AsyncClient.
+        Concurrency is capped globally (RSS_CONCURRENCY) and per host
+        (RSS_HOST_LIMITS / RSS_PER_HOST_CONCURRENCY), so wall time is roughly
+        the latency of the slowest feed rather than the sum of all of them.
+        """
+        started = time.perf_counter()
+        async with self._async_client() as client:
+            results = await asyncio.gather(*(self._fetch_feed_async(client, url) for url in self.feeds))
+
+        all_items = []
+        for items in results:
+            all_items.extend(items)
+
+        self._log_fetch_summary(time.perf_counter() - started)
         return all_items
 
+    async def stream_all_async(self, feed_states: Optional[Dict[str, Dict[str, Any]]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Like fetch_all's async path, but yields each feed's items as soon as that
+        feed is done (in completion order), so downstream stages can start
+        before the slowest feed has answered.
+        """
+        self._reset_run_state(feed_states)
+        started = time.perf_counter()
+        async with self._async_client() as client:
+            for fetch in asyncio.as_completed([self._fetch_feed_async(client, url) for url in self.feeds]):
+                items = await fetch
+                if items:
+                    yield items
+        self._log_fetch_summary(time.perf_counter() - started)
+
+    def _async_client(self) -> httpx.AsyncClient:
+        # Fresh limiters per fetch: asyncio primitives belong to the running loop
+        self._global_limit = asyncio.Semaphore(config.RSS_CONCURRENCY)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._host_not_before: Dict[str, float] = {}
+
+        limits = httpx.Limits(
+            max_connections=config.RSS_CONCURRENCY,
+            max_keepalive_connections=config.RSS_CONCURRENCY
+        )
+        return httpx.AsyncClient(timeout=config.RSS_TIMEOUT, follow_redirects=True, limits=limits)
+
+    def _log_fetch_summary(self, elapsed: float):
+        if self.feed_latencies:
+            slowest_url = max(self.feed_latencies, key=self.feed_latencies.get)
+            logger.info(
+                f"Fetched {len(self.feed_latencies)}/{len(self.feeds)} feeds in {elapsed:.1f}s "
+                f"(slowest: {slowest_url} at {self.feed_latencies[slowest_url]:.1f}s)"
+            )
+        self._log_unchanged()
+
+    async def _fetch_feed_async(self, client: httpx.AsyncClient, feed_url: str) -> List[Dict[str, Any]]:
+        is_reddit = "reddit.com" in feed_url
+        headers = self._conditional_headers(feed_url, self.reddit_headers if is_reddit else self.headers)
+        host = self._host_key(feed_url)
+        host_limit = self._host_limits.setdefault(
+            host, asyncio.Semaphore(config.RSS_HOST_LIMITS.get(host, config.RSS_PER_HOST_CONCURRENCY))
+        )
+
+        started = time.perf_counter()
+        try:
+            for attempt in range(config.RSS_MAX_RETRIES + 1):
+                # Respect any back-off another feed on this host was told to observe
+                delay = self._host_not_before.get(host, 0.0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                async with self._global_limit, host_limit:
+                    response = await client.get(feed_url, headers=headers)
+
+                if response.status_code in (429, 503) and attempt < config.RSS_MAX_RETRIES:
+                    retry_after = self._retry_after_seconds(response, attempt)
+                    self._host_not_before[host] = max(
+                        self._host_not_before.get(host, 0.0), time.monotonic() + retry_after
+                    )
+                    logger.warning(f"{response.status_code} from {host}, retrying {feed_url} in {retry_after:.1f}s")
+                    continue
+
+                if response.status_code != 304:
+                    response.raise_for_status()
+                break
+
+            self.feed_latencies[feed_url] = time.perf_counter() - started
+            return self._handle_response(response, feed_url, is_reddit)
+        except Exception as e:
+            logger.error(f"Error fetching feed {feed_url} after {time.perf_counter() - started:.1f}s: {e}")
+            return []
+
+    def _reset_run_state(self, feed_states: Optional[Dict[str, Dict[str, Any]]]):
+        self.feed_latencies = {}
+        self.feed_states = feed_states or {}
+        self.pending_feed_states = {}
+        self.unchanged_feeds = 0
+
+    def _conditional_headers(self, feed_url: str, headers: Dict[str, str]) -> Dict[str, str]:
+        state = self.feed_states.get(feed_url)
+        if not state:
+            return headers
+        headers = dict(headers)
+        if state.get('etag'):
+            headers["If-None-Match"] = state['etag']
+        if state.get('last_modified'):
+            headers["If-Modified-Since"] = state['last_modified']
+        return headers
+
+    def _handle_response(self, response: httpx.Response, feed_url: str, is_reddit: bool) -> List[Dict[str, Any]]:
+        """
+        Short-circuits on 304 or an unchanged body hash, otherwise parses the
+        feed and drops entries at or before the stored watermark.
+        Records the feed's new state in pending_feed_states.
+        """
+        previous = self.feed_states.get(feed_url, {})
+        if response.status_code == 304:
+            self.unchanged_feeds += 1
+            logger.info(f"Not modified: {feed_url}")
+            return []
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        state = {
+            "feed_url": feed_url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "last_entry_at": previous.get('last_entry_at'),
+        }
+        self.pending_feed_states[feed_url] = state
+
+        if content_hash == previous.get('content_hash'):
+            self.unchanged_feeds += 1
+            logger.info(f"Unchanged body: {feed_url}")
+            return []
+
+        items = self._parse_feed(response.content, feed_url, is_reddit)
+
+        published = [i['published_at'] for i in items if i.get('published_at')]
+        watermark = self._naive_utc(previous.get('last_entry_at'))
+        if published:
+            newest = max(published)
+            state['last_entry_at'] = newest if watermark is None else max(newest, watermark)
+
+        # Reddit top/week lists are ranked by score, not date: an older post can
+        # climb into the list later, so only chronological feeds use the watermark.
+        if watermark is not None and not is_reddit:
+            fresh = [i for i in items if not i.get('published_at') or i['published_at'] > watermark]
+            if len(fresh) < len(items):
+                logger.info(f"Skipped {len(items) - len(fresh)} already-seen entries from {feed_url}")
+            items = fresh
+        return items
+
+    def _log_unchanged(self):
+        if self.unchanged_feeds:
+            logger.info(f"{self.unchanged_feeds} feeds unchanged since last run (skipped parsing)")
+
+    @staticmethod
+    def _naive_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+        # Entry timestamps are naive UTC (from feedparser); DB values come back tz-aware
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value
+
+    def _parse_feed(self, content: bytes, feed_url: str, is_reddit: bool) -> List[Dict[str, Any]]:
+        # Parse the raw content
+        feed = feedparser.parse(content)
+        
+        if feed.bozo:
+            # Log warning but still try to process what we got
+            logger.warning(f"Feed parsing warning {feed_url}: {feed.bozo_exception}")
+        
+        latency = self.feed_latencies.get(feed_url)
+        latency_note = f" in {latency:.2f}s" if latency is not None else ""
+        logger.info(f"Fetched {len(feed.entries)} items from {feed_url}{latency_note}")
+        
+        items = []
+        for entry in feed.entries:
+            item = self._normalize_entry(entry, feed_url, is_reddit=is_reddit)
+            if item:
+                items.append(item)
+        return items
+
+    @staticmethod
+    def _host_key(feed_url: str) -> str:
+        """
+        Groups feeds by host so per-host caps apply (www.reddit.com -> reddit.com).
+        """
+        host = (urlparse(feed_url).hostname or "").lower()
+        for limited_host in config.RSS_HOST_LIMITS:
+            if host == limited_host or host.endswith("." + limited_host):
+                return limited_host
+        return host.removeprefix("www.")
+
+    @staticmethod
+    def _retry_after_seconds(response: httpx.Response, attempt: int) -> float:
+        """
+        Reads Retry-After (delta-seconds or HTTP-date); falls back to exponential back-off.
+        """
+        header = response.headers.get("Retry-After")
+        seconds: Optional[float] = None
+        if header:
+            try:
+                seconds = float(header)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(header)
+                    seconds = (retry_at - datetime.datetime.now(retry_at.tzinfo)).total_seconds()
+                except (TypeError, ValueError):
+                    seconds = None
+        if seconds is None:
+            seconds = 2.0 ** (attempt + 1)
+        return min(max(seconds, 0.0), config.RSS_MAX_RETRY_AFTER)
+
     def _normalize_entry(self, entry, source_url, is_reddit: bool = False) -> Dict[str, Any]:
         try:
             title = clean_text(entry.get('title', ''))
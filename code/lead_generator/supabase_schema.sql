@@ -4,9 +4,33 @@ create extension if not exists vector;
 -- Table to track processed URLs to avoid expensive vector checks for exact duplicates
 create table processed_urls (
   url text primary key,
-  processed_at timestamp with time zone default now()
+  processed_at timestamp with time zone default now(),
+  stage text,                               -- which stage decided it (gatekeeper, virality, saved, ...)
+  verdict text,                             -- rejected, duplicate, failed, saved, pending (in a scoring batch)
+  reason text,
+  expires_at timestamp with time zone       -- re-evaluate after this; NULL = permanent
 );
 
+-- Conditional-GET state per RSS feed, so unchanged feeds are not re-downloaded or re-parsed
+create table feed_state (
+  feed_url text primary key,
+  etag text,
+  last_modified text,
+  content_hash text,              -- sha256 of the last body we parsed
+  last_entry_at timestamp with time zone,  -- newest entry published_at seen (watermark)
+  updated_at timestamp with time zone default now()
+);
+
+-- MinHash signatures of recent candidates (lexical near-duplicate prefilter)
+create table content_signatures (
+  url text primary key,
+  minhash bytea not null,          -- 128 x uint32 MinHash of cleaned title + summary
+  buckets bigint[] not null,       -- one LSH bucket id per band
+  created_at timestamp with time zone default now()
+);
+create index on content_signatures using gin (buckets);
+create index on content_signatures (created_at);
+
 -- Table to store the actual story leads
 create table leads (
   id uuid primary key default gen_random_uuid(),
@@ -15,6 +39,8 @@ create table leads (
   summary text,
   -- 1536 dimensions is standard for openai text-embedding-3-small
   embedding vector(1536),
+  -- Compact mode (Config.EMBEDDING_COMPACT): 512-dim half-precision copy, see migration_v5.sql
+  embedding_compact halfvec(512),
   brand_score integer,
   virality_score integer,
   viral_hook text,  -- The shareable angle identified during virality check
@@ -30,6 +56,62 @@ create table leads (
 -- Note: You might need to insert some data before creating an IVFFLAT index, 
 -- or use HNSW index if your Supabase version supports it (recommended for performance).
 create index on leads using hnsw (embedding vector_cosine_ops);
+create index on leads using hnsw (embedding_compact halfvec_cosine_ops);
+
+-- Every scored candidate (saved or rejected), so near-duplicates can reuse past verdicts
+create table scored_candidates (
+  id uuid primary key default gen_random_uuid(),
+  url text not null,
+  title text,
+  embedding vector(1536),
+  embedding_compact halfvec(512),
+  virality_score integer,
+  hook_analysis text,
+  brand_score integer,            -- NULL when rejected at the virality stage
+  reasoning text,
+  verdict text check (verdict in ('saved', 'rejected_virality', 'rejected_brand')),
+  created_at timestamp with time zone default now()
+);
+create index on scored_candidates using hnsw (embedding vector_cosine_ops);
+create index on scored_candidates using hnsw (embedding_compact halfvec_cosine_ops);
+
+-- Scoring jobs submitted to the Batch API, waiting for `python main.py collect`
+create table scoring_batches (
+  id text primary key,                      -- Batch API batch id
+  scoring_mode text not null,
+  model text not null,
+  candidates jsonb not null,                -- leads after PHASE 4c, embeddings included
+  run_stats jsonb,
+  status text not null default 'submitted' check (status in ('submitted', 'collected')),
+  created_at timestamp with time zone default now(),
+  collected_at timestamp with time zone
+);
+create index on scoring_batches (created_at) where status = 'submitted';
+
+-- Run journal: each candidate's last completed stage, so a crashed run can be resumed
+create table pipeline_runs (
+  id uuid primary key,
+  source text,
+  mode text,
+  status text not null check (status in ('running', 'completed', 'submitted', 'failed')),
+  stage text,                               -- last checkpointed stage
+  stats jsonb,
+  error text,
+  started_at timestamp with time zone default now(),
+  updated_at timestamp with time zone default now(),
+  finished_at timestamp with time zone
+);
+
+create table pipeline_candidates (
+  run_id uuid not null references pipeline_runs(id) on delete cascade,
+  url text not null,
+  seq bigserial,
+  stage text not null,                      -- ingested, gatekeeper, filtered, virality, brand
+  state jsonb not null,
+  created_at timestamp with time zone default now(),
+  updated_at timestamp with time zone default now(),
+  primary key (run_id, url)
+);
 
 -- Table to store topics for the "Active Discovery" engine
 create table discovery_topics (
@@ -0,0 +1,102 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS   # 4 rows per band: pairs at Jaccard 0.8 collide with p > 0.99
+
+MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)  # fixed seed: signatures must be stable across runs
+_A = _rng.integers(1, MERSENNE_PRIME, size=(NUM_PERM, 1), dtype=np.uint64)
+_B = _rng.integers(0, MERSENNE_PRIME, size=(NUM_PERM, 1), dtype=np.uint64)
+_BAND_SEED = np.uint64(0x9E3779B97F4A7C15)
+_FOLD_MULTIPLIER = np.uint64(0x100000001B3)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def shingles(tokens: List[str]) -> set:
+    """
+    Word unigrams plus bigrams: unigrams tolerate reordering, bigrams keep
+    two different stories about the same entities apart.
+    """
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(tokens: List[str]) -> np.ndarray:
+    """
+    128-permutation MinHash signature (uint64 values below 2^31).
+    The fraction of equal positions between two signatures estimates the
+    Jaccard similarity of their shingle sets.
+    """
+    features = shingles(tokens)
+    if not features:
+        return np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint64)
+    digests = b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest() for f in features)
+    x = np.frombuffer(digests, dtype=">u4").astype(np.uint64) % MERSENNE_PRIME
+    # (a * x + b) mod p for every permutation x feature, then min per permutation
+    return ((_A * x[None, :] + _B) % MERSENNE_PRIME).min(axis=1)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """
+    One LSH bucket id per band (signed 64-bit, to fit a Postgres bigint).
+    Each band's rows are folded into one 64-bit value with the band index
+    mixed in, so bucket ids are unique across bands.
+    """
+    rows = signature.reshape(BANDS, ROWS)
+    folded = np.arange(1, BANDS + 1, dtype=np.uint64) * _BAND_SEED
+    with np.errstate(over="ignore"):
+        for r in range(ROWS):
+            folded = folded * _FOLD_MULTIPLIER + rows[:, r]
+    return folded.view(np.int64).tolist()
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype(">u4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=">u4").astype(np.uint64)
+
+
+class MinHashIndex:
+    """
+    In-memory LSH index: signatures bucketed by band, verified by estimated Jaccard.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.buckets: Dict[int, List[Tuple[str, np.ndarray]]] = {}
+
+    def add(self, key: str, signature: np.ndarray, buckets: Optional[List[int]] = None):
+        for bucket in buckets or band_buckets(signature):
+            self.buckets.setdefault(bucket, []).append((key, signature))
+
+    def find(self, signature: np.ndarray, buckets: Optional[List[int]] = None,
+             exclude_key: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Returns (key, estimated Jaccard) of the closest stored signature at or
+        above the threshold, if any.
+        """
+        best = None
+        seen = set()
+        for bucket in buckets or band_buckets(signature):
+            for key, other in self.buckets.get(bucket, ()):
+                if key == exclude_key or key in seen:
+                    continue
+                seen.add(key)
+                score = similarity(signature, other)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (key, score)
+        return best
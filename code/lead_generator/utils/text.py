@@ -24,8 +24,8 @@ def clean_text(text: str) -> str:
 
 def normalize_url(url: str) -> str:
     """
-    Normalizes a URL by removing tracking parameters etc.
-    For now, we just strip whitespace.
+    Normalizes a URL for storage. Only strips whitespace: leads keep the
+    URL the publisher emitted; dedup keys come from utils.urls.canonicalize_url.
     """
     if not url:
         return ""
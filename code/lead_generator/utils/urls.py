@@ -0,0 +1,130 @@
+import re
+from typing import List, Dict, Any, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+# Query parameters that only identify the referrer / campaign, never the content
+TRACKING_PARAMS = {
+    "ref", "ref_src", "ref_url", "referrer", "src", "via", "rss",
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "twclid", "li_fat_id",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "oly_anon_id", "oly_enc_id",
+    "cmpid", "cmp", "ncid", "icid", "s_cid", "smid", "smtyp", "soc_src", "soc_trk",
+    "share", "sr_share", "shared", "spm", "guccounter", "guce_referrer", "guce_referrer_sig",
+    "amp", "outputtype", "ocid", "mbid", "referringsource", "share_id",
+}
+TRACKING_PREFIXES = ("utm_", "itm_", "at_", "pk_", "mtm_", "hmb_", "ga_", "__twitter")
+
+# Host prefixes that serve the same article as the bare domain
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# Reddit front-ends that all resolve to the same post ids
+REDDIT_HOSTS = {"reddit.com", "old.reddit.com", "new.reddit.com", "np.reddit.com", "i.reddit.com"}
+
+# Science X network mirrors of phys.org articles
+PHYS_ORG_MIRRORS = {"sciencex.com", "phys.org"}
+
+REDDIT_POST_RE = re.compile(r"^(?:/r/[^/]+)?/comments/([a-z0-9]+)", re.IGNORECASE)
+AMP_PATH_RE = re.compile(r"(/amp/?$|/amp(?=/)|\.amp(?=\.html?$)|\.amp$)", re.IGNORECASE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Maps every variant of an article URL to one canonical form, so exact
+    dedup (processed_urls) catches it before any paid API call.
+    1. Unwraps AMP caches (cdn.ampproject.org, google.com/amp).
+    2. Forces https, lowercases the host, drops www./m./amp. and default ports.
+    3. Strips tracking parameters, sorts the rest, drops the fragment.
+    4. Removes AMP path variants and trailing slashes.
+    5. Applies publisher rules (Reddit permalinks, phys.org mirrors).
+    Anything that doesn't parse as http(s) is returned stripped but unchanged.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if url.startswith("//"):
+        url = "https:" + url
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower().rstrip(".")
+    path = parts.path or "/"
+
+    # AMP caches wrap the real URL in their path
+    if host.endswith("cdn.ampproject.org") or (host in ("google.com", "www.google.com") and path.startswith("/amp/")):
+        inner = re.sub(r"^/(?:amp/|c/)?(?:s/)?", "", path)
+        if inner and "." in inner.split("/", 1)[0]:
+            query = f"?{parts.query}" if parts.query else ""
+            return canonicalize_url(f"https://{unquote(inner)}{query}")
+
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+
+    port = parts.port
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+    # Collapse duplicate slashes and AMP path variants
+    path = re.sub(r"/{2,}", "/", path)
+    path = AMP_PATH_RE.sub("", path) or "/"
+
+    query_pairs = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(k)
+    ]
+
+    netloc, path, query_pairs = _apply_publisher_rules(netloc, path, query_pairs)
+
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(sorted(query_pairs))
+    return urlunsplit(("https", netloc, path, query, ""))
+
+
+def _is_tracking_param(key: str) -> bool:
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def _apply_publisher_rules(netloc: str, path: str, query_pairs: List[Tuple[str, str]]):
+    # Reddit: every permalink form (/r/<sub>/comments/<id>/<slug>/, redd.it/<id>,
+    # old./np. front-ends) collapses to reddit.com/comments/<id>
+    if netloc in REDDIT_HOSTS or netloc == "redd.it":
+        if netloc == "redd.it":
+            post_id = path.strip("/").split("/")[0]
+            if post_id:
+                return "reddit.com", f"/comments/{post_id.lower()}", []
+        match = REDDIT_POST_RE.match(path)
+        if match:
+            return "reddit.com", f"/comments/{match.group(1).lower()}", []
+        return "reddit.com", path, query_pairs
+
+    # phys.org: sciencex.com mirrors the same /news/<slug>.html articles
+    if netloc in PHYS_ORG_MIRRORS and path.startswith("/news/"):
+        return "phys.org", path, []
+
+    return netloc, path, query_pairs
+
+
+def dedupe_by_url(items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Coalesces candidates that share a canonical URL (e.g. the same story in
+    two feeds), keeping the first occurrence.
+    Returns (unique_items, duplicates_removed).
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        url = item.get('url')
+        if url:
+            key = canonicalize_url(url)
+            if key in seen:
+                continue
+            seen.add(key)
+        unique.append(item)
+    return unique, len(items) - len(unique)
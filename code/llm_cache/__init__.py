@@ -0,0 +1,12 @@
+"""
+Persistent chat-completion response cache shared by the pipeline packages
+(lead_generator, curator, story_researcher, photo_researcher,
+text_generator). Standard library only, so any package can import it once
+the code/ directory is on sys.path: packages run with `python -m` from
+code/ get that for free; script entry points (lead_generator/main.py,
+text_generator/main.py, curator/main.py) add it themselves. Library
+modules never touch sys.path.
+"""
+from .cache import ResponseCache, cached_chat_completion, get_default_cache
+
+__all__ = ["ResponseCache", "cached_chat_completion", "get_default_cache"]
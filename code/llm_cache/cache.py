@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "llm_responses.sqlite3"
+DEFAULT_TTL_DAYS = 7
+DEFAULT_MAX_ENTRIES = 20_000
+
+# Request fields that decide the response; everything else (timeouts, user ids) is ignored
+KEY_FIELDS = ("model", "messages", "response_format", "temperature")
+
+
+class ResponseCache:
+    """
+    Chat completion responses in a local SQLite file, keyed by
+    sha256(model, messages, response_format, temperature).
+    Entries expire after ttl_days; beyond max_entries the least recently
+    used rows are evicted. Safe to share between threads and processes.
+
+    Defaults come from the environment:
+      LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_ENTRIES,
+      LLM_CACHE_DISABLED=1 (turns every cache into a pass-through)
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl_days: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.path = Path(path or os.getenv("LLM_CACHE_PATH") or DEFAULT_PATH)
+        self.ttl_seconds = float(ttl_days if ttl_days is not None
+                                 else os.getenv("LLM_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)) * 86400
+        self.max_entries = int(max_entries if max_entries is not None
+                               else os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.enabled = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def connect(self):
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        keyed = {field: params.get(field) for field in KEY_FIELDS}
+        payload = json.dumps(keyed, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                self.connect()
+                row = self.conn.execute(
+                    "SELECT content FROM responses WHERE key = ? AND created_at > ?",
+                    (key, time.time() - self.ttl_seconds)
+                ).fetchone()
+                if row:
+                    self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM response cache read failed, treating as miss: {e}")
+            row = None
+
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, content: str, model: Optional[str] = None):
+        if not self.enabled or not content:
+            return
+        try:
+            with self._lock:
+                self.connect()
+                now = time.time()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, content, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, content, now, now)
+                )
+                self._evict(now)
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM response cache write failed: {e}")
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl_seconds,))
+        count = self.conn.execute("SELECT count(*) FROM responses").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0%} hit rate)"
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+def is_cacheable(content: Optional[str], params: Dict[str, Any]) -> bool:
+    """
+    Only complete answers are cached: never empty content, and never a
+    JSON-mode response that doesn't parse (so a bad answer isn't replayed).
+    """
+    if not content:
+        return False
+    response_format = params.get("response_format") or {}
+    if response_format.get("type") in ("json_object", "json_schema"):
+        try:
+            json.loads(content)
+        except ValueError:
+            return False
+    return True
+
+
+def cached_chat_completion(client, cache: Optional[ResponseCache], **params) -> str:
+    """
+    client.chat.completions.create(**params), answered from `cache` when an
+    identical request was seen within the TTL. Returns the message content.
+    Pass cache=None at call sites that must always get a fresh answer.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(params)
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    response = client.chat.completions.create(**params)
+    content = response.choices[0].message.content
+    if cache is not None and is_cacheable(content, params):
+        cache.put(key, content, params.get("model"))
+    return content
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> ResponseCache:
+    """
+    The process-wide cache at the default (or LLM_CACHE_PATH) location.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
@@ -17,6 +17,8 @@ class Config:
     # Using GPT-5.1 as requested for intelligent query generation and vision
     QUERY_GENERATOR_MODEL = "gpt-5.1"
     VISION_MODEL = "gpt-5.1" 
+    # Replay identical query-generation requests from code/.cache (LLM_CACHE_DISABLED=1 to bypass)
+    CACHE_LLM_RESPONSES = True
 
     # Google Custom Search
     GOOGLE_CUSTOM_SEARCH_KEY = os.getenv('GOOGLE_CUSTOM_SEARCH_KEY')
@@ -1,11 +1,13 @@
 import json
 from openai import OpenAI
+from llm_cache import cached_chat_completion, get_default_cache
 from .config import config
 
 class QueryGenerator:
     def __init__(self):
         self.client = OpenAI(api_key=config.OPENAI_API_KEY)
         self.model = config.QUERY_GENERATOR_MODEL
+        self.response_cache = get_default_cache() if config.CACHE_LLM_RESPONSES else None
 
     def generate_queries(self, story):
         """
@@ -40,7 +42,9 @@ Research Highlights:
 """
 
         try:
-            response = self.client.chat.completions.create(
+            content = cached_chat_completion(
+                self.client,
+                self.response_cache,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -49,7 +53,6 @@ Research Highlights:
                 response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content
             # Sanitize content for markdown code blocks
             if content.startswith("```json"):
                 content = content[7:]
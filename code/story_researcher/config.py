@@ -26,6 +26,7 @@ class Config:
     # Models
     RESEARCHER_MODEL = "gpt-4o"
     PERPLEXITY_MODEL = "sonar-pro"
+    CACHE_LLM_RESPONSES = True  # Replay identical OpenAI requests from code/.cache (LLM_CACHE_DISABLED=1 to bypass)
     
     # Paths
     ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -2,6 +2,7 @@ import requests
 import json
 from openai import OpenAI
 from typing import List, Dict, Any
+from llm_cache import cached_chat_completion, get_default_cache
 from .config import config
 from .prompts import (
     get_phase_1_prompt, 
@@ -35,6 +36,7 @@ class Researcher:
     def __init__(self):
         self.pplx = PerplexityClient()
         self.openai = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.response_cache = get_default_cache() if config.CACHE_LLM_RESPONSES else None
 
     def research_story(self, story: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -61,7 +63,10 @@ class Researcher:
         print("Phase 2: Checking for research gaps...")
         phase_2_prompt = get_phase_2_angle_prompt(phase_1_result)
         
-        phase_2_response = self.openai.chat.completions.create(
+        # Same ground truth = same gap analysis, so this call can be replayed
+        phase_2_content = cached_chat_completion(
+            self.openai,
+            self.response_cache,
             model=config.RESEARCHER_MODEL,
             messages=[
                 {"role": "system", "content": PHASE_2_SYSTEM_PROMPT},
@@ -70,7 +75,7 @@ class Researcher:
             response_format={"type": "json_object"}
         )
         
-        gap_analysis = json.loads(phase_2_response.choices[0].message.content)
+        gap_analysis = json.loads(phase_2_content)
         follow_up_question = gap_analysis.get("follow_up_question")
         
         # Optional Deep Dive (Perplexity) - only if a follow-up question was generated
@@ -4,6 +4,9 @@ import logging
 from openai import OpenAI
 from dotenv import load_dotenv
 
+# Shared response cache lives in code/llm_cache/ (main.py puts code/ on sys.path)
+from llm_cache import cached_chat_completion, get_default_cache
+
 load_dotenv()
 
 # Configure logging
@@ -12,6 +15,11 @@ logger = logging.getLogger(__name__)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL = "gpt-5.2"
+# Re-running a --story-id replays identical requests from code/.cache instead of
+# regenerating them (set LLM_CACHE_DISABLED=1 to force fresh copy)
+CACHE_LLM_RESPONSES = True
+
+response_cache = get_default_cache() if CACHE_LLM_RESPONSES else None
 
 def load_brand_guide():
     """Loads the brand guide from the project root."""
@@ -185,7 +193,9 @@ OUTPUT FORMAT (JSON):
 }}"""
     
     try:
-        response = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            response_cache,
             model=MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -193,7 +203,7 @@ OUTPUT FORMAT (JSON):
             ],
             response_format={"type": "json_object"}
         )
-        return json.loads(response.choices[0].message.content)
+        return json.loads(content)
     except Exception as e:
         logger.error(f"Error generating story slides: {e}")
         raise
@@ -280,7 +290,9 @@ OUTPUT FORMAT (JSON):
 }}"""
     
     try:
-        response = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            response_cache,
             model=MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -288,7 +300,7 @@ OUTPUT FORMAT (JSON):
             ],
             response_format={"type": "json_object"}
         )
-        return json.loads(response.choices[0].message.content)
+        return json.loads(content)
     except Exception as e:
         logger.error(f"Error generating cover options: {e}")
         raise
@@ -347,7 +359,9 @@ OUTPUT FORMAT (JSON):
 }}"""
     
     try:
-        response = client.chat.completions.create(
+        content = cached_chat_completion(
+            client,
+            response_cache,
             model=MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -355,7 +369,7 @@ OUTPUT FORMAT (JSON):
             ],
             response_format={"type": "json_object"}
         )
-        return json.loads(response.choices[0].message.content)
+        return json.loads(content)
     except Exception as e:
         logger.error(f"Error generating photo text: {e}")
         raise
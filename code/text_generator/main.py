@@ -2,6 +2,12 @@ import logging
 import json
 import time
 import argparse
+import os
+import sys
+
+# code/ on sys.path for the shared llm_cache package (used by generator.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 from db import get_completed_research, get_approved_photos, save_story_generation, save_story_slides, update_photo_text
 from generator import generate_cover_options, generate_story_slides, generate_photo_text
 